@@ -0,0 +1,213 @@
+# analysis.py
+# ================================================================
+# OpenAI prompts behind the /analyze-* endpoints
+# ================================================================
+# Each *_request() returns the keyword arguments for
+# chat.completions.create, so the sync handlers in api.py and the async ones
+# in asgi.py send exactly the same prompts; parse_reply() turns the model's
+# answer back into JSON and food_items() checks the shape of a food answer.
+import hashlib
+import json
+
+MODEL = "gpt-4o-mini"
+
+def food_request(description):
+    return dict(
+        model=MODEL,
+        messages=[
+            {
+                "role": "system",
+                "content": "You are a nutrition expert. Analyze food descriptions and return nutritional data in JSON format only, with no additional text."
+            },
+            {
+                "role": "user",
+                "content": f"""Analyze this food description and extract nutritional information for each food item mentioned.
+
+Food description: {description}
+
+Return ONLY a valid JSON array with no additional text, where each item has:
+- name: descriptive name of the food
+- carbs: carbohydrates in grams
+- protein: protein in grams
+- fat: fat in grams
+- fiber: fiber in grams
+- calories: total calories
+
+Example format:
+[
+  {{"name": "Turkey Sandwich", "carbs": 35, "protein": 25, "fat": 8, "fiber": 3, "calories": 320}},
+  {{"name": "Potato Chips (1 oz)", "carbs": 15, "protein": 2, "fat": 10, "fiber": 1, "calories": 150}}
+]
+
+Provide reasonable estimates for typical serving sizes."""
+            }
+        ],
+        temperature=0.7,
+        max_tokens=1024
+    )
+
+def activity_request(description):
+    return dict(
+        model=MODEL,
+        messages=[
+            {
+                "role": "system",
+                "content": "You are a fitness expert. Analyze activity descriptions and calculate calories burned based on typical metabolic equivalents (METs). Return JSON only."
+            },
+            {
+                "role": "user",
+                "content": f"""Analyze this activity description and calculate calories burned.
+
+Activity description: {description}
+
+Return ONLY a valid JSON object with no additional text:
+{{
+  "activity_type": "the activity name (e.g., Basketball, Running, Yoga)",
+  "minutes": duration in minutes,
+  "calories": estimated calories burned (use standard MET values for average adult)
+}}
+
+Use typical MET values:
+- Walking (3 mph): 3.5 METs (~4 cal/min)
+- Running (6 mph): 10 METs (~11 cal/min)
+- Cycling (moderate): 8 METs (~9 cal/min)
+- Swimming: 8 METs (~9 cal/min)
+- Basketball: 6.5 METs (~7 cal/min)
+- Yoga: 2.5 METs (~3 cal/min)
+- Strength training: 5 METs (~6 cal/min)
+- Sports (general): 7 METs (~8 cal/min)
+
+Calculate calories as: minutes × calories_per_minute for the activity type."""
+            }
+        ],
+        temperature=0.5,
+        max_tokens=256
+    )
+
+def barcode_request(image_data):
+    return dict(
+        model=MODEL,
+        messages=[
+            {
+                "role": "system",
+                "content": "You are an expert at reading nutrition labels and product information. Extract nutritional data directly from photos when possible."
+            },
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": """Look at this product image and extract all available information:
+
+1. CAREFULLY read the COMPLETE barcode number below the barcode lines
+   - UPC-A barcodes have 12 digits
+   - EAN-13 barcodes have 13 digits
+   - Look for ALL digits including those on the far left and right edges
+   - Common mistake: missing the first 1-2 digits - please check the edges carefully
+2. If Nutrition Facts label is visible, extract the nutrition values EXACTLY as shown
+3. Get the product name if visible
+
+Return ONLY valid JSON with no additional text:
+
+{
+  "barcode": "COMPLETE barcode number with ALL digits (usually 12-13 digits), null if not visible",
+  "product_name": "name of product if visible",
+  "servings": estimated servings in container,
+  "has_nutrition_label": true or false,
+  "nutrition": {
+    "calories": calories per serving (if label visible),
+    "carbs": carbs in grams per serving (if label visible),
+    "protein": protein in grams per serving (if label visible),
+    "fat": fat in grams per serving (if label visible),
+    "fiber": fiber in grams per serving (if label visible)
+  },
+  "confidence": "high" or "medium" or "low"
+}
+
+IMPORTANT:
+- UPC barcodes should have exactly 12 digits - if you only see 10-11 digits, look more carefully at the edges
+- Read the ENTIRE number from left edge to right edge
+- If nutrition label is not visible, set has_nutrition_label to false
+- Always try to extract the complete barcode even if nutrition label is visible"""
+                    },
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": image_data
+                        }
+                    }
+                ]
+            }
+        ],
+        max_tokens=500
+    )
+
+def goals_request(goals, recent_data):
+    prompt = f"""You are a diabetes prevention coach. Analyze the user's progress towards their health goals and provide encouraging, actionable insights for preventing diabetes.
+
+User's Goals:
+{json.dumps(goals, indent=2)}
+
+Recent Data (last 7 days):
+{json.dumps(recent_data, indent=2)}
+
+Provide a brief analysis in JSON format with these fields:
+{{
+  "overall_status": "on_track" | "needs_attention" | "excellent",
+  "summary": "2-3 sentence overall assessment",
+  "insights": [
+    {{
+      "category": "glucose" | "nutrition" | "activity" | "weight",
+      "status": "on_track" | "needs_improvement" | "excellent",
+      "message": "brief encouraging message with specific data"
+    }}
+  ],
+  "recommendations": ["actionable tip 1", "actionable tip 2"]
+}}
+
+Be encouraging, specific, and focus on progress. Use actual numbers from the data. Always include insights for weight if weight data exists, as weight loss is critical for diabetes prevention."""
+
+    return dict(
+        model=MODEL,
+        messages=[
+            {"role": "system", "content": "You are a supportive diabetes management coach. Provide analysis in JSON format only."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.7,
+        max_tokens=800
+    )
+
+def prompt_version(build):
+    """Short hash of a *_request() builder's prompt, model and sampling settings.
+
+    Cached results (llm_cache.py) are keyed on it, so editing a prompt
+    invalidates them without a manual flush.
+    """
+    blueprint = json.dumps(build('\x00'), sort_keys=True)
+    return hashlib.sha256(blueprint.encode()).hexdigest()[:12]
+
+def strip_code_fence(text):
+    """Drop a ``` / ```json fence the model sometimes wraps its JSON in."""
+    text = text.strip()
+    if text.startswith('```'):
+        text = text[3:]
+        if text.endswith('```'):
+            text = text[:-3]
+        if text.startswith('json'):
+            text = text[4:]
+    return text.strip()
+
+def parse_reply(response):
+    """JSON payload of a chat completion; raises json.JSONDecodeError."""
+    return json.loads(strip_code_fence(response.choices[0].message.content))
+
+class ReplyFormatError(ValueError):
+    """The model answered with valid JSON of the wrong shape."""
+
+def food_items(result):
+    """The list of foods in a parsed food answer, unwrapping {"foods": [...]}."""
+    if isinstance(result, dict) and isinstance(result.get('foods'), list):
+        result = result['foods']
+    if not isinstance(result, list) or not all(isinstance(item, dict) for item in result):
+        raise ReplyFormatError(f"expected a list of foods, got {json.dumps(result)[:200]}")
+    return result
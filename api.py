@@ -1,14 +1,31 @@
 import sys
 import os
+import io
+import csv
 import json
+import math
+import base64
+import binascii
 import sqlite3
 import hashlib
+import hmac
 import secrets
+import threading
+import time
+from collections import Counter, OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import Flask, request, jsonify, g, send_from_directory
 from flask_cors import CORS
 
+from migrations import apply_migrations
+from rollups import refresh_rollups
+from streaks import upsert_streak, award_milestones, recompute_streaks
+from analysis import (food_request, activity_request, barcode_request, goals_request,
+                      parse_reply, prompt_version, food_items, ReplyFormatError)
+from llm_cache import AnalysisCache
+from nutrition import NutritionIndex, NUTRITION_CSV
+
 from pathlib import Path
 env_path = Path(__file__).parent / '.env'
 if env_path.exists():
@@ -20,16 +37,18 @@ if env_path.exists():
                 os.environ[key] = value
 
 try:
-    from openai import OpenAI
+    from llm_client import LLMClient, LLMBusyError, require_api_key
 except ImportError:
     print("Error: Could not import OpenAI. Installing...")
     os.system('pip install --upgrade openai')
-    from openai import OpenAI
+    from llm_client import LLMClient, LLMBusyError, require_api_key
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'ml'))
 
 try:
-    from scorer import predict_one, load_bundle
+    from scorer import (load_bundle, load_compiled, load_risk_grid, model_fingerprint,
+                        ArrayScorer, BundleScorer, CachedScorer, GridScorer, MicroBatcher,
+                        BUNDLE_PATH, COMPILED_PATH)
 except ImportError as e:
     print(f"Error importing scorer: {e}")
     print("Make sure the model has been trained and risk_model_bundle.joblib exists")
@@ -40,146 +59,123 @@ CORS(app)
 
 DATABASE = 'diabetes_app.db'
 
+# SQLite tuning. Connections are pooled per worker process and reused across
+# requests; WAL lets readers proceed while a writer commits, and writers wait
+# up to SQLITE_BUSY_TIMEOUT_MS for the lock instead of failing immediately.
+SQLITE_POOL_SIZE = int(os.environ.get('SQLITE_POOL_SIZE', 8))
+SQLITE_CACHE_KB = int(os.environ.get('SQLITE_CACHE_KB', 16384))
+SQLITE_MMAP_BYTES = int(os.environ.get('SQLITE_MMAP_BYTES', 128 * 1024 * 1024))
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+
+def connect_db(path=DATABASE):
+    conn = sqlite3.connect(path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000.0, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA cache_size=-{SQLITE_CACHE_KB}')
+    conn.execute(f'PRAGMA mmap_size={SQLITE_MMAP_BYTES}')
+    conn.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    return conn
+
+class ConnectionPool:
+    """Idle SQLite connections kept per worker process and handed out per request.
+
+    Up to max_idle connections are kept; extra ones opened under load are
+    closed on release. After a fork the child drops the parent's connections.
+    """
+    def __init__(self, path, max_idle=8):
+        self.path = path
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = []
+        self.created = 0
+        self.reused = 0
+        self.closed = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.lock_errors = 0
+        self.connect_seconds = 0.0
+
+    def acquire(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            conn = self._idle.pop() if self._idle else None
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            if conn is not None:
+                self.reused += 1
+                return conn
+        t0 = time.perf_counter()
+        try:
+            conn = connect_db(self.path)
+        except Exception:
+            with self._lock:
+                self.in_use -= 1
+            raise
+        with self._lock:
+            self.created += 1
+            self.connect_seconds += time.perf_counter() - t0
+        return conn
+
+    def release(self, conn, exception=None):
+        if isinstance(exception, sqlite3.OperationalError) and 'locked' in str(exception):
+            with self._lock:
+                self.lock_errors += 1
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            conn = None
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            self.in_use -= 1
+            if conn is not None and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+            self.closed += 1
+        if conn is not None:
+            conn.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "created": self.created,
+                "reused": self.reused,
+                "closed": self.closed,
+                "in_use": self.in_use,
+                "idle": len(self._idle),
+                "peak_in_use": self.peak_in_use,
+                "lock_errors": self.lock_errors,
+                "avg_connect_ms": round(1000.0 * self.connect_seconds / self.created, 3) if self.created else None,
+            }
+
+db_pool = ConnectionPool(DATABASE, max_idle=SQLITE_POOL_SIZE)
+
 def get_db():
     db = getattr(g, '_database', None)
     if db is None:
-        db = g._database = sqlite3.connect(DATABASE)
-        db.row_factory = sqlite3.Row
+        db = g._database = db_pool.acquire()
     return db
 
 @app.teardown_appcontext
 def close_connection(exception):
-    db = getattr(g, '_database', None)
+    db = g.pop('_database', None)
     if db is not None:
-        db.close()
+        db_pool.release(db, exception)
 
 def init_db():
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS auth_tokens (
-            token TEXT PRIMARY KEY,
-            user_id INTEGER NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            expires_at TIMESTAMP NOT NULL,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS glucose_data (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            date TEXT NOT NULL,
-            value REAL NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS nutrition_data (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            date TEXT NOT NULL,
-            name TEXT NOT NULL,
-            servings REAL NOT NULL,
-            carbs REAL NOT NULL,
-            protein REAL NOT NULL,
-            fat REAL NOT NULL,
-            fiber REAL NOT NULL,
-            calories REAL NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS activity_data (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            date TEXT NOT NULL,
-            minutes INTEGER NOT NULL,
-            type TEXT NOT NULL,
-            calories INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS weight_data (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            date TEXT NOT NULL,
-            weight REAL NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS risk_assessments (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            probability REAL NOT NULL,
-            risk_level INTEGER NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS goals (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL UNIQUE,
-            glucose_min REAL,
-            glucose_max REAL,
-            calorie_target REAL,
-            carb_target REAL,
-            activity_weekly_minutes INTEGER,
-            weight_target REAL,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS streaks (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL UNIQUE,
-            current_streak INTEGER DEFAULT 0,
-            longest_streak INTEGER DEFAULT 0,
-            last_activity_date TEXT,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS milestones (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            milestone_type TEXT NOT NULL,
-            milestone_name TEXT NOT NULL,
-            achieved_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    ''')
-
-    conn.commit()
+    conn = connect_db()
+    version = apply_migrations(conn)
     conn.close()
-    print("Database initialized successfully")
+    print(f"Database initialized successfully (schema version {version})")
 
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
@@ -187,109 +183,386 @@ def hash_password(password):
 def generate_token():
     return secrets.token_urlsafe(32)
 
-def update_streak(user_id, activity_date):
-    db = get_db()
-    cursor = db.cursor()
-
-    cursor.execute('SELECT current_streak, longest_streak, last_activity_date FROM streaks WHERE user_id = ?', (user_id,))
-    streak_data = cursor.fetchone()
-
-    if not streak_data:
-        cursor.execute('INSERT INTO streaks (user_id, current_streak, longest_streak, last_activity_date) VALUES (?, 1, 1, ?)',
-                      (user_id, activity_date))
-        db.commit()
-        check_milestones(user_id, 1)
-        return
-
-    current_streak, longest_streak, last_activity_date = streak_data
-
-    from datetime import datetime, timedelta
-    try:
-        activity_dt = datetime.strptime(activity_date, '%Y-%m-%d')
-        last_dt = datetime.strptime(last_activity_date, '%Y-%m-%d') if last_activity_date else None
-    except:
-        return
-
-    if last_dt:
-        day_diff = (activity_dt - last_dt).days
-
-        if day_diff == 0:
+# Validated tokens are cached per worker so require_auth is a dict lookup
+# instead of a query. An entry lives for at most AUTH_CACHE_TTL seconds (and
+# never past the token's own expiry). Logout evicts it in the worker that
+# served the logout and records the token's hash in revoked_tokens, which
+# every worker checks on a cache hit (see TokenDenylist), so other workers
+# stop accepting it within AUTH_DENYLIST_REFRESH seconds.
+AUTH_CACHE_SIZE = int(os.environ.get('AUTH_CACHE_SIZE', 10000))
+AUTH_CACHE_TTL = float(os.environ.get('AUTH_CACHE_TTL', 60))
+AUTH_SWEEP_INTERVAL = float(os.environ.get('AUTH_SWEEP_INTERVAL', 3600))
+AUTH_SWEEP_BATCH = int(os.environ.get('AUTH_SWEEP_BATCH', 500))
+
+class TokenCache:
+    """Bounded LRU of token -> (user_id, deadline on the monotonic clock)."""
+    def __init__(self, maxsize=10000, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, token):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(token)
+                    self.hits += 1
+                    return entry[0]
+                del self._entries[token]
+            self.misses += 1
+            return None
+
+    def put(self, token, user_id, expires_in):
+        if self.maxsize <= 0:
             return
-        elif day_diff == 1:
-            current_streak += 1
-        elif day_diff > 1:
-            current_streak = 1
-    else:
-        current_streak = 1
-
-    if current_streak > longest_streak:
-        longest_streak = current_streak
-
-    cursor.execute('''UPDATE streaks SET current_streak = ?, longest_streak = ?,
-                      last_activity_date = ?, updated_at = CURRENT_TIMESTAMP
-                      WHERE user_id = ?''',
-                  (current_streak, longest_streak, activity_date, user_id))
-    db.commit()
-
-    check_milestones(user_id, current_streak)
-
-def check_milestones(user_id, current_streak):
-    db = get_db()
-    cursor = db.cursor()
+        deadline = time.monotonic() + min(self.ttl, expires_in)
+        with self._lock:
+            self._entries[token] = (user_id, deadline)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, token):
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "maxsize": self.maxsize, "ttl": self.ttl,
+                    "hits": self.hits, "misses": self.misses}
+
+token_cache = TokenCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+
+SWEEP_TOKENS_SQL = '''
+    DELETE FROM auth_tokens WHERE token IN (
+        SELECT token FROM auth_tokens WHERE expires_at <= datetime('now') LIMIT ?)
+'''
+SWEEP_REVOKED_SQL = 'DELETE FROM revoked_tokens WHERE expires_at <= ?'
+
+def sweep_expired_tokens(conn, batch_size=500):
+    """Delete expired auth_tokens rows in short transactions; returns the count."""
+    total = 0
+    while True:
+        cur = conn.execute(SWEEP_TOKENS_SQL, (batch_size,))
+        conn.commit()
+        total += cur.rowcount
+        if cur.rowcount < batch_size:
+            break
+    conn.execute(SWEEP_REVOKED_SQL, (int(time.time()),))
+    conn.commit()
+    return total
+
+class TokenSweeper:
+    """Background thread that purges expired tokens every `interval` seconds.
+
+    Started lazily from require_auth, so a gunicorn --preload master never
+    runs it and each worker starts its own after the fork.
+    """
+    def __init__(self, path, interval=3600.0, batch_size=500):
+        self.path = path
+        self.interval = interval
+        self.batch_size = batch_size
+        self.runs = 0
+        self.deleted = 0
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def ensure_started(self):
+        if self.interval <= 0 or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                threading.Thread(target=self._run, name="auth-token-sweeper", daemon=True).start()
+                self._pid = os.getpid()
+
+    def sweep(self):
+        conn = connect_db(self.path)
+        try:
+            deleted = sweep_expired_tokens(conn, self.batch_size)
+        finally:
+            conn.close()
+        self.runs += 1
+        self.deleted += deleted
+        return deleted
+
+    def _run(self):
+        while True:
+            try:
+                self.sweep()
+                self.last_error = None
+            except sqlite3.Error as e:
+                self.last_error = str(e)
+            time.sleep(self.interval)
+
+    def stats(self):
+        return {"interval": self.interval, "runs": self.runs, "deleted": self.deleted,
+                "last_error": self.last_error}
+
+token_sweeper = TokenSweeper(DATABASE, interval=AUTH_SWEEP_INTERVAL, batch_size=AUTH_SWEEP_BATCH)
+
+# ================================================================
+# Signed tokens
+# ================================================================
+# AUTH_TOKEN_MODE=signed makes /auth/login issue self-contained tokens
+# "v1.<payload>.<hmac>" carrying user_id, expiry and a random id (jti),
+# verified in memory with AUTH_SIGNING_KEY -- every node needs the same key.
+# require_auth accepts both kinds whatever the mode, so switching modes does
+# not log anyone out. Logout adds the jti to revoked_tokens; each worker
+# reloads that denylist every AUTH_DENYLIST_REFRESH seconds. Logged-out
+# database tokens go in the same table under db_token_jti(), kept only as
+# long as a cached copy of them can live.
+AUTH_TOKEN_MODE = os.environ.get('AUTH_TOKEN_MODE', 'db')
+AUTH_SIGNING_KEY = os.environ.get('AUTH_SIGNING_KEY', '').encode()
+AUTH_DENYLIST_REFRESH = float(os.environ.get('AUTH_DENYLIST_REFRESH', 5))
+SIGNED_TOKEN_PREFIX = 'v1.'
+
+if AUTH_TOKEN_MODE == 'signed' and not AUTH_SIGNING_KEY:
+    print("Warning: AUTH_TOKEN_MODE=signed needs AUTH_SIGNING_KEY; issuing database tokens instead")
+    AUTH_TOKEN_MODE = 'db'
+
+def _b64url(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+def _unb64url(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+def _sign(message):
+    return hmac.new(AUTH_SIGNING_KEY, message.encode('ascii'), hashlib.sha256).digest()
+
+def issue_signed_token(user_id, expires_at):
+    payload = json.dumps({"uid": user_id, "exp": int(expires_at.timestamp()),
+                          "jti": secrets.token_urlsafe(12)}, separators=(',', ':'))
+    body = SIGNED_TOKEN_PREFIX + _b64url(payload.encode())
+    return body + '.' + _b64url(_sign(body))
+
+def verify_signed_token(token):
+    """Return the claims of a valid, unexpired signed token, else None."""
+    if not AUTH_SIGNING_KEY or not token.startswith(SIGNED_TOKEN_PREFIX):
+        return None
+    body, _, sig = token.rpartition('.')
+    try:
+        if not hmac.compare_digest(_unb64url(sig), _sign(body)):
+            return None
+        claims = json.loads(_unb64url(body[len(SIGNED_TOKEN_PREFIX):]))
+    except (ValueError, binascii.Error, UnicodeError):
+        return None
+    if not isinstance(claims, dict) or not isinstance(claims.get('uid'), int) or \
+            not isinstance(claims.get('exp'), int) or claims['exp'] <= time.time():
+        return None
+    return claims
+
+def db_token_jti(token):
+    """revoked_tokens key of a logged-out database token (a hash, never the token itself)."""
+    return 'db:' + hashlib.sha256(token.encode()).hexdigest()
+
+REVOKED_TOKENS_SQL = 'SELECT jti, expires_at FROM revoked_tokens WHERE expires_at > ?'
+
+class TokenDenylist:
+    """jti -> expiry of revoked tokens, mirrored from revoked_tokens."""
+    def __init__(self, refresh=5.0):
+        self.refresh = refresh
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._loaded_at = None
+        self._pid = None
+
+    def _load(self, cursor):
+        now = int(time.time())
+        cursor.execute(REVOKED_TOKENS_SQL, (now,))
+        self._entries = dict(cursor.fetchall())
+        self._loaded_at = time.monotonic()
+        self._pid = os.getpid()
+
+    def is_revoked(self, jti, cursor_factory):
+        with self._lock:
+            if self._pid != os.getpid() or time.monotonic() - self._loaded_at >= self.refresh:
+                self._load(cursor_factory())
+            return jti in self._entries
+
+    def revoke(self, cursor, jti, expires_at):
+        cursor.execute('INSERT OR IGNORE INTO revoked_tokens (jti, expires_at) VALUES (?, ?)',
+                       (jti, expires_at))
+        with self._lock:
+            self._entries[jti] = expires_at
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "refresh": self.refresh}
+
+token_denylist = TokenDenylist(refresh=AUTH_DENYLIST_REFRESH)
+
+def request_token():
+    token = request.headers.get('Authorization')
+    if token and token.startswith('Bearer '):
+        token = token[7:]
+    return token
 
-    milestone_thresholds = {
-        3: "3_day_streak",
-        7: "7_day_streak",
-        14: "14_day_streak",
-        30: "30_day_streak",
-        60: "60_day_streak",
-        100: "100_day_streak"
-    }
+def update_streak(user_id, activity_date):
+    """Advance the user's streak and award milestones in the caller's transaction."""
+    cursor = get_db().cursor()
+    if upsert_streak(cursor, user_id, activity_date):
+        bump_version(cursor, user_id, 'streaks')
+        check_milestones(user_id)
+
+def update_streak_for_dates(user_id, dates):
+    """Rebuild the user's streak after a bulk import of rows on `dates`.
+
+    Imported days may fall before, inside or after the stored streak, so the
+    streak is recomputed from every stored day (gaps and islands) rather than
+    advanced date by date; milestones follow the longest run. Runs in the
+    caller's transaction, so a bulk import lands in a single commit.
+    """
+    if not dates:
+        return
+    cursor = get_db().cursor()
+    recompute_streaks(cursor, user_id)
+    bump_version(cursor, user_id, 'streaks')
+    bump_version(cursor, user_id, 'milestones')
+
+def check_milestones(user_id):
+    cursor = get_db().cursor()
+    if award_milestones(cursor, user_id):
+        bump_version(cursor, user_id, 'milestones')
+
+AUTH_TOKEN_SQL = '''
+    SELECT user_id, (julianday(expires_at) - julianday('now')) * 86400
+    FROM auth_tokens
+    WHERE token = ? AND expires_at > datetime('now')
+'''
+
+def authenticate(token, get_cursor):
+    """Return (user_id, signed-token claims or None) for a valid token, else (None, None).
+
+    get_cursor is only called when the database has to be consulted, so
+    callers outside a Flask request (asgi.py) can hand in a pooled connection
+    lazily.
+    """
+    token_sweeper.ensure_started()
+    if token.startswith(SIGNED_TOKEN_PREFIX):
+        claims = verify_signed_token(token)
+        if claims is None or token_denylist.is_revoked(claims['jti'], get_cursor):
+            return None, None
+        return claims['uid'], claims
+
+    user_id = token_cache.get(token)
+    if user_id is not None and token_denylist.is_revoked(db_token_jti(token), get_cursor):
+        # Logged out through another worker since it was cached here.
+        token_cache.invalidate(token)
+        return None, None
+    if user_id is None:
+        cursor = get_cursor()
+        cursor.execute(AUTH_TOKEN_SQL, (token,))
 
-    for threshold, milestone_name in milestone_thresholds.items():
-        if current_streak >= threshold:
-            cursor.execute('SELECT id FROM milestones WHERE user_id = ? AND milestone_name = ?',
-                          (user_id, milestone_name))
-            if not cursor.fetchone():
-                cursor.execute('INSERT INTO milestones (user_id, milestone_type, milestone_name) VALUES (?, ?, ?)',
-                              (user_id, 'streak', milestone_name))
+        result = cursor.fetchone()
+        if not result:
+            return None, None
 
-    db.commit()
+        user_id = result[0]
+        token_cache.put(token, user_id, result[1])
+    return user_id, None
 
 def require_auth(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        token = request.headers.get('Authorization')
+        token = request_token()
         if not token:
             return jsonify({"error": "No authorization token provided"}), 401
 
-        if token.startswith('Bearer '):
-            token = token[7:]
-
-        db = get_db()
-        cursor = db.cursor()
-        cursor.execute('''
-            SELECT user_id FROM auth_tokens
-            WHERE token = ? AND expires_at > datetime('now')
-        ''', (token,))
-
-        result = cursor.fetchone()
-        if not result:
+        user_id, claims = authenticate(token, lambda: get_db().cursor())
+        if user_id is None:
             return jsonify({"error": "Invalid or expired token"}), 401
 
-        g.user_id = result[0]
+        g.user_id = user_id
+        g.auth_claims = claims
         return f(*args, **kwargs)
 
     return decorated_function
 
 init_db()
 
-try:
-    bundle = load_bundle()
-    print("Model loaded successfully")
-except Exception as e:
-    print(f"Failed to load model: {e}")
-    bundle = None
+# MODEL_FORMAT: "compiled" scores with the NumPy-only artifact exported by
+# train_model.py, "bundle" unpickles the full sklearn pipeline, and "auto"
+# (default) uses the compiled artifact whenever it exists.
+MODEL_FORMAT = os.environ.get('MODEL_FORMAT', 'auto')
+
+# MODEL_MMAP=1 memory-maps the model's arrays read-only so gunicorn workers
+# share one copy through the page cache (see gunicorn.conf.py).
+MODEL_MMAP = os.environ.get('MODEL_MMAP', '0') == '1'
+mmap_mode = 'r' if MODEL_MMAP else None
+
+# The NumPy fast path returns the same probabilities as the DataFrame path;
+# set PREDICT_FAST_PATH=0 to score through pandas instead.
+PREDICT_FAST_PATH = os.environ.get('PREDICT_FAST_PATH', '1') != '0'
+
+# LRU cache of recent predictions (0 disables) and the optional precomputed
+# risk grid built by ml/build_grid.py.
+PREDICT_CACHE_SIZE = int(os.environ.get('PREDICT_CACHE_SIZE', 4096))
+PREDICT_GRID = os.environ.get('PREDICT_GRID', '0') == '1'
+
+bundle = None
+risk_scorer = None
+model_path = None
+
+if MODEL_FORMAT == 'compiled' or (MODEL_FORMAT == 'auto' and os.path.exists(COMPILED_PATH)):
+    try:
+        risk_scorer = load_compiled(mmap_mode=mmap_mode)
+        model_path = COMPILED_PATH
+        print("Compiled model loaded successfully")
+    except Exception as e:
+        print(f"Failed to load compiled model: {e}")
+
+if risk_scorer is None:
+    try:
+        bundle = load_bundle(mmap_mode=mmap_mode)
+        model_path = BUNDLE_PATH
+        print("Model loaded successfully")
+    except Exception as e:
+        print(f"Failed to load model: {e}")
+        bundle = None
+
+    if bundle is not None:
+        risk_scorer = BundleScorer(bundle)
+        if PREDICT_FAST_PATH:
+            try:
+                risk_scorer = ArrayScorer(bundle)
+            except Exception as e:
+                print(f"Fast scoring path unavailable, using DataFrame path: {e}")
+
+model_loaded = risk_scorer is not None
+model_id = model_fingerprint(model_path) if model_loaded else None
+
+predict_cache = None
+if model_loaded and PREDICT_CACHE_SIZE > 0:
+    predict_cache = CachedScorer(risk_scorer, model_id, maxsize=PREDICT_CACHE_SIZE)
+    risk_scorer = predict_cache
+
+risk_grid = None
+if model_loaded and PREDICT_GRID:
+    try:
+        grid = load_risk_grid()
+        if grid.spec["model_id"] != model_id:
+            print(f"Risk grid was built for model {grid.spec['model_id']}, loaded {model_id}; ignoring it")
+        else:
+            risk_grid = GridScorer(grid, fallback=risk_scorer)
+            risk_scorer = risk_grid
+            print(f"Risk grid loaded: {grid.info()['error_bound']}")
+    except Exception as e:
+        print(f"Failed to load risk grid: {e}")
+
+# Set PREDICT_MICROBATCH_MS to gather concurrent /predict calls into one
+# vectorized predict_proba call. Disabled (0) by default.
+PREDICT_MICROBATCH_MS = float(os.environ.get('PREDICT_MICROBATCH_MS', 0))
+PREDICT_BATCH_MAX = int(os.environ.get('PREDICT_BATCH_MAX', 1000))
+
+micro_batcher = None
+if model_loaded and PREDICT_MICROBATCH_MS > 0:
+    micro_batcher = MicroBatcher(bundle, window_ms=PREDICT_MICROBATCH_MS, scorer=risk_scorer)
 
 @app.route('/auth/signup', methods=['POST'])
 def signup():
@@ -317,6 +590,8 @@ def signup():
 
     return jsonify({"message": "Account created successfully"}), 201
 
+USER_BY_NAME_SQL = 'SELECT id, password_hash FROM users WHERE username = ?'
+
 @app.route('/auth/login', methods=['POST'])
 def login():
     data = request.get_json()
@@ -329,7 +604,7 @@ def login():
     db = get_db()
     cursor = db.cursor()
 
-    cursor.execute('SELECT id, password_hash FROM users WHERE username = ?', (username,))
+    cursor.execute(USER_BY_NAME_SQL, (username,))
     user = cursor.fetchone()
 
     if not user or user[1] != hash_password(password):
@@ -337,12 +612,15 @@ def login():
 
     user_id = user[0]
 
-    token = generate_token()
     expires_at = datetime.now() + timedelta(days=30)
 
-    cursor.execute('INSERT INTO auth_tokens (token, user_id, expires_at) VALUES (?, ?, ?)',
-                   (token, user_id, expires_at))
-    db.commit()
+    if AUTH_TOKEN_MODE == 'signed':
+        token = issue_signed_token(user_id, expires_at)
+    else:
+        token = generate_token()
+        cursor.execute('INSERT INTO auth_tokens (token, user_id, expires_at) VALUES (?, ?, ?)',
+                       (token, user_id, expires_at))
+        db.commit()
 
     return jsonify({
         "token": token,
@@ -353,15 +631,279 @@ def login():
 @app.route('/auth/logout', methods=['POST'])
 @require_auth
 def logout():
-    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    token = request_token()
 
     db = get_db()
     cursor = db.cursor()
-    cursor.execute('DELETE FROM auth_tokens WHERE token = ?', (token,))
+    if g.auth_claims is not None:
+        token_denylist.revoke(cursor, g.auth_claims['jti'], g.auth_claims['exp'])
+    else:
+        cursor.execute('DELETE FROM auth_tokens WHERE token = ?', (token,))
+        # Other workers may still hold it in their token cache for up to the TTL.
+        token_denylist.revoke(cursor, db_token_jti(token), int(time.time() + token_cache.ttl) + 1)
     db.commit()
+    token_cache.invalidate(token)
 
     return jsonify({"message": "Logged out successfully"}), 200
 
+# Row -> JSON for each per-user time series, shared by the /data endpoints
+# and /data/dashboard.
+USER_SERIES = {
+    'glucose': ('glucose_data', 'date, value',
+                lambda row: {"id": row['id'], "date": row['date'], "value": row['value']}),
+    'nutrition': ('nutrition_data', 'date, name, servings, carbs, protein, fat, fiber, calories',
+                  lambda row: {
+                      "id": row['id'], "date": row['date'], "name": row['name'], "servings": row['servings'],
+                      "carbs": row['carbs'], "protein": row['protein'], "fat": row['fat'],
+                      "fiber": row['fiber'], "calories": row['calories']
+                  }),
+    'activity': ('activity_data', 'date, minutes, type, calories',
+                 lambda row: {
+                     "id": row['id'], "date": row['date'], "minutes": row['minutes'],
+                     "type": row['type'], "calories": row['calories']
+                 }),
+    'weight': ('weight_data', 'date, weight',
+               lambda row: {"id": row['id'], "date": row['date'], "weight": row['weight']}),
+}
+
+def user_rows_query(name, user_id, date_from=None, date_to=None, after=None):
+    """(sql, params) listing a user's rows of one series in (date, id) order,
+    optionally within from/to dates and after a (date, id) keyset cursor."""
+    table, columns, _ = USER_SERIES[name]
+    where, params = ['user_id = ?'], [user_id]
+    if date_from:
+        where.append('date >= ?')
+        params.append(date_from)
+    if date_to:
+        where.append('date <= ?')
+        params.append(date_to)
+    if after:
+        where.append('(date > ? OR (date = ? AND id > ?))')
+        params.extend([after[0], after[0], after[1]])
+    return f"SELECT id, {columns} FROM {table} WHERE {' AND '.join(where)} ORDER BY date, id", params
+
+def read_user_series(cursor, user_id, name, since=None):
+    cursor.execute(*user_rows_query(name, user_id, since))
+    return [USER_SERIES[name][2](row) for row in cursor.fetchall()]
+
+# ================================================================
+# Response cache for the read-mostly endpoints
+# ================================================================
+# goals, streaks, milestones and risk each carry a per-user version in
+# data_versions, bumped in the same transaction as every write to them.
+# Versions live in the database rather than in the worker so a write served
+# by one gunicorn worker is seen by all of them. A GET costs one primary-key
+# lookup of the version: when it matches the worker's cached entry the
+# serialized body and its strong ETag are reused, and If-None-Match gets a
+# 304 without reading or serializing the resource.
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 4096))
+
+BUMP_VERSION_SQL = '''INSERT INTO data_versions (user_id, resource, version) VALUES (?, ?, 1)
+                      ON CONFLICT (user_id, resource) DO UPDATE SET version = version + 1'''
+VERSION_SQL = 'SELECT version FROM data_versions WHERE user_id = ? AND resource = ?'
+
+def bump_version(cursor, user_id, resource):
+    cursor.execute(BUMP_VERSION_SQL, (user_id, resource))
+
+def read_version(cursor, user_id, resource):
+    cursor.execute(VERSION_SQL, (user_id, resource))
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+class ResponseCache:
+    """Bounded LRU of (user_id, resource) -> (version, etag, body) per worker."""
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+
+    def put(self, key, entry):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def count_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits,
+                    "misses": self.misses, "not_modified": self.not_modified}
+
+response_cache = ResponseCache(maxsize=RESPONSE_CACHE_SIZE)
+
+def cached_response(cursor, resource, reader):
+    key = (g.user_id, resource)
+    version = read_version(cursor, g.user_id, resource)
+    entry = response_cache.get(key, version)
+    if entry is None:
+        body = app.json.dumps(reader(cursor, g.user_id)) + '\n'
+        etag = hashlib.sha256(body.encode()).hexdigest()[:32]
+        entry = (version, etag, body)
+        response_cache.put(key, entry)
+
+    _, etag, body = entry
+    if request.if_none_match.contains(etag):
+        response_cache.count_not_modified()
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+LATEST_RISK_SQL = '''SELECT probability, risk_level, created_at
+                     FROM risk_assessments WHERE user_id = ?
+                     ORDER BY created_at DESC LIMIT 1'''
+GOALS_SQL = '''SELECT glucose_min, glucose_max, calorie_target, carb_target,
+               activity_weekly_minutes, weight_target
+               FROM goals WHERE user_id = ?'''
+STREAKS_SQL = '''SELECT current_streak, longest_streak, last_activity_date
+                 FROM streaks WHERE user_id = ?'''
+MILESTONES_SQL = '''SELECT milestone_type, milestone_name, achieved_at
+                    FROM milestones WHERE user_id = ?
+                    ORDER BY achieved_at DESC'''
+
+def read_latest_risk(cursor, user_id):
+    cursor.execute(LATEST_RISK_SQL, (user_id,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    return {
+        "probability": row[0],
+        "risk_level": row[1],
+        "created_at": row[2]
+    }
+
+def read_goals(cursor, user_id):
+    cursor.execute(GOALS_SQL, (user_id,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    return {
+        "glucose_min": row[0],
+        "glucose_max": row[1],
+        "calorie_target": row[2],
+        "carb_target": row[3],
+        "activity_weekly_minutes": row[4],
+        "weight_target": row[5]
+    }
+
+def read_streaks(cursor, user_id):
+    cursor.execute(STREAKS_SQL, (user_id,))
+    row = cursor.fetchone()
+    if not row:
+        return {"current_streak": 0, "longest_streak": 0, "last_activity_date": None}
+    return {
+        "current_streak": row[0],
+        "longest_streak": row[1],
+        "last_activity_date": row[2]
+    }
+
+def read_milestones(cursor, user_id):
+    cursor.execute(MILESTONES_SQL, (user_id,))
+    return [{
+        "type": row[0],
+        "name": row[1],
+        "achieved_at": row[2]
+    } for row in cursor.fetchall()]
+
+# GET on the /data time-series endpoints takes optional from/to dates
+# (YYYY-MM-DD, inclusive). Without limit/cursor it returns the plain array
+# as before; with either it returns one page ordered by (date, id) plus a
+# next_cursor to pass back for the following page (null on the last one).
+DATA_PAGE_SIZE = int(os.environ.get('DATA_PAGE_SIZE', 500))
+DATA_PAGE_MAX = int(os.environ.get('DATA_PAGE_MAX', 5000))
+
+def encode_cursor(date, row_id):
+    return base64.urlsafe_b64encode(f"{date}|{row_id}".encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    date, row_id = raw.rsplit('|', 1)
+    return date, int(row_id)
+
+def _date_arg(name):
+    value = request.args.get(name)
+    if value:
+        datetime.strptime(value, '%Y-%m-%d')
+    return value
+
+def list_user_rows(name):
+    to_item = USER_SERIES[name][2]
+    try:
+        date_from, date_to = _date_arg('from'), _date_arg('to')
+    except ValueError:
+        return jsonify({"error": "from/to must be YYYY-MM-DD dates"}), 400
+
+    paged = 'limit' in request.args or 'cursor' in request.args
+    after = None
+    if paged:
+        try:
+            limit = int(request.args.get('limit', DATA_PAGE_SIZE))
+            after = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        except (ValueError, UnicodeDecodeError, binascii.Error):
+            return jsonify({"error": "Invalid limit or cursor"}), 400
+        limit = max(1, min(limit, DATA_PAGE_MAX))
+
+    sql, params = user_rows_query(name, g.user_id, date_from, date_to, after)
+    cursor = get_db().cursor()
+    if not paged:
+        cursor.execute(sql, params)
+        return jsonify([to_item(row) for row in cursor.fetchall()]), 200
+
+    cursor.execute(sql + ' LIMIT ?', params + [limit + 1])
+    rows = cursor.fetchall()
+    next_cursor = encode_cursor(rows[limit - 1]['date'], rows[limit - 1]['id']) if len(rows) > limit else None
+    return jsonify({"items": [to_item(row) for row in rows[:limit]], "next_cursor": next_cursor}), 200
+
+# DELETE on the /data time-series endpoints takes {"id": n} or {"ids": [...]}
+# (ids come back from GET and POST). Glucose also still accepts {"date": d},
+# which names at most one reading. The positional {"index": n} body is gone:
+# it had to load every id to find the row and could delete the wrong one
+# when a write landed in between.
+DELETE_IDS_MAX = 1000
+ROW_DATES_BY_ID_SQL = 'SELECT DISTINCT date FROM {table} WHERE user_id = ? AND id IN ({placeholders})'
+DELETE_BY_ID_SQL = 'DELETE FROM {table} WHERE user_id = ? AND id IN ({placeholders})'
+DELETE_GLUCOSE_DATE_SQL = 'DELETE FROM glucose_data WHERE user_id = ? AND date = ?'
+
+def delete_rows_by_id(series, data):
+    ids = data.get('ids') if 'ids' in data else [data.get('id')]
+    if not isinstance(ids, list) or not ids or len(ids) > DELETE_IDS_MAX \
+            or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        return jsonify({"error": f"id must be an integer, ids a list of 1-{DELETE_IDS_MAX} integers"}), 400
+
+    table = USER_SERIES[series][0]
+    placeholders = ', '.join('?' * len(ids))
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute(ROW_DATES_BY_ID_SQL.format(table=table, placeholders=placeholders), [g.user_id] + ids)
+    dates = [row[0] for row in cursor.fetchall()]
+    cursor.execute(DELETE_BY_ID_SQL.format(table=table, placeholders=placeholders), [g.user_id] + ids)
+    deleted = cursor.rowcount
+    for date in dates:
+        refresh_rollups(cursor, series, g.user_id, date)
+    db.commit()
+    return jsonify({"message": f"{series.capitalize()} data deleted", "deleted": deleted}), 200
+
 @app.route('/data/glucose', methods=['GET', 'POST', 'DELETE'])
 @require_auth
 def glucose_data():
@@ -369,10 +911,7 @@ def glucose_data():
     cursor = db.cursor()
 
     if request.method == 'GET':
-        cursor.execute('SELECT date, value FROM glucose_data WHERE user_id = ? ORDER BY date',
-                       (g.user_id,))
-        rows = cursor.fetchall()
-        return jsonify([{"date": row[0], "value": row[1]} for row in rows]), 200
+        return list_user_rows('glucose')
 
     elif request.method == 'POST':
         data = request.get_json()
@@ -384,17 +923,24 @@ def glucose_data():
 
         cursor.execute('INSERT INTO glucose_data (user_id, date, value) VALUES (?, ?, ?)',
                        (g.user_id, date, value))
-        db.commit()
-
+        row_id = cursor.lastrowid
+        refresh_rollups(cursor, 'glucose', g.user_id, date)
         update_streak(g.user_id, date)
+        db.commit()
 
-        return jsonify({"message": "Glucose data added"}), 201
+        return jsonify({"message": "Glucose data added", "id": row_id}), 201
 
     elif request.method == 'DELETE':
         data = request.get_json()
+        if not isinstance(data, dict):
+            return jsonify({"error": "Expected a JSON object"}), 400
+        if 'id' in data or 'ids' in data:
+            return delete_rows_by_id('glucose', data)
         date = data.get('date')
-        cursor.execute('DELETE FROM glucose_data WHERE user_id = ? AND date = ?',
-                       (g.user_id, date))
+        if not date:
+            return jsonify({"error": "id, ids or date required"}), 400
+        cursor.execute(DELETE_GLUCOSE_DATE_SQL, (g.user_id, date))
+        refresh_rollups(cursor, 'glucose', g.user_id, date)
         db.commit()
         return jsonify({"message": "Glucose data deleted"}), 200
 
@@ -405,15 +951,7 @@ def nutrition_data_endpoint():
     cursor = db.cursor()
 
     if request.method == 'GET':
-        cursor.execute('''SELECT date, name, servings, carbs, protein, fat, fiber, calories
-                          FROM nutrition_data WHERE user_id = ? ORDER BY date''',
-                       (g.user_id,))
-        rows = cursor.fetchall()
-        return jsonify([{
-            "date": row[0], "name": row[1], "servings": row[2],
-            "carbs": row[3], "protein": row[4], "fat": row[5],
-            "fiber": row[6], "calories": row[7]
-        } for row in rows]), 200
+        return list_user_rows('nutrition')
 
     elif request.method == 'POST':
         data = request.get_json()
@@ -422,22 +960,18 @@ def nutrition_data_endpoint():
                           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
                        (g.user_id, data['date'], data['name'], data['servings'],
                         data['carbs'], data['protein'], data['fat'], data['fiber'], data['calories']))
-        db.commit()
-
+        row_id = cursor.lastrowid
+        refresh_rollups(cursor, 'nutrition', g.user_id, data['date'])
         update_streak(g.user_id, data['date'])
+        db.commit()
 
-        return jsonify({"message": "Nutrition data added"}), 201
+        return jsonify({"message": "Nutrition data added", "id": row_id}), 201
 
     elif request.method == 'DELETE':
         data = request.get_json()
-        idx = data.get('index')
-        cursor.execute('''SELECT id FROM nutrition_data WHERE user_id = ? ORDER BY date''',
-                       (g.user_id,))
-        rows = cursor.fetchall()
-        if idx < len(rows):
-            cursor.execute('DELETE FROM nutrition_data WHERE id = ?', (rows[idx][0],))
-            db.commit()
-        return jsonify({"message": "Nutrition data deleted"}), 200
+        if not isinstance(data, dict):
+            return jsonify({"error": "Expected a JSON object"}), 400
+        return delete_rows_by_id('nutrition', data)
 
 @app.route('/data/activity', methods=['GET', 'POST', 'DELETE'])
 @require_auth
@@ -446,13 +980,7 @@ def activity_data_endpoint():
     cursor = db.cursor()
 
     if request.method == 'GET':
-        cursor.execute('''SELECT date, minutes, type, calories
-                          FROM activity_data WHERE user_id = ? ORDER BY date''',
-                       (g.user_id,))
-        rows = cursor.fetchall()
-        return jsonify([{
-            "date": row[0], "minutes": row[1], "type": row[2], "calories": row[3]
-        } for row in rows]), 200
+        return list_user_rows('activity')
 
     elif request.method == 'POST':
         data = request.get_json()
@@ -461,22 +989,18 @@ def activity_data_endpoint():
                           VALUES (?, ?, ?, ?, ?)''',
                        (g.user_id, data['date'], data['minutes'], data['type'],
                         data.get('calories')))
-        db.commit()
-
+        row_id = cursor.lastrowid
+        refresh_rollups(cursor, 'activity', g.user_id, data['date'])
         update_streak(g.user_id, data['date'])
+        db.commit()
 
-        return jsonify({"message": "Activity data added"}), 201
+        return jsonify({"message": "Activity data added", "id": row_id}), 201
 
     elif request.method == 'DELETE':
         data = request.get_json()
-        idx = data.get('index')
-        cursor.execute('''SELECT id FROM activity_data WHERE user_id = ? ORDER BY date''',
-                       (g.user_id,))
-        rows = cursor.fetchall()
-        if idx < len(rows):
-            cursor.execute('DELETE FROM activity_data WHERE id = ?', (rows[idx][0],))
-            db.commit()
-        return jsonify({"message": "Activity data deleted"}), 200
+        if not isinstance(data, dict):
+            return jsonify({"error": "Expected a JSON object"}), 400
+        return delete_rows_by_id('activity', data)
 
 @app.route('/data/weight', methods=['GET', 'POST', 'DELETE'])
 @require_auth
@@ -485,13 +1009,7 @@ def weight_data_endpoint():
     cursor = db.cursor()
 
     if request.method == 'GET':
-        cursor.execute('''SELECT date, weight
-                          FROM weight_data WHERE user_id = ? ORDER BY date''',
-                       (g.user_id,))
-        rows = cursor.fetchall()
-        return jsonify([{
-            "date": row[0], "weight": row[1]
-        } for row in rows]), 200
+        return list_user_rows('weight')
 
     elif request.method == 'POST':
         data = request.get_json()
@@ -499,22 +1017,142 @@ def weight_data_endpoint():
                           (user_id, date, weight)
                           VALUES (?, ?, ?)''',
                        (g.user_id, data['date'], data['weight']))
-        db.commit()
-
+        row_id = cursor.lastrowid
+        refresh_rollups(cursor, 'weight', g.user_id, data['date'])
         update_streak(g.user_id, data['date'])
+        db.commit()
 
-        return jsonify({"message": "Weight data added"}), 201
+        return jsonify({"message": "Weight data added", "id": row_id}), 201
 
     elif request.method == 'DELETE':
         data = request.get_json()
-        idx = data.get('index')
-        cursor.execute('''SELECT id FROM weight_data WHERE user_id = ? ORDER BY date''',
-                       (g.user_id,))
-        rows = cursor.fetchall()
-        if idx < len(rows):
-            cursor.execute('DELETE FROM weight_data WHERE id = ?', (rows[idx][0],))
-            db.commit()
-        return jsonify({"message": "Weight data deleted"}), 200
+        if not isinstance(data, dict):
+            return jsonify({"error": "Expected a JSON object"}), 400
+        return delete_rows_by_id('weight', data)
+
+# ================================================================
+# Bulk import
+# ================================================================
+# POST /data/<series>/bulk takes a JSON array (or {"rows": [...]}), NDJSON
+# (application/x-ndjson) or CSV (text/csv body or a multipart "file") of
+# rows shaped like the single-row POST. Invalid rows are skipped and
+# reported. Rows identical to ones already stored are skipped too (counted
+# per copy), so re-uploading the same device export is a no-op. Everything
+# is written in one transaction; rollups are refreshed once per distinct
+# date and the streak/milestones are recomputed once.
+BULK_IMPORT_MAX = int(os.environ.get('BULK_IMPORT_MAX', 50000))
+BULK_EXISTING_SQL = 'SELECT {columns} FROM {table} WHERE user_id = ? AND date >= ? AND date <= ?'
+
+def _bulk_date(value):
+    value = str(value).strip()
+    datetime.strptime(value, '%Y-%m-%d')
+    return value
+
+def _bulk_number(value):
+    number = float(value)
+    if number != number or number in (float('inf'), float('-inf')):
+        raise ValueError(f"not a finite number: {value!r}")
+    return number
+
+def _bulk_int(value):
+    number = _bulk_number(value)
+    if number != int(number):
+        raise ValueError(f"not an integer: {value!r}")
+    return int(number)
+
+def _bulk_optional_int(value):
+    return None if value is None or str(value).strip() == '' else _bulk_int(value)
+
+def _bulk_text(value):
+    value = '' if value is None else str(value).strip()
+    if not value:
+        raise ValueError("empty text")
+    return value
+
+BULK_FIELDS = {
+    'glucose': [('date', _bulk_date), ('value', _bulk_number)],
+    'nutrition': [('date', _bulk_date), ('name', _bulk_text), ('servings', _bulk_number),
+                  ('carbs', _bulk_number), ('protein', _bulk_number), ('fat', _bulk_number),
+                  ('fiber', _bulk_number), ('calories', _bulk_number)],
+    'activity': [('date', _bulk_date), ('minutes', _bulk_int), ('type', _bulk_text),
+                 ('calories', _bulk_optional_int)],
+    'weight': [('date', _bulk_date), ('weight', _bulk_number)],
+}
+
+def parse_bulk_body():
+    """Raw row dicts from the request body, whatever the upload format."""
+    upload = request.files.get('file')
+    content_type = (upload.mimetype if upload else request.mimetype) or ''
+    raw = upload.read() if upload else request.get_data()
+    text = raw.decode('utf-8-sig')
+    if 'csv' in content_type or (upload and upload.filename.lower().endswith('.csv')):
+        return list(csv.DictReader(io.StringIO(text)))
+    if 'ndjson' in content_type or 'jsonl' in content_type:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    data = json.loads(text)
+    return data.get('rows', []) if isinstance(data, dict) else data
+
+@app.route('/data/<series>/bulk', methods=['POST'])
+@require_auth
+def bulk_import(series):
+    if series not in BULK_FIELDS:
+        return jsonify({"error": f"Unknown series '{series}'"}), 404
+    try:
+        raw_rows = parse_bulk_body()
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({"error": f"Could not parse upload: {e}"}), 400
+    if not isinstance(raw_rows, list):
+        return jsonify({"error": "Expected an array of rows"}), 400
+    if len(raw_rows) > BULK_IMPORT_MAX:
+        return jsonify({"error": f"At most {BULK_IMPORT_MAX} rows per import"}), 413
+
+    fields = BULK_FIELDS[series]
+    rows, errors = [], []
+    for i, raw in enumerate(raw_rows):
+        try:
+            if not isinstance(raw, dict):
+                raise ValueError("row is not an object")
+            rows.append(tuple(parse(raw.get(name)) for name, parse in fields))
+        except (TypeError, ValueError) as e:
+            errors.append({"row": i, "error": str(e)})
+    if not rows:
+        return jsonify({"error": "No valid rows", "errors": errors[:50]}), 400
+
+    table = USER_SERIES[series][0]
+    columns = ', '.join(name for name, _ in fields)
+    dates = sorted({row[0] for row in rows})
+
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        cursor.execute(BULK_EXISTING_SQL.format(columns=columns, table=table), (g.user_id, dates[0], dates[-1]))
+        existing = Counter(tuple(row) for row in cursor.fetchall())
+        new_rows = []
+        for row in rows:
+            if existing[row] > 0:
+                existing[row] -= 1
+            else:
+                new_rows.append(row)
+
+        cursor.executemany(f'INSERT INTO {table} (user_id, {columns}) VALUES (?, {", ".join("?" * len(fields))})',
+                           [(g.user_id,) + row for row in new_rows])
+        new_dates = sorted({row[0] for row in new_rows})
+        for date in new_dates:
+            refresh_rollups(cursor, series, g.user_id, date)
+        update_streak_for_dates(g.user_id, new_dates)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return jsonify({
+        "inserted": len(new_rows),
+        "duplicates": len(rows) - len(new_rows),
+        "invalid": len(errors),
+        "errors": errors[:50],
+        "dates": len(new_dates)
+    }), 201
 
 @app.route('/data/risk', methods=['GET', 'POST'])
 @require_auth
@@ -523,19 +1161,7 @@ def risk_data_endpoint():
     cursor = db.cursor()
 
     if request.method == 'GET':
-        cursor.execute('''SELECT probability, risk_level, created_at
-                          FROM risk_assessments WHERE user_id = ?
-                          ORDER BY created_at DESC LIMIT 1''',
-                       (g.user_id,))
-        row = cursor.fetchone()
-        if row:
-            return jsonify({
-                "probability": row[0],
-                "risk_level": row[1],
-                "created_at": row[2]
-            }), 200
-        else:
-            return jsonify(None), 200
+        return cached_response(cursor, 'risk', read_latest_risk)
 
     elif request.method == 'POST':
         data = request.get_json()
@@ -543,6 +1169,7 @@ def risk_data_endpoint():
                           (user_id, probability, risk_level)
                           VALUES (?, ?, ?)''',
                        (g.user_id, data['probability'], data['risk_level']))
+        bump_version(cursor, g.user_id, 'risk')
         db.commit()
         return jsonify({"message": "Risk assessment saved"}), 201
 
@@ -553,22 +1180,7 @@ def goals_data_endpoint():
     cursor = db.cursor()
 
     if request.method == 'GET':
-        cursor.execute('''SELECT glucose_min, glucose_max, calorie_target, carb_target,
-                          activity_weekly_minutes, weight_target
-                          FROM goals WHERE user_id = ?''',
-                       (g.user_id,))
-        row = cursor.fetchone()
-        if row:
-            return jsonify({
-                "glucose_min": row[0],
-                "glucose_max": row[1],
-                "calorie_target": row[2],
-                "carb_target": row[3],
-                "activity_weekly_minutes": row[4],
-                "weight_target": row[5]
-            }), 200
-        else:
-            return jsonify(None), 200
+        return cached_response(cursor, 'goals', read_goals)
 
     elif request.method == 'POST':
         data = request.get_json()
@@ -595,34 +1207,149 @@ def goals_data_endpoint():
                             data.get('calorie_target'), data.get('carb_target'),
                             data.get('activity_weekly_minutes'), data.get('weight_target')))
 
+        # Time-in-range rollups depend on the glucose goals.
+        refresh_rollups(cursor, 'glucose', g.user_id)
+        bump_version(cursor, g.user_id, 'goals')
         db.commit()
         return jsonify({"message": "Goals saved"}), 200
 
+PREDICT_REQUIRED_FIELDS = ["RIAGENDR", "RIDAGEYR", "RIDRETH1", "BMXWT", "BMXHT"]
+
+def prepare_predict_payload(payload):
+    if not isinstance(payload, dict):
+        return None, "Payload must be a JSON object"
+
+    missing = [f for f in PREDICT_REQUIRED_FIELDS if f not in payload]
+    if missing:
+        return None, f"Missing required fields: {missing}"
+
+    # Coerce every model feature to float here, so one malformed payload is a
+    # 400 for its own request instead of failing a shared scoring batch.
+    features = {}
+    for k in set(risk_scorer.feature_names) | set(PREDICT_REQUIRED_FIELDS):
+        v = payload.get(k)
+        if v is None:
+            continue
+        try:
+            if isinstance(v, bool):
+                raise ValueError
+            v = float(v)
+        except (TypeError, ValueError):
+            return None, f"Field {k} must be a number"
+        if not math.isfinite(v):
+            return None, f"Field {k} must be a finite number"
+        features[k] = v
+
+    if features.get("BMXBMI") is None and "BMXWT" in features and features.get("BMXHT"):
+        height_m = features["BMXHT"] / 100.0
+        features["BMXBMI"] = features["BMXWT"] / (height_m ** 2)
+
+    return features, None
+
 @app.route('/predict', methods=['POST'])
 def predict():
-    if bundle is None:
+    if not model_loaded:
         return jsonify({"error": "Model not loaded"}), 500
 
     try:
-        payload = request.get_json()
+        payload, error = prepare_predict_payload(request.get_json())
+        if error:
+            return jsonify({"error": error}), 400
 
-        required_fields = ["RIAGENDR", "RIDAGEYR", "RIDRETH1", "BMXWT", "BMXHT"]
-        missing = [f for f in required_fields if f not in payload]
-        if missing:
-            return jsonify({"error": f"Missing required fields: {missing}"}), 400
+        if micro_batcher is not None:
+            result = micro_batcher.predict(payload)
+        else:
+            result = risk_scorer.predict_one(payload)
 
-        if "BMXBMI" not in payload or payload["BMXBMI"] is None:
-            weight = payload["BMXWT"]
-            height_m = payload["BMXHT"] / 100.0
-            payload["BMXBMI"] = weight / (height_m ** 2)
+        return jsonify(result), 200
 
-        result = predict_one(payload, bundle=bundle)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        return jsonify(result), 200
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch_endpoint():
+    if not model_loaded:
+        return jsonify({"error": "Model not loaded"}), 500
+
+    try:
+        data = request.get_json()
+        payloads = data.get('payloads') if isinstance(data, dict) else data
+        if not isinstance(payloads, list):
+            return jsonify({"error": "Expected a JSON array of payloads"}), 400
+        if len(payloads) > PREDICT_BATCH_MAX:
+            return jsonify({"error": f"Batch too large (max {PREDICT_BATCH_MAX})"}), 400
+
+        prepared = []
+        for i, payload in enumerate(payloads):
+            payload, error = prepare_predict_payload(payload)
+            if error:
+                return jsonify({"error": f"Payload {i}: {error}"}), 400
+            prepared.append(payload)
+
+        results = risk_scorer.predict_many(prepared)
+
+        return jsonify({"results": results}), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# One pooled OpenAI client per worker for every /analyze-* call; see llm_client.py.
+llm = LLMClient.from_env()
+
+# Persistent cache of /analyze-food and /analyze-activity results; see llm_cache.py.
+LLM_CACHE_ENABLED = os.environ.get('LLM_CACHE', '1') != '0'
+LLM_CACHE_DB = os.environ.get('LLM_CACHE_DB', 'llm_cache.db')
+LLM_CACHE_TTL_DAYS = float(os.environ.get('LLM_CACHE_TTL_DAYS', 30))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 50000))
+LLM_CACHE_SIMILARITY = float(os.environ.get('LLM_CACHE_SIMILARITY', 0))
+
+analysis_cache = AnalysisCache(LLM_CACHE_DB, ttl_days=LLM_CACHE_TTL_DAYS, max_entries=LLM_CACHE_MAX_ENTRIES,
+                               similarity=LLM_CACHE_SIMILARITY,
+                               busy_timeout_ms=SQLITE_BUSY_TIMEOUT_MS) if LLM_CACHE_ENABLED else None
+
+# kind -> (prompt builder, prompt version, shape check applied before caching or None)
+ANALYSIS_KINDS = {
+    'food': (food_request, prompt_version(food_request), food_items),
+    'activity': (activity_request, prompt_version(activity_request), None),
+}
+
+# Foods in foods.csv are resolved locally; only the rest of a meal reaches the LLM.
+NUTRITION_LOCAL = os.environ.get('NUTRITION_LOCAL', '1') != '0'
+
+nutrition_index = None
+if NUTRITION_LOCAL:
+    try:
+        nutrition_index = NutritionIndex.load(os.environ.get('NUTRITION_CSV', NUTRITION_CSV))
+    except Exception as e:
+        print(f"Failed to load nutrition index: {e}")
+
+def split_meal(description):
+    """(foods resolved from the local index, text still to send to the LLM or None)."""
+    if nutrition_index is None:
+        return [], description
+    foods, unresolved = nutrition_index.analyze(description)
+    return foods, ', '.join(unresolved) or None
+
+def cached_analysis(kind, description):
+    """Parsed LLM answer for a food/activity description, from the cache when possible.
+
+    Cache hits are served without OPENAI_API_KEY; a miss without it raises
+    LLMKeyMissingError.
+    """
+    build, version, check = ANALYSIS_KINDS[kind]
+    if analysis_cache is not None:
+        result = analysis_cache.get(kind, version, description)
+        if result is not None:
+            return check(result) if check else result
+    require_api_key()
+    t0 = time.perf_counter()
+    result = parse_reply(llm.complete(build(description)))
+    if check:
+        result = check(result)
+    if analysis_cache is not None:
+        analysis_cache.put(kind, version, description, result, time.perf_counter() - t0)
+    return result
+
 @app.route('/analyze-food', methods=['POST'])
 def analyze_food():
     try:
@@ -632,57 +1359,15 @@ def analyze_food():
         if not description:
             return jsonify({"error": "No description provided"}), 400
 
-        api_key = os.environ.get('OPENAI_API_KEY')
-        if not api_key:
-            return jsonify({"error": "OPENAI_API_KEY not set"}), 500
-
-        client = OpenAI(api_key=api_key)
-
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a nutrition expert. Analyze food descriptions and return nutritional data in JSON format only, with no additional text."
-                },
-                {
-                    "role": "user",
-                    "content": f"""Analyze this food description and extract nutritional information for each food item mentioned.
-
-Food description: {description}
-
-Return ONLY a valid JSON array with no additional text, where each item has:
-- name: descriptive name of the food
-- carbs: carbohydrates in grams
-- protein: protein in grams
-- fat: fat in grams
-- fiber: fiber in grams
-- calories: total calories
-
-Example format:
-[
-  {{"name": "Turkey Sandwich", "carbs": 35, "protein": 25, "fat": 8, "fiber": 3, "calories": 320}},
-  {{"name": "Potato Chips (1 oz)", "carbs": 15, "protein": 2, "fat": 10, "fiber": 1, "calories": 150}}
-]
-
-Provide reasonable estimates for typical serving sizes."""
-                }
-            ],
-            temperature=0.7,
-            max_tokens=1024
-        )
-
-        response_text = response.choices[0].message.content.strip()
-
-        if response_text.startswith('```'):
-            lines = response_text.split('\n')
-            response_text = '\n'.join(lines[1:-1])
-
-        foods = json.loads(response_text)
+        foods, remainder = split_meal(description)
+        if remainder is not None:
+            foods += cached_analysis('food', remainder)
 
         return jsonify({"foods": foods}), 200
 
-    except json.JSONDecodeError as e:
+    except LLMBusyError as e:
+        return jsonify({"error": str(e)}), 503
+    except (json.JSONDecodeError, ReplyFormatError) as e:
         return jsonify({"error": f"Failed to parse AI response: {str(e)}"}), 500
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -696,60 +1381,13 @@ def analyze_activity():
         if not description:
             return jsonify({"error": "No description provided"}), 400
 
-        api_key = os.environ.get('OPENAI_API_KEY')
-        if not api_key:
-            return jsonify({"error": "OPENAI_API_KEY not set"}), 500
-
-        client = OpenAI(api_key=api_key)
-
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a fitness expert. Analyze activity descriptions and calculate calories burned based on typical metabolic equivalents (METs). Return JSON only."
-                },
-                {
-                    "role": "user",
-                    "content": f"""Analyze this activity description and calculate calories burned.
-
-Activity description: {description}
-
-Return ONLY a valid JSON object with no additional text:
-{{
-  "activity_type": "the activity name (e.g., Basketball, Running, Yoga)",
-  "minutes": duration in minutes,
-  "calories": estimated calories burned (use standard MET values for average adult)
-}}
-
-Use typical MET values:
-- Walking (3 mph): 3.5 METs (~4 cal/min)
-- Running (6 mph): 10 METs (~11 cal/min)
-- Cycling (moderate): 8 METs (~9 cal/min)
-- Swimming: 8 METs (~9 cal/min)
-- Basketball: 6.5 METs (~7 cal/min)
-- Yoga: 2.5 METs (~3 cal/min)
-- Strength training: 5 METs (~6 cal/min)
-- Sports (general): 7 METs (~8 cal/min)
-
-Calculate calories as: minutes × calories_per_minute for the activity type."""
-                }
-            ],
-            temperature=0.5,
-            max_tokens=256
-        )
-
-        response_text = response.choices[0].message.content.strip()
-
-        if response_text.startswith('```'):
-            lines = response_text.split('\n')
-            response_text = '\n'.join(lines[1:-1])
-
-        result = json.loads(response_text)
+        result = cached_analysis('activity', description)
 
         return jsonify(result), 200
 
-    except json.JSONDecodeError as e:
+    except LLMBusyError as e:
+        return jsonify({"error": str(e)}), 503
+    except (json.JSONDecodeError, ReplyFormatError) as e:
         return jsonify({"error": f"Failed to parse AI response: {str(e)}"}), 500
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -767,76 +1405,14 @@ def analyze_barcode_photo():
         if not api_key:
             return jsonify({"error": "OPENAI_API_KEY not set"}), 500
 
-        client = OpenAI(api_key=api_key)
-
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert at reading nutrition labels and product information. Extract nutritional data directly from photos when possible."
-                },
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": """Look at this product image and extract all available information:
-
-1. CAREFULLY read the COMPLETE barcode number below the barcode lines
-   - UPC-A barcodes have 12 digits
-   - EAN-13 barcodes have 13 digits
-   - Look for ALL digits including those on the far left and right edges
-   - Common mistake: missing the first 1-2 digits - please check the edges carefully
-2. If Nutrition Facts label is visible, extract the nutrition values EXACTLY as shown
-3. Get the product name if visible
-
-Return ONLY valid JSON with no additional text:
-
-{
-  "barcode": "COMPLETE barcode number with ALL digits (usually 12-13 digits), null if not visible",
-  "product_name": "name of product if visible",
-  "servings": estimated servings in container,
-  "has_nutrition_label": true or false,
-  "nutrition": {
-    "calories": calories per serving (if label visible),
-    "carbs": carbs in grams per serving (if label visible),
-    "protein": protein in grams per serving (if label visible),
-    "fat": fat in grams per serving (if label visible),
-    "fiber": fiber in grams per serving (if label visible)
-  },
-  "confidence": "high" or "medium" or "low"
-}
-
-IMPORTANT:
-- UPC barcodes should have exactly 12 digits - if you only see 10-11 digits, look more carefully at the edges
-- Read the ENTIRE number from left edge to right edge
-- If nutrition label is not visible, set has_nutrition_label to false
-- Always try to extract the complete barcode even if nutrition label is visible"""
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": image_data
-                            }
-                        }
-                    ]
-                }
-            ],
-            max_tokens=500
-        )
-
-        response_text = response.choices[0].message.content.strip()
-
-        if response_text.startswith('```'):
-            lines = response_text.split('\n')
-            response_text = '\n'.join(lines[1:-1])
-
-        result = json.loads(response_text)
+        response = llm.complete(barcode_request(image_data))
+        result = parse_reply(response)
 
         return jsonify(result), 200
 
-    except json.JSONDecodeError as e:
+    except LLMBusyError as e:
+        return jsonify({"error": str(e)}), 503
+    except (json.JSONDecodeError, ReplyFormatError) as e:
         return jsonify({"error": f"Failed to parse AI response: {str(e)}"}), 500
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -854,95 +1430,214 @@ def analyze_goals():
         goals = data.get('goals', {})
         recent_data = data.get('recent_data', {})
 
-        prompt = f"""You are a diabetes prevention coach. Analyze the user's progress towards their health goals and provide encouraging, actionable insights for preventing diabetes.
-
-User's Goals:
-{json.dumps(goals, indent=2)}
-
-Recent Data (last 7 days):
-{json.dumps(recent_data, indent=2)}
-
-Provide a brief analysis in JSON format with these fields:
-{{
-  "overall_status": "on_track" | "needs_attention" | "excellent",
-  "summary": "2-3 sentence overall assessment",
-  "insights": [
-    {{
-      "category": "glucose" | "nutrition" | "activity" | "weight",
-      "status": "on_track" | "needs_improvement" | "excellent",
-      "message": "brief encouraging message with specific data"
-    }}
-  ],
-  "recommendations": ["actionable tip 1", "actionable tip 2"]
-}}
-
-Be encouraging, specific, and focus on progress. Use actual numbers from the data. Always include insights for weight if weight data exists, as weight loss is critical for diabetes prevention."""
-
-        client = OpenAI(api_key=api_key)
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a supportive diabetes management coach. Provide analysis in JSON format only."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=800
-        )
-
-        response_text = response.choices[0].message.content.strip()
-
-        if response_text.startswith('```'):
-            response_text = response_text.split('```')[1]
-            if response_text.startswith('json'):
-                response_text = response_text[4:]
-            response_text = response_text.strip()
-
-        analysis = json.loads(response_text)
+        response = llm.complete(goals_request(goals, recent_data))
+        analysis = parse_reply(response)
+
         return jsonify(analysis), 200
 
+    except LLMBusyError as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         print(f"Error in goal analysis: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/analyze-cache/stats', methods=['GET'])
+def analyze_cache_stats():
+    if analysis_cache is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify({"enabled": True, **analysis_cache.stats()}), 200
+
 @app.route('/data/streaks', methods=['GET'])
 @require_auth
 def get_streaks():
-    db = get_db()
-    cursor = db.cursor()
-
-    cursor.execute('''SELECT current_streak, longest_streak, last_activity_date
-                      FROM streaks WHERE user_id = ?''', (g.user_id,))
-    row = cursor.fetchone()
-
-    if row:
-        return jsonify({
-            "current_streak": row[0],
-            "longest_streak": row[1],
-            "last_activity_date": row[2]
-        }), 200
-    else:
-        return jsonify({
-            "current_streak": 0,
-            "longest_streak": 0,
-            "last_activity_date": None
-        }), 200
+    return cached_response(get_db().cursor(), 'streaks', read_streaks)
 
 @app.route('/data/milestones', methods=['GET'])
 @require_auth
 def get_milestones():
+    return cached_response(get_db().cursor(), 'milestones', read_milestones)
+
+# Everything the app loads after login in one request: one token check and
+# one read transaction, so all eight datasets come from the same snapshot.
+# since=YYYY-MM-DD limits the four time series to entries on or after it.
+@app.route('/data/dashboard', methods=['GET'])
+@require_auth
+def dashboard():
+    try:
+        since = _date_arg('since')
+    except ValueError:
+        return jsonify({"error": "since must be a YYYY-MM-DD date"}), 400
+
     db = get_db()
     cursor = db.cursor()
+    cursor.execute('BEGIN')
+    try:
+        payload = {name: read_user_series(cursor, g.user_id, name, since) for name in USER_SERIES}
+        payload.update({
+            "risk": read_latest_risk(cursor, g.user_id),
+            "goals": read_goals(cursor, g.user_id),
+            "streaks": read_streaks(cursor, g.user_id),
+            "milestones": read_milestones(cursor, g.user_id),
+            "since": since
+        })
+    finally:
+        db.rollback()
+    return jsonify(payload), 200
+
+# ================================================================
+# /data/summary
+# ================================================================
+# Per-day, per-week (Monday start) or per-month aggregates over an optional
+# from/to window, read from the daily_rollups table (see rollups.py) so the
+# cost is O(days) whatever the number of raw entries. Time in range uses the
+# user's goals.glucose_min/glucose_max.
+SUMMARY_BUCKETS = {
+    'daily': "date",
+    'weekly': "date(date, '-6 days', 'weekday 1')",
+    'monthly': "strftime('%Y-%m-01', date)",
+}
 
-    cursor.execute('''SELECT milestone_type, milestone_name, achieved_at
-                      FROM milestones WHERE user_id = ?
-                      ORDER BY achieved_at DESC''', (g.user_id,))
-    rows = cursor.fetchall()
+SUMMARY_SQL = '''SELECT {bucket} AS start, metric,
+                        SUM(count), SUM(total), MIN(min_value), MAX(max_value)
+                 FROM daily_rollups WHERE {where}
+                 GROUP BY start, metric ORDER BY start'''
+# Every reading of a day shares x, so the per-reading sums come from the
+# daily count/total.
+WEIGHT_TREND_SQL = '''SELECT SUM(count), SUM(x * count), SUM(total), SUM(x * total), SUM(x * x * count)
+                      FROM (SELECT julianday(date) - julianday('2000-01-01') AS x, count, total
+                            FROM daily_rollups WHERE {where} AND metric = 'weight')'''
+
+def _window(user_id, date_from, date_to):
+    where, args = ['user_id = ?'], [user_id]
+    if date_from:
+        where.append('date >= ?')
+        args.append(date_from)
+    if date_to:
+        where.append('date <= ?')
+        args.append(date_to)
+    return ' AND '.join(where), args
+
+def summarize_user(cursor, user_id, period='daily', date_from=None, date_to=None):
+    goals = read_goals(cursor, user_id) or {}
+    low, high = goals.get('glucose_min'), goals.get('glucose_max')
+    where, args = _window(user_id, date_from, date_to)
+    cursor.execute(SUMMARY_SQL.format(bucket=SUMMARY_BUCKETS[period], where=where), args)
+    metrics = {}
+    for start, metric, count, total, lo, hi in cursor.fetchall():
+        metrics.setdefault(start, {})[metric] = (count, total, lo, hi)
+
+    buckets, previous_weight = [], None
+    for start in sorted(metrics):
+        m = metrics[start]
+        bucket = {"start": start, "glucose": None, "nutrition": None, "activity": None, "weight": None}
+        if 'glucose' in m and m['glucose'][0]:
+            count, total, lo, hi = m['glucose']
+            below = m.get('glucose_below', (0,))[0] if low is not None else None
+            above = m.get('glucose_above', (0,))[0] if high is not None else None
+            bucket["glucose"] = {
+                "count": count, "mean": total / count, "min": lo, "max": hi,
+                "below": below, "above": above,
+                "time_in_range": (count - (below or 0) - (above or 0)) / count
+                                 if low is not None or high is not None else None
+            }
+        if 'calories' in m:
+            bucket["nutrition"] = {"entries": m['calories'][0]}
+            bucket["nutrition"].update({k: m[k][1] for k in ('calories', 'carbs', 'protein', 'fat', 'fiber')})
+        if 'activity_minutes' in m:
+            calories = m.get('activity_calories', (0, None))[1]
+            bucket["activity"] = {
+                "sessions": m['activity_minutes'][0],
+                "minutes": int(m['activity_minutes'][1]),
+                "calories": int(calories) if calories is not None else None
+            }
+        if 'weight' in m and m['weight'][0]:
+            count, total, lo, hi = m['weight']
+            mean = total / count
+            bucket["weight"] = {
+                "count": count, "mean": mean, "min": lo, "max": hi,
+                "change": mean - previous_weight if previous_weight is not None else None
+            }
+            previous_weight = mean
+        buckets.append(bucket)
+
+    return {
+        "period": period,
+        "from": date_from,
+        "to": date_to,
+        "glucose_min": low,
+        "glucose_max": high,
+        "buckets": buckets,
+        "weight_trend": weight_trend(cursor, user_id, date_from, date_to)
+    }
 
-    return jsonify([{
-        "type": row[0],
-        "name": row[1],
-        "achieved_at": row[2]
-    } for row in rows]), 200
+def weight_trend(cursor, user_id, date_from=None, date_to=None):
+    """Least-squares slope of weight over time, in weight units per week."""
+    where, args = _window(user_id, date_from, date_to)
+    cursor.execute(WEIGHT_TREND_SQL.format(where=where), args)
+    n, sx, sy, sxy, sxx = cursor.fetchone()
+    denom = n * sxx - sx * sx if n and n >= 2 else 0
+    if not denom:
+        return None
+    return {"readings": n, "per_week": (n * sxy - sx * sy) / denom * 7}
+
+@app.route('/data/summary', methods=['GET'])
+@require_auth
+def summary():
+    period = request.args.get('period', 'daily')
+    if period not in SUMMARY_BUCKETS:
+        return jsonify({"error": f"period must be one of {sorted(SUMMARY_BUCKETS)}"}), 400
+    try:
+        date_from, date_to = _date_arg('from'), _date_arg('to')
+    except ValueError:
+        return jsonify({"error": "from/to must be YYYY-MM-DD dates"}), 400
+
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute('BEGIN')
+    try:
+        result = summarize_user(cursor, g.user_id, period, date_from, date_to)
+    finally:
+        db.rollback()
+    return jsonify(result), 200
+
+# ================================================================
+# Query plan check
+# ================================================================
+# The per-request statements above with sample parameters. None of them may
+# plan a full table scan; tests/test_query_plans.py checks them with
+# migrations.check_query_plans (which covers streaks.py and rollups.py too).
+def _hot_queries():
+    queries = {
+        "auth_token": (AUTH_TOKEN_SQL, ("t",)),
+        "sweep_tokens": (SWEEP_TOKENS_SQL, (AUTH_SWEEP_BATCH,)),
+        "sweep_revoked": (SWEEP_REVOKED_SQL, (0,)),
+        "revoked_tokens": (REVOKED_TOKENS_SQL, (0,)),
+        "user_by_name": (USER_BY_NAME_SQL, ("u",)),
+        "data_version": (VERSION_SQL, (1, "goals")),
+        "bump_version": (BUMP_VERSION_SQL, (1, "goals")),
+        "latest_risk": (LATEST_RISK_SQL, (1,)),
+        "goals": (GOALS_SQL, (1,)),
+        "streaks": (STREAKS_SQL, (1,)),
+        "milestones": (MILESTONES_SQL, (1,)),
+        "glucose_delete_date": (DELETE_GLUCOSE_DATE_SQL, (1, "2024-01-01")),
+        "weight_trend": (WEIGHT_TREND_SQL.format(where=_window(1, "2024-01-01", "2024-12-31")[0]),
+                         (1, "2024-01-01", "2024-12-31")),
+    }
+    for period, bucket in SUMMARY_BUCKETS.items():
+        where, args = _window(1, "2024-01-01", "2024-12-31")
+        queries[f"summary_{period}"] = (SUMMARY_SQL.format(bucket=bucket, where=where), args)
+    for name, (table, _, _) in USER_SERIES.items():
+        sql, params = user_rows_query(name, 1, "2024-01-01", "2024-12-31", ("2024-02-01", 10))
+        queries[f"{name}_list"] = user_rows_query(name, 1)
+        queries[f"{name}_page"] = (sql + ' LIMIT ?', params + [DATA_PAGE_SIZE + 1])
+        queries[f"{name}_dates_by_id"] = (ROW_DATES_BY_ID_SQL.format(table=table, placeholders='?, ?'), (1, 10, 11))
+        queries[f"{name}_delete_by_id"] = (DELETE_BY_ID_SQL.format(table=table, placeholders='?, ?'), (1, 10, 11))
+        columns = ', '.join(field for field, _ in BULK_FIELDS[name])
+        queries[f"{name}_bulk_existing"] = (BULK_EXISTING_SQL.format(columns=columns, table=table),
+                                            (1, "2024-01-01", "2024-12-31"))
+    return queries
+
+HOT_QUERIES = _hot_queries()
 
 @app.route('/')
 @app.route('/<path:path>')
@@ -953,7 +1648,18 @@ def serve_frontend(path='index.html'):
 def health():
     return jsonify({
         "status": "healthy",
-        "model_loaded": bundle is not None
+        "model_loaded": model_loaded,
+        "model_id": model_id,
+        "predict_cache": predict_cache.stats() if predict_cache is not None else None,
+        "risk_grid": risk_grid.stats() if risk_grid is not None else None,
+        "db_pool": db_pool.stats(),
+        "auth_cache": token_cache.stats(),
+        "auth_sweeper": token_sweeper.stats(),
+        "auth_denylist": token_denylist.stats(),
+        "response_cache": response_cache.stats(),
+        "openai": llm.stats(),
+        "llm_cache": analysis_cache.stats() if analysis_cache is not None else None,
+        "nutrition_index": nutrition_index.stats() if nutrition_index is not None else None
     }), 200
 
 if __name__ == '__main__':
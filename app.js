@@ -106,18 +106,85 @@ let currentGoals = null;
 let currentStreaks = null;
 let currentMilestones = [];
 
+// Days of history each view mode shows, ending at (and including) its anchor date.
+const VIEW_DAYS = { day: 1, today: 1, week: 7, month: 30, year: 365 };
+
+function shiftDate(dateString, days) {
+    const date = new Date(dateString + 'T00:00:00');
+    date.setDate(date.getDate() + days);
+    return getLocalDateString(date);
+}
+
+// { from, to } (YYYY-MM-DD, inclusive) for a view mode ending at anchor.
+function viewWindow(mode, anchor = getLocalDateString()) {
+    return { from: shiftDate(anchor, 1 - (VIEW_DAYS[mode] || 1)), to: anchor };
+}
+
+// The window each series' chart currently shows. Nutrition, activity and
+// weight end at their selected date so the day list under the chart always
+// falls inside it.
+function seriesWindow(name) {
+    switch (name) {
+        case 'glucose':
+            return viewWindow(glucoseViewMode);
+        case 'nutrition':
+            return viewWindow(nutritionChartMode === 'pie' ? 'today' : nutritionViewMode, selectedNutritionDate);
+        case 'activity':
+            return viewWindow(activityViewMode, selectedActivityDate);
+        case 'weight':
+            return viewWindow(weightViewMode, selectedWeightDate);
+    }
+}
+
+function windowRows(rows, { from, to }) {
+    return rows.filter(d => d.date >= from && d.date <= to);
+}
+
+function setSeries(name, rows) {
+    switch (name) {
+        case 'glucose': glucoseData = rows; break;
+        case 'nutrition': nutritionData = rows; break;
+        case 'activity': activityData = rows; break;
+        case 'weight': weightData = rows; break;
+    }
+}
+
+const seriesFetchers = {
+    glucose: auth.fetchGlucoseData,
+    nutrition: auth.fetchNutritionData,
+    activity: auth.fetchActivityData,
+    weight: auth.fetchWeightData
+};
+
+// Re-fetch one series for its current window, after its view mode or
+// selected date changes.
+async function loadSeries(name) {
+    if (!auth.isLoggedIn()) return;
+
+    try {
+        setSeries(name, await seriesFetchers[name](seriesWindow(name)));
+    } catch (error) {
+        console.error(`Error loading ${name} data:`, error);
+        if (error.message.includes('Session expired')) {
+            showLoginScreen();
+        }
+    }
+}
+
 async function loadAllData() {
     if (!auth.isLoggedIn()) return;
 
     try {
-        glucoseData = await auth.fetchGlucoseData();
-        nutritionData = await auth.fetchNutritionData();
-        activityData = await auth.fetchActivityData();
-        weightData = await auth.fetchWeightData();
-        currentRiskData = await auth.fetchRiskData();
-        currentGoals = await auth.fetchGoals();
-        currentStreaks = await auth.fetchStreaks();
-        currentMilestones = await auth.fetchMilestones();
+        // One request for everything, bounded below by the earliest window
+        // any chart shows; each series then keeps just its own window.
+        const windows = Object.keys(seriesFetchers).map(name => [name, seriesWindow(name)]);
+        const since = windows.map(([, win]) => win.from).sort()[0];
+        const dashboard = await auth.fetchDashboard(since);
+        windows.forEach(([name, win]) => setSeries(name, windowRows(dashboard[name], win)));
+        currentRiskData = dashboard.risk;
+        currentGoals = dashboard.goals;
+        currentStreaks = dashboard.streaks;
+        currentMilestones = dashboard.milestones;
     } catch (error) {
         console.error('Error loading data:', error);
         if (error.message.includes('Session expired')) {
@@ -169,45 +236,12 @@ function generateGlucoseData() {
         return { labels: [], data: [] };
     }
 
-    // Sort by date
-    const sortedData = [...glucoseData].sort((a, b) => new Date(a.date + 'T00:00:00') - new Date(b.date + 'T00:00:00'));
-
-    // Filter based on view mode
-    const now = new Date();
-    let filteredData = sortedData;
-
-    switch(glucoseViewMode) {
-        case 'day':
-            // Last 24 hours
-            const oneDayAgo = new Date(now);
-            oneDayAgo.setDate(oneDayAgo.getDate() - 1);
-            filteredData = sortedData.filter(d => new Date(d.date + 'T00:00:00') >= oneDayAgo);
-            break;
-        case 'week':
-            // Last 7 days
-            const oneWeekAgo = new Date(now);
-            oneWeekAgo.setDate(oneWeekAgo.getDate() - 7);
-            filteredData = sortedData.filter(d => new Date(d.date + 'T00:00:00') >= oneWeekAgo);
-            break;
-        case 'month':
-            // Last 30 days
-            const oneMonthAgo = new Date(now);
-            oneMonthAgo.setDate(oneMonthAgo.getDate() - 30);
-            filteredData = sortedData.filter(d => new Date(d.date + 'T00:00:00') >= oneMonthAgo);
-            break;
-        case 'year':
-            // Last 365 days
-            const oneYearAgo = new Date(now);
-            oneYearAgo.setDate(oneYearAgo.getDate() - 365);
-            filteredData = sortedData.filter(d => new Date(d.date + 'T00:00:00') >= oneYearAgo);
-            break;
-    }
-
-    const labels = filteredData.map(d => {
+    // glucoseData already holds just the view mode's window, in date order
+    const labels = glucoseData.map(d => {
         const date = new Date(d.date + 'T00:00:00');
         return date.toLocaleDateString('en-US', { month: 'short', day: 'numeric' });
     });
-    const data = filteredData.map(d => d.value);
+    const data = glucoseData.map(d => d.value);
     return { labels, data };
 }
 
@@ -220,45 +254,9 @@ function generateNutritionData() {
         };
     }
 
-    // Filter based on chart mode and view mode
-    let filteredFoods = nutritionData;
-
-    // When in pie chart mode (Today), only show selected date
-    if (nutritionChartMode === 'pie') {
-        filteredFoods = nutritionData.filter(item => item.date === selectedNutritionDate);
-    } else {
-        // When in line chart mode (History), filter by time range
-        const selectedDate = new Date(selectedNutritionDate + 'T00:00:00');
-
-        switch(nutritionViewMode) {
-            case 'week':
-                const oneWeekAgo = new Date(selectedDate);
-                oneWeekAgo.setDate(oneWeekAgo.getDate() - 7);
-                filteredFoods = nutritionData.filter(item => {
-                    const itemDate = new Date(item.date + 'T00:00:00');
-                    return itemDate >= oneWeekAgo && itemDate <= selectedDate;
-                });
-                break;
-            case 'month':
-                const oneMonthAgo = new Date(selectedDate);
-                oneMonthAgo.setDate(oneMonthAgo.getDate() - 30);
-                filteredFoods = nutritionData.filter(item => {
-                    const itemDate = new Date(item.date + 'T00:00:00');
-                    return itemDate >= oneMonthAgo && itemDate <= selectedDate;
-                });
-                break;
-            case 'year':
-                const oneYearAgo = new Date(selectedDate);
-                oneYearAgo.setDate(oneYearAgo.getDate() - 365);
-                filteredFoods = nutritionData.filter(item => {
-                    const itemDate = new Date(item.date + 'T00:00:00');
-                    return itemDate >= oneYearAgo && itemDate <= selectedDate;
-                });
-                break;
-        }
-    }
-
-    const totals = filteredFoods.reduce((acc, item) => {
+    // nutritionData already holds just the selected date (pie) or the
+    // view mode's window ending at it (line)
+    const totals = nutritionData.reduce((acc, item) => {
         acc.carbs += item.carbs;
         acc.protein += item.protein;
         acc.fat += item.fat;
@@ -291,49 +289,15 @@ function generateNutritionHistoryData() {
         dateMap[item.date].fat += item.fat;
     });
 
-    // Sort by date
-    const sortedDates = Object.keys(dateMap).sort((a, b) => new Date(a + 'T00:00:00') - new Date(b + 'T00:00:00'));
-
-    // Filter based on view mode and selected date
-    const selectedDate = new Date(selectedNutritionDate + 'T00:00:00');
-    let filteredDates = sortedDates;
-
-    switch(nutritionViewMode) {
-        case 'today':
-            filteredDates = sortedDates.filter(d => d === selectedNutritionDate);
-            break;
-        case 'week':
-            const oneWeekAgo = new Date(selectedDate);
-            oneWeekAgo.setDate(oneWeekAgo.getDate() - 7);
-            filteredDates = sortedDates.filter(d => {
-                const itemDate = new Date(d + 'T00:00:00');
-                return itemDate >= oneWeekAgo && itemDate <= selectedDate;
-            });
-            break;
-        case 'month':
-            const oneMonthAgo = new Date(selectedDate);
-            oneMonthAgo.setDate(oneMonthAgo.getDate() - 30);
-            filteredDates = sortedDates.filter(d => {
-                const itemDate = new Date(d + 'T00:00:00');
-                return itemDate >= oneMonthAgo && itemDate <= selectedDate;
-            });
-            break;
-        case 'year':
-            const oneYearAgo = new Date(selectedDate);
-            oneYearAgo.setDate(oneYearAgo.getDate() - 365);
-            filteredDates = sortedDates.filter(d => {
-                const itemDate = new Date(d + 'T00:00:00');
-                return itemDate >= oneYearAgo && itemDate <= selectedDate;
-            });
-            break;
-    }
+    // Sort by date (nutritionData only covers the view mode's window)
+    const dates = Object.keys(dateMap).sort();
 
-    const labels = filteredDates.map(d => {
+    const labels = dates.map(d => {
         const date = new Date(d + 'T00:00:00');
         return date.toLocaleDateString('en-US', { month: 'short', day: 'numeric' });
     });
-    const calories = filteredDates.map(d => Math.round(dateMap[d].calories));
-    const carbs = filteredDates.map(d => Math.round(dateMap[d].carbs));
+    const calories = dates.map(d => Math.round(dateMap[d].calories));
+    const carbs = dates.map(d => Math.round(dateMap[d].carbs));
 
     return { labels, calories, carbs };
 }
@@ -358,36 +322,15 @@ function generateActivityData() {
         }
     });
 
-    // Sort by date
-    const sortedDates = Object.keys(dateMap).sort((a, b) => new Date(a + 'T00:00:00') - new Date(b + 'T00:00:00'));
-    const now = new Date();
-    let filteredDates = sortedDates;
+    // Sort by date (activityData only covers the view mode's window)
+    const dates = Object.keys(dateMap).sort();
 
-    // Filter based on view mode
-    switch(activityViewMode) {
-        case 'week':
-            const oneWeekAgo = new Date(now);
-            oneWeekAgo.setDate(oneWeekAgo.getDate() - 7);
-            filteredDates = sortedDates.filter(d => new Date(d + 'T00:00:00') >= oneWeekAgo);
-            break;
-        case 'month':
-            const oneMonthAgo = new Date(now);
-            oneMonthAgo.setDate(oneMonthAgo.getDate() - 30);
-            filteredDates = sortedDates.filter(d => new Date(d + 'T00:00:00') >= oneMonthAgo);
-            break;
-        case 'year':
-            const oneYearAgo = new Date(now);
-            oneYearAgo.setDate(oneYearAgo.getDate() - 365);
-            filteredDates = sortedDates.filter(d => new Date(d + 'T00:00:00') >= oneYearAgo);
-            break;
-    }
-
-    const labels = filteredDates.map(d => {
+    const labels = dates.map(d => {
         const date = new Date(d + 'T00:00:00');
         return date.toLocaleDateString('en-US', { month: 'short', day: 'numeric' });
     });
-    const minutes = filteredDates.map(d => dateMap[d].minutes);
-    const calories = filteredDates.map(d => dateMap[d].calories);
+    const minutes = dates.map(d => dateMap[d].minutes);
+    const calories = dates.map(d => dateMap[d].calories);
 
     return { labels, minutes, calories };
 }
@@ -403,36 +346,14 @@ function generateWeightData() {
         dateMap[item.date] = item.weight;
     });
 
-    // Sort by date
-    const sortedDates = Object.keys(dateMap).sort((a, b) => new Date(a + 'T00:00:00') - new Date(b + 'T00:00:00'));
-
-    // Filter based on view mode
-    const now = new Date();
-    let filteredDates = sortedDates;
-
-    switch(weightViewMode) {
-        case 'week':
-            const oneWeekAgo = new Date(now);
-            oneWeekAgo.setDate(oneWeekAgo.getDate() - 7);
-            filteredDates = sortedDates.filter(d => new Date(d + 'T00:00:00') >= oneWeekAgo);
-            break;
-        case 'month':
-            const oneMonthAgo = new Date(now);
-            oneMonthAgo.setDate(oneMonthAgo.getDate() - 30);
-            filteredDates = sortedDates.filter(d => new Date(d + 'T00:00:00') >= oneMonthAgo);
-            break;
-        case 'year':
-            const oneYearAgo = new Date(now);
-            oneYearAgo.setDate(oneYearAgo.getDate() - 365);
-            filteredDates = sortedDates.filter(d => new Date(d + 'T00:00:00') >= oneYearAgo);
-            break;
-    }
+    // Sort by date (weightData only covers the view mode's window)
+    const dates = Object.keys(dateMap).sort();
 
-    const labels = filteredDates.map(d => {
+    const labels = dates.map(d => {
         const date = new Date(d + 'T00:00:00');
         return date.toLocaleDateString('en-US', { month: 'short', day: 'numeric' });
     });
-    const data = filteredDates.map(d => dateMap[d]);
+    const data = dates.map(d => dateMap[d]);
 
     return { labels, data };
 }
@@ -746,7 +667,7 @@ function renderTodaysFoods() {
                 <div class="food-item">
                     <span class="food-name">${item.name} ${item.servings > 1 ? `(${item.servings}x)` : ''}</span>
                     <span class="food-calories">${Math.round(item.calories)} kcal</span>
-                    <button class="btn-remove" data-date="${item.date}" data-index="${index}">×</button>
+                    <button class="btn-remove" data-id="${item.id}">×</button>
                 </div>
             `).join('')}
         </div>
@@ -874,9 +795,7 @@ function renderActivityLog() {
     const selectedDate = selectedActivityDate;
 
     // Filter activities for selected date only
-    const dateActivities = activityData
-        .map((item, index) => ({ ...item, globalIndex: index }))
-        .filter(item => item.date === selectedDate);
+    const dateActivities = activityData.filter(item => item.date === selectedDate);
 
     if (dateActivities.length === 0) {
         const dateLabel = selectedDate === getLocalDateString()
@@ -905,7 +824,7 @@ function renderActivityLog() {
                         <span class="activity-type-icon">${getActivityIcon(activity.type)}</span>
                         <span class="activity-type-name">${activity.type}</span>
                         <span class="activity-minutes">${activity.minutes} min${activity.calories ? ` (${activityCals} cal)` : ''}</span>
-                        <button class="btn-remove-small" data-index="${activity.globalIndex}">×</button>
+                        <button class="btn-remove-small" data-id="${activity.id}">×</button>
                     </div>
                     `;
                 }).join('')}
@@ -1001,9 +920,7 @@ function renderWeightLog() {
     const selectedDate = selectedWeightDate;
 
     // Filter weight entries for selected date only
-    const dateWeights = weightData
-        .map((item, index) => ({ ...item, globalIndex: index }))
-        .filter(item => item.date === selectedDate);
+    const dateWeights = weightData.filter(item => item.date === selectedDate);
 
     if (dateWeights.length === 0) {
         const dateLabel = selectedDate === getLocalDateString()
@@ -1024,7 +941,7 @@ function renderWeightLog() {
                     <div class="weight-item">
                         <span class="weight-date">${dateLabel}</span>
                         <span class="weight-value">${entry.weight} lbs</span>
-                        <button class="btn-remove-small" data-index="${entry.globalIndex}">×</button>
+                        <button class="btn-remove-small" data-id="${entry.id}">×</button>
                     </div>
                 `;
             }).join('')}
@@ -1416,37 +1333,47 @@ function getTabContent(tab) {
 }
 
 // Export functions
-function exportToCSV() {
+// The charts only hold their visible window; exports page through the whole
+// history instead.
+async function fetchFullHistory() {
+    const [glucose, nutrition, activity, weight] = await Promise.all(
+        Object.values(seriesFetchers).map(fetcher => auth.fetchAllRows(fetcher))
+    );
+    return { glucose, nutrition, activity, weight };
+}
+
+async function exportToCSV() {
     const username = auth.getCurrentUsername();
     const date = new Date().toISOString().split('T')[0];
+    const history = await fetchFullHistory();
 
     let csv = `Diabetes Management Data Export - ${username}\nGenerated: ${date}\n\n`;
 
     // Glucose Data
     csv += 'GLUCOSE READINGS\n';
     csv += 'Date,Value (mg/dL)\n';
-    glucoseData.forEach(d => {
+    history.glucose.forEach(d => {
         csv += `${d.date},${d.value}\n`;
     });
 
     // Nutrition Data
     csv += '\nNUTRITION LOG\n';
     csv += 'Date,Food,Servings,Carbs (g),Protein (g),Fat (g),Fiber (g),Calories\n';
-    nutritionData.forEach(d => {
+    history.nutrition.forEach(d => {
         csv += `${d.date},"${d.name}",${d.servings},${d.carbs},${d.protein},${d.fat},${d.fiber},${d.calories}\n`;
     });
 
     // Activity Data
     csv += '\nACTIVITY LOG\n';
     csv += 'Date,Type,Minutes,Calories\n';
-    activityData.forEach(d => {
+    history.activity.forEach(d => {
         csv += `${d.date},"${d.type}",${d.minutes},${d.calories || 'N/A'}\n`;
     });
 
     // Weight Data
     csv += '\nWEIGHT LOG\n';
     csv += 'Date,Weight (lbs)\n';
-    weightData.forEach(d => {
+    history.weight.forEach(d => {
         csv += `${d.date},${d.weight}\n`;
     });
 
@@ -1470,12 +1397,14 @@ function exportToCSV() {
     window.URL.revokeObjectURL(url);
 }
 
-function exportToPDF() {
+async function exportToPDF() {
     const username = auth.getCurrentUsername();
     const date = new Date().toISOString().split('T')[0];
 
-    // Create printable HTML
+    // Create printable HTML (open the window before awaiting so it isn't
+    // treated as a popup)
     const printWindow = window.open('', '_blank');
+    const history = await fetchFullHistory();
     printWindow.document.write(`
         <!DOCTYPE html>
         <html>
@@ -1518,7 +1447,7 @@ function exportToPDF() {
                     <tr><th>Date</th><th>Value (mg/dL)</th></tr>
                 </thead>
                 <tbody>
-                    ${glucoseData.slice(-30).map(d => `<tr><td>${d.date}</td><td>${d.value}</td></tr>`).join('')}
+                    ${history.glucose.slice(-30).map(d => `<tr><td>${d.date}</td><td>${d.value}</td></tr>`).join('')}
                 </tbody>
             </table>
 
@@ -1528,7 +1457,7 @@ function exportToPDF() {
                     <tr><th>Date</th><th>Food</th><th>Calories</th><th>Carbs (g)</th><th>Protein (g)</th></tr>
                 </thead>
                 <tbody>
-                    ${nutritionData.slice(-30).map(d => `<tr><td>${d.date}</td><td>${d.name}</td><td>${Math.round(d.calories)}</td><td>${Math.round(d.carbs)}</td><td>${Math.round(d.protein)}</td></tr>`).join('')}
+                    ${history.nutrition.slice(-30).map(d => `<tr><td>${d.date}</td><td>${d.name}</td><td>${Math.round(d.calories)}</td><td>${Math.round(d.carbs)}</td><td>${Math.round(d.protein)}</td></tr>`).join('')}
                 </tbody>
             </table>
 
@@ -1538,7 +1467,7 @@ function exportToPDF() {
                     <tr><th>Date</th><th>Type</th><th>Minutes</th><th>Calories</th></tr>
                 </thead>
                 <tbody>
-                    ${activityData.slice(-30).map(d => `<tr><td>${d.date}</td><td>${d.type}</td><td>${d.minutes}</td><td>${d.calories || 'N/A'}</td></tr>`).join('')}
+                    ${history.activity.slice(-30).map(d => `<tr><td>${d.date}</td><td>${d.type}</td><td>${d.minutes}</td><td>${d.calories || 'N/A'}</td></tr>`).join('')}
                 </tbody>
             </table>
 
@@ -1548,7 +1477,7 @@ function exportToPDF() {
                     <tr><th>Date</th><th>Weight (lbs)</th></tr>
                 </thead>
                 <tbody>
-                    ${weightData.slice(-30).map(d => `<tr><td>${d.date}</td><td>${d.weight}</td></tr>`).join('')}
+                    ${history.weight.slice(-30).map(d => `<tr><td>${d.date}</td><td>${d.weight}</td></tr>`).join('')}
                 </tbody>
             </table>
 
@@ -1580,10 +1509,9 @@ async function analyzeGoalProgress() {
         sevenDaysAgo.setDate(sevenDaysAgo.getDate() - 7);
         const cutoffDate = sevenDaysAgo.toISOString().split('T')[0];
 
-        const recentGlucose = glucoseData.filter(d => d.date >= cutoffDate);
-        const recentNutrition = nutritionData.filter(d => d.date >= cutoffDate);
-        const recentActivity = activityData.filter(d => d.date >= cutoffDate);
-        const recentWeight = weightData.filter(d => d.date >= cutoffDate);
+        const [recentGlucose, recentNutrition, recentActivity, recentWeight] = await Promise.all(
+            Object.values(seriesFetchers).map(fetcher => fetcher({ from: cutoffDate }))
+        );
 
         const recentData = {
             glucose: recentGlucose,
@@ -1801,8 +1729,9 @@ function renderApp() {
 
                 // Add view selector handlers
                 document.querySelectorAll('.view-btn').forEach(btn => {
-                    btn.addEventListener('click', (e) => {
+                    btn.addEventListener('click', async (e) => {
                         glucoseViewMode = e.target.getAttribute('data-view');
+                        await loadSeries('glucose');
                         renderApp();
                     });
                 });
@@ -1850,16 +1779,18 @@ function renderApp() {
 
                 // View mode switching (time period)
                 document.querySelectorAll('.chart-container .view-btn[data-view]').forEach(btn => {
-                    btn.addEventListener('click', (e) => {
+                    btn.addEventListener('click', async (e) => {
                         nutritionViewMode = e.target.getAttribute('data-view');
+                        await loadSeries('nutrition');
                         renderApp();
                     });
                 });
 
                 // Chart mode switching (pie vs line)
                 document.querySelectorAll('.chart-container .view-btn[data-mode]').forEach(btn => {
-                    btn.addEventListener('click', (e) => {
+                    btn.addEventListener('click', async (e) => {
                         nutritionChartMode = e.target.getAttribute('data-mode');
+                        await loadSeries('nutrition');
                         renderApp();
                     });
                 });
@@ -1867,14 +1798,10 @@ function renderApp() {
                 // Add remove food handlers
                 document.querySelectorAll('.btn-remove').forEach(btn => {
                     btn.addEventListener('click', async (e) => {
-                        const date = e.target.getAttribute('data-date');
-                        const dateFoods = nutritionData.filter(item => item.date === date);
-                        const index = parseInt(e.target.getAttribute('data-index'));
-                        const foodToRemove = dateFoods[index];
-                        const globalIndex = nutritionData.indexOf(foodToRemove);
+                        const id = parseInt(e.target.getAttribute('data-id'));
 
                         try {
-                            await auth.deleteNutritionData(globalIndex);
+                            await auth.deleteNutritionData(id);
                             await loadAllData();
                             renderApp();
                         } catch (error) {
@@ -1886,8 +1813,9 @@ function renderApp() {
                 // Date picker change handler
                 const nutritionDatePicker = document.getElementById('nutrition-date');
                 if (nutritionDatePicker) {
-                    nutritionDatePicker.addEventListener('change', (e) => {
+                    nutritionDatePicker.addEventListener('change', async (e) => {
                         selectedNutritionDate = e.target.value;
+                        await loadSeries('nutrition');
                         renderApp();
                     });
                 }
@@ -1921,9 +1849,9 @@ function renderApp() {
                 // Add remove activity handlers
                 document.querySelectorAll('.btn-remove-small').forEach(btn => {
                     btn.addEventListener('click', async (e) => {
-                        const index = parseInt(e.target.getAttribute('data-index'));
+                        const id = parseInt(e.target.getAttribute('data-id'));
                         try {
-                            await auth.deleteActivityData(index);
+                            await auth.deleteActivityData(id);
                             await loadAllData();
                             renderApp();
                         } catch (error) {
@@ -1935,18 +1863,20 @@ function renderApp() {
                 // Date picker change handler for activity
                 const activityDatePicker = document.getElementById('activity-date');
                 if (activityDatePicker) {
-                    activityDatePicker.addEventListener('change', (e) => {
+                    activityDatePicker.addEventListener('change', async (e) => {
                         selectedActivityDate = e.target.value;
+                        await loadSeries('activity');
                         renderApp();
                     });
                 }
 
                 // View mode switching for activity chart (time period)
                 document.querySelectorAll('.chart-container .view-btn[data-view]').forEach(btn => {
-                    btn.addEventListener('click', (e) => {
+                    btn.addEventListener('click', async (e) => {
                         const view = e.target.getAttribute('data-view');
                         if (view === 'week' || view === 'month' || view === 'year') {
                             activityViewMode = view;
+                            await loadSeries('activity');
                             renderApp();
                         }
                     });
@@ -1974,18 +1904,20 @@ function renderApp() {
                 // Date picker change handler for weight
                 const weightDatePicker = document.getElementById('weight-date');
                 if (weightDatePicker) {
-                    weightDatePicker.addEventListener('change', (e) => {
+                    weightDatePicker.addEventListener('change', async (e) => {
                         selectedWeightDate = e.target.value;
+                        await loadSeries('weight');
                         renderApp();
                     });
                 }
 
                 // View mode switching for weight chart
                 document.querySelectorAll('.weight-chart-full .view-btn').forEach(btn => {
-                    btn.addEventListener('click', (e) => {
+                    btn.addEventListener('click', async (e) => {
                         const view = e.target.getAttribute('data-view');
                         if (view === 'week' || view === 'month' || view === 'year') {
                             weightViewMode = view;
+                            await loadSeries('weight');
                             renderApp();
                         }
                     });
@@ -1994,9 +1926,9 @@ function renderApp() {
                 // Add remove weight handlers
                 document.querySelectorAll('.weight-log .btn-remove-small').forEach(btn => {
                     btn.addEventListener('click', async (e) => {
-                        const index = parseInt(e.target.getAttribute('data-index'));
+                        const id = parseInt(e.target.getAttribute('data-id'));
                         try {
-                            await auth.deleteWeightData(index);
+                            await auth.deleteWeightData(id);
                             await loadAllData();
                             renderApp();
                         } catch (error) {
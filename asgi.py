@@ -0,0 +1,165 @@
+# asgi.py
+# ================================================================
+# Async serving path for the OpenAI-backed /analyze-* endpoints
+# ================================================================
+# The four /analyze-* handlers await AsyncOpenAI instead of blocking a
+# worker for the seconds an LLM call takes, so thousands of in-flight calls
+# share one event loop. Every other route is the Flask app from api.py, run
+# on a thread pool through a2wsgi, so the /data/* endpoints are no longer
+# queued behind AI food logging.
+#
+# Usage:
+#   uvicorn asgi:app --port 5000 [--workers 2]
+#   OPENAI_BASE_URL=http://127.0.0.1:8100/v1 uvicorn asgi:app   # against fake_openai.py
+import json
+import os
+import time
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+import api
+from analysis import barcode_request, goals_request, parse_reply, ReplyFormatError
+from llm_client import LLMBusyError, require_api_key
+
+# Threads serving the mounted Flask app (the /data/*, /auth/* and /predict routes).
+ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', 16))
+
+def has_api_key():
+    return bool(os.environ.get('OPENAI_API_KEY'))
+
+def check_token(token):
+    """api.authenticate outside a Flask request, on a pooled connection."""
+    conn = None
+
+    def get_cursor():
+        nonlocal conn
+        if conn is None:
+            conn = api.db_pool.acquire()
+        return conn.cursor()
+
+    try:
+        return api.authenticate(token, get_cursor)
+    finally:
+        if conn is not None:
+            api.db_pool.release(conn)
+
+async def read_json(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+async def complete(request_kwargs):
+    # api.llm is the same pooled, rate-limited client manager the sync path uses.
+    response = await api.llm.acomplete(request_kwargs)
+    return parse_reply(response)
+
+async def cached_complete(kind, description):
+    """Async twin of api.cached_analysis; SQLite lookups run off the event loop."""
+    build, version, check = api.ANALYSIS_KINDS[kind]
+    cache = api.analysis_cache
+    if cache is not None:
+        result = await run_in_threadpool(cache.get, kind, version, description)
+        if result is not None:
+            return check(result) if check else result
+    require_api_key()
+    t0 = time.perf_counter()
+    result = await complete(build(description))
+    if check:
+        result = check(result)
+    if cache is not None:
+        await run_in_threadpool(cache.put, kind, version, description, result, time.perf_counter() - t0)
+    return result
+
+def ai_error(e):
+    if isinstance(e, LLMBusyError):
+        return JSONResponse({"error": str(e)}, status_code=503)
+    if isinstance(e, (json.JSONDecodeError, ReplyFormatError)):
+        return JSONResponse({"error": f"Failed to parse AI response: {str(e)}"}, status_code=500)
+    return JSONResponse({"error": str(e)}, status_code=500)
+
+async def analyze_food(request):
+    data = await read_json(request)
+    if data is None:
+        return JSONResponse({"error": "Invalid JSON body"}, status_code=400)
+    description = str(data.get('description', '')).strip()
+    if not description:
+        return JSONResponse({"error": "No description provided"}, status_code=400)
+    foods, remainder = api.split_meal(description)
+    if remainder is not None:
+        try:
+            foods += await cached_complete('food', remainder)
+        except Exception as e:
+            return ai_error(e)
+    return JSONResponse({"foods": foods})
+
+async def analyze_activity(request):
+    data = await read_json(request)
+    if data is None:
+        return JSONResponse({"error": "Invalid JSON body"}, status_code=400)
+    description = str(data.get('description', '')).strip()
+    if not description:
+        return JSONResponse({"error": "No description provided"}, status_code=400)
+    try:
+        result = await cached_complete('activity', description)
+    except Exception as e:
+        return ai_error(e)
+    return JSONResponse(result)
+
+async def analyze_barcode_photo(request):
+    data = await read_json(request)
+    if data is None:
+        return JSONResponse({"error": "Invalid JSON body"}, status_code=400)
+    image_data = str(data.get('image', '')).strip()
+    if not image_data:
+        return JSONResponse({"error": "No image provided"}, status_code=400)
+    if not has_api_key():
+        return JSONResponse({"error": "OPENAI_API_KEY not set"}, status_code=500)
+    try:
+        result = await complete(barcode_request(image_data))
+    except Exception as e:
+        return ai_error(e)
+    return JSONResponse(result)
+
+async def analyze_goals(request):
+    token = request.headers.get('Authorization')
+    if not token:
+        return JSONResponse({"error": "No authorization token provided"}, status_code=401)
+    if token.startswith('Bearer '):
+        token = token[7:]
+    user_id, _ = await run_in_threadpool(check_token, token)
+    if user_id is None:
+        return JSONResponse({"error": "Invalid or expired token"}, status_code=401)
+
+    data = await read_json(request)
+    if data is None:
+        return JSONResponse({"error": "Invalid JSON body"}, status_code=400)
+    if not has_api_key():
+        return JSONResponse({"error": "OPENAI_API_KEY not set"}, status_code=500)
+    try:
+        analysis = await complete(goals_request(data.get('goals', {}), data.get('recent_data', {})))
+    except LLMBusyError as e:
+        return ai_error(e)
+    except Exception as e:
+        print(f"Error in goal analysis: {e}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+    return JSONResponse(analysis)
+
+app = Starlette(
+    routes=[
+        Route('/analyze-food', analyze_food, methods=['POST']),
+        Route('/analyze-activity', analyze_activity, methods=['POST']),
+        Route('/analyze-barcode-photo', analyze_barcode_photo, methods=['POST']),
+        Route('/analyze-goals', analyze_goals, methods=['POST']),
+        Mount('/', app=WSGIMiddleware(api.app, workers=ASGI_WSGI_THREADS)),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    on_shutdown=[api.llm.aclose],
+)
@@ -97,8 +97,31 @@ export async function authenticatedFetch(url, options = {}) {
     return response;
 }
 
-export async function fetchGlucoseData() {
-    const response = await authenticatedFetch(`${API_URL}/data/glucose`);
+// params: optional { from, to, limit, cursor }. With limit or cursor the
+// server returns { items, next_cursor } instead of a plain array.
+function withQuery(url, params) {
+    if (!params) return url;
+    const query = new URLSearchParams(
+        Object.entries(params).filter(([, v]) => v !== undefined && v !== null && v !== '')
+    ).toString();
+    return query ? `${url}?${query}` : url;
+}
+
+// Every row of one series, following next_cursor page by page.
+// fetcher: one of the fetch*Data functions below.
+export async function fetchAllRows(fetcher, pageSize = 1000) {
+    const rows = [];
+    let cursor = null;
+    do {
+        const page = await fetcher({ limit: pageSize, cursor });
+        rows.push(...page.items);
+        cursor = page.next_cursor;
+    } while (cursor);
+    return rows;
+}
+
+export async function fetchGlucoseData(params) {
+    const response = await authenticatedFetch(withQuery(`${API_URL}/data/glucose`, params));
     return await response.json();
 }
 
@@ -110,8 +133,8 @@ export async function saveGlucoseData(date, value) {
     return await response.json();
 }
 
-export async function fetchNutritionData() {
-    const response = await authenticatedFetch(`${API_URL}/data/nutrition`);
+export async function fetchNutritionData(params) {
+    const response = await authenticatedFetch(withQuery(`${API_URL}/data/nutrition`, params));
     return await response.json();
 }
 
@@ -123,16 +146,17 @@ export async function saveNutritionData(data) {
     return await response.json();
 }
 
-export async function deleteNutritionData(index) {
+// id: a row id from GET/POST, or an array of ids to delete in one call.
+export async function deleteNutritionData(id) {
     const response = await authenticatedFetch(`${API_URL}/data/nutrition`, {
         method: 'DELETE',
-        body: JSON.stringify({ index })
+        body: JSON.stringify(Array.isArray(id) ? { ids: id } : { id })
     });
     return await response.json();
 }
 
-export async function fetchActivityData() {
-    const response = await authenticatedFetch(`${API_URL}/data/activity`);
+export async function fetchActivityData(params) {
+    const response = await authenticatedFetch(withQuery(`${API_URL}/data/activity`, params));
     return await response.json();
 }
 
@@ -144,16 +168,17 @@ export async function saveActivityData(data) {
     return await response.json();
 }
 
-export async function deleteActivityData(index) {
+// id: a row id from GET/POST, or an array of ids to delete in one call.
+export async function deleteActivityData(id) {
     const response = await authenticatedFetch(`${API_URL}/data/activity`, {
         method: 'DELETE',
-        body: JSON.stringify({ index })
+        body: JSON.stringify(Array.isArray(id) ? { ids: id } : { id })
     });
     return await response.json();
 }
 
-export async function fetchWeightData() {
-    const response = await authenticatedFetch(`${API_URL}/data/weight`);
+export async function fetchWeightData(params) {
+    const response = await authenticatedFetch(withQuery(`${API_URL}/data/weight`, params));
     return await response.json();
 }
 
@@ -165,10 +190,11 @@ export async function saveWeightData(data) {
     return await response.json();
 }
 
-export async function deleteWeightData(index) {
+// id: a row id from GET/POST, or an array of ids to delete in one call.
+export async function deleteWeightData(id) {
     const response = await authenticatedFetch(`${API_URL}/data/weight`, {
         method: 'DELETE',
-        body: JSON.stringify({ index })
+        body: JSON.stringify(Array.isArray(id) ? { ids: id } : { id })
     });
     return await response.json();
 }
@@ -209,6 +235,13 @@ export async function fetchMilestones() {
     return await response.json();
 }
 
+// Everything loadAllData needs in one request. since (YYYY-MM-DD) limits the
+// glucose/nutrition/activity/weight arrays to entries on or after that date.
+export async function fetchDashboard(since) {
+    const response = await authenticatedFetch(withQuery(`${API_URL}/data/dashboard`, { since }));
+    return await response.json();
+}
+
 export async function analyzeGoals(goals, recentData) {
     const response = await authenticatedFetch(`${API_URL}/analyze-goals`, {
         method: 'POST',
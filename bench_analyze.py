@@ -0,0 +1,87 @@
+# bench_analyze.py
+# ================================================================
+# Load test for the /analyze-* endpoints against fake_openai.py
+# ================================================================
+# Fires --concurrency simultaneous /analyze-food calls at a running server
+# while probing /health, and prints throughput and latency percentiles for
+# both. Compare the sync and async serving paths:
+#
+#   python fake_openai.py --latency-ms 1500 &
+#   export OPENAI_API_KEY=fake OPENAI_BASE_URL=http://127.0.0.1:8100/v1
+#   gunicorn -c gunicorn.conf.py api:app          # sync workers
+#   uvicorn asgi:app --port 5000                  # or the async path
+#   python bench_analyze.py --url http://127.0.0.1:5000 --concurrency 500
+import argparse
+import asyncio
+import time
+
+import httpx
+
+def percentiles(samples):
+    if not samples:
+        return "no samples"
+    s = sorted(samples)
+    pick = lambda q: s[min(len(s) - 1, int(q * len(s)))] * 1000
+    return f"p50 {pick(0.5):.0f} ms, p99 {pick(0.99):.0f} ms, max {s[-1] * 1000:.0f} ms"
+
+async def analyze_load(client, url, concurrency, requests):
+    latencies, failures = [], 0
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(i)
+
+    async def worker():
+        nonlocal failures
+        while not queue.empty():
+            i = queue.get_nowait()
+            t0 = time.perf_counter()
+            try:
+                r = await client.post(f"{url}/analyze-food", json={"description": f"2 eggs and toast #{i}"})
+                if r.status_code != 200:
+                    failures += 1
+            except httpx.HTTPError:
+                failures += 1
+            latencies.append(time.perf_counter() - t0)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, failures
+
+async def probe_health(client, url, stop, interval=0.05):
+    latencies = []
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        try:
+            await client.get(f"{url}/health")
+            latencies.append(time.perf_counter() - t0)
+        except httpx.HTTPError:
+            latencies.append(float("inf"))
+        await asyncio.sleep(interval)
+    return latencies
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.concurrency + 1)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        stop = asyncio.Event()
+        probe = asyncio.create_task(probe_health(client, args.url, stop))
+        t0 = time.perf_counter()
+        latencies, failures = await analyze_load(client, args.url, args.concurrency, args.requests)
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        health = await probe
+
+    print(f"/analyze-food: {len(latencies)} requests, {failures} failed, {elapsed:.1f}s "
+          f"({len(latencies) / elapsed:.0f} req/s); {percentiles(latencies)}")
+    print(f"/health during load: {len(health)} probes; {percentiles(health)}")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Load test /analyze-food and watch /health latency")
+    ap.add_argument("--url", default="http://127.0.0.1:5000")
+    ap.add_argument("--concurrency", type=int, default=200)
+    ap.add_argument("--requests", type=int, default=None, help="total calls (default: 2 x concurrency)")
+    ap.add_argument("--timeout", type=float, default=120.0)
+    args = ap.parse_args(argv)
+    args.requests = args.requests or 2 * args.concurrency
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
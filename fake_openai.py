@@ -0,0 +1,141 @@
+# fake_openai.py
+# ================================================================
+# Offline stand-in for the OpenAI chat completions API
+# ================================================================
+# Answers POST /v1/chat/completions after a configurable delay with a canned
+# reply shaped like the one each /analyze-* prompt expects, so api.py and
+# asgi.py can be load tested without an API key or network access.
+# GET /stats reports request counts and peak concurrency.
+#
+# Usage:
+#   python fake_openai.py [--port 8100] [--latency-ms 1500] [--jitter-ms 500] [--error-rate 0.0]
+#   OPENAI_API_KEY=fake OPENAI_BASE_URL=http://127.0.0.1:8100/v1 uvicorn asgi:app
+import argparse
+import asyncio
+import json
+import random
+import time
+
+CANNED_REPLIES = [
+    ("nutrition expert", [
+        {"name": "Scrambled Eggs (2 large)", "carbs": 2, "protein": 12, "fat": 10, "fiber": 0, "calories": 180},
+        {"name": "Whole Wheat Toast (1 slice)", "carbs": 12, "protein": 4, "fat": 1, "fiber": 2, "calories": 80},
+    ]),
+    ("fitness expert", {"activity_type": "Walking", "minutes": 30, "calories": 120}),
+    ("nutrition labels", {
+        "barcode": "012345678905", "product_name": "Sample Granola Bar", "servings": 6,
+        "has_nutrition_label": True,
+        "nutrition": {"calories": 190, "carbs": 29, "protein": 4, "fat": 7, "fiber": 2},
+        "confidence": "medium",
+    }),
+    ("diabetes management coach", {
+        "overall_status": "on_track",
+        "summary": "You logged activity on most days this week and your readings are within range.",
+        "insights": [{"category": "activity", "status": "on_track", "message": "150 minutes this week."}],
+        "recommendations": ["Keep walking after dinner", "Add a serving of vegetables at lunch"],
+    }),
+]
+
+class FakeOpenAI:
+    def __init__(self, latency_ms=1500.0, jitter_ms=500.0, error_rate=0.0):
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self.connections = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def reply_for(self, body):
+        system = next((m.get("content", "") for m in body.get("messages", []) if m.get("role") == "system"), "")
+        content = next((reply for marker, reply in CANNED_REPLIES if marker in system), {})
+        return {
+            "id": f"chatcmpl-fake{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o-mini"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps(content)},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 50, "total_tokens": 150},
+        }
+
+    def stats(self):
+        return {"requests": self.requests, "errors": self.errors, "connections": self.connections,
+                "in_flight": self.in_flight, "peak_in_flight": self.peak_in_flight}
+
+    async def handle(self, method, path, body):
+        if method == "GET" and path == "/stats":
+            return 200, self.stats()
+        if method != "POST" or not path.endswith("/chat/completions"):
+            return 404, {"error": {"message": f"No route for {method} {path}"}}
+        self.requests += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+            if random.random() < self.error_rate:
+                self.errors += 1
+                return random.choice([429, 500, 503]), {"error": {"message": "injected failure"}}
+            return 200, self.reply_for(json.loads(body or b"{}"))
+        finally:
+            self.in_flight -= 1
+
+    async def serve_connection(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                method, path, _ = lines[0].split(" ", 2)
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                status, payload = await self.handle(method, path, body)
+                data = json.dumps(payload).encode()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return
+        finally:
+            self.connections -= 1
+            writer.close()
+
+async def serve(host, port, fake):
+    server = await asyncio.start_server(fake.serve_connection, host, port, backlog=4096)
+    print(f"Fake OpenAI listening on http://{host}:{port}/v1 "
+          f"(latency {fake.latency * 1000:.0f}±{fake.jitter * 1000:.0f} ms, error rate {fake.error_rate})")
+    async with server:
+        await server.serve_forever()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Offline stand-in for the OpenAI chat completions API")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8100)
+    ap.add_argument("--latency-ms", type=float, default=1500.0)
+    ap.add_argument("--jitter-ms", type=float, default=500.0)
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered 429/5xx")
+    args = ap.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, FakeOpenAI(args.latency_ms, args.jitter_ms, args.error_rate)))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+# gunicorn.conf.py
+# Run with: gunicorn -c gunicorn.conf.py api:app
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+
+# Load api.py (and the model) once in the master; workers inherit it through
+# fork and share the pages copy-on-write. Combine with MODEL_MMAP=1 so the
+# model's arrays are file-backed and stay shared even once touched.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+def pre_fork(server, worker):
+    # Move everything allocated so far into the permanent generation so the
+    # cyclic GC in workers does not write to (and un-share) those pages.
+    gc.freeze()
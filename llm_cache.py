@@ -0,0 +1,345 @@
+# llm_cache.py
+# ================================================================
+# Persistent cache of /analyze-food and /analyze-activity results
+# ================================================================
+# Keys are the normalized description (case-folded, punctuation and
+# whitespace collapsed, number words / fractions / units / plurals made
+# canonical) plus the prompt version, so "2 Eggs and toast" and
+# "two eggs & toast" share an entry and editing a prompt in analysis.py
+# starts a fresh set. Entries live in their own SQLite file (shared by all
+# workers) until LLM_CACHE_TTL_DAYS pass or the least recently hit ones are
+# evicted beyond LLM_CACHE_MAX_ENTRIES.
+#
+# With LLM_CACHE_SIMILARITY > 0 a miss also tries near-duplicates: cached
+# phrasings whose token sets overlap by at least that Jaccard similarity
+# and that contain exactly the same quantities ("2 egg", "30 min walk").
+#
+# Usage:
+#   python llm_cache.py [--db llm_cache.db] [--stats] [--clear] [--normalize "2 Eggs & toast"]
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+
+NUMBER_WORDS = {
+    'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6,
+    'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12,
+    'dozen': 12, 'half': 0.5, 'quarter': 0.25,
+}
+
+UNITS = {
+    'min': 'min', 'mins': 'min', 'minute': 'min', 'minutes': 'min',
+    'h': 'h', 'hr': 'h', 'hrs': 'h', 'hour': 'h', 'hours': 'h',
+    'g': 'g', 'gram': 'g', 'grams': 'g', 'kg': 'kg',
+    'oz': 'oz', 'ounce': 'oz', 'ounces': 'oz', 'lb': 'lb', 'lbs': 'lb', 'pound': 'lb', 'pounds': 'lb',
+    'cup': 'cup', 'cups': 'cup', 'tbsp': 'tbsp', 'tablespoon': 'tbsp', 'tablespoons': 'tbsp',
+    'tsp': 'tsp', 'teaspoon': 'tsp', 'teaspoons': 'tsp', 'ml': 'ml',
+    'slice': 'slice', 'slices': 'slice', 'piece': 'piece', 'pieces': 'piece',
+    'serving': 'serving', 'servings': 'serving', 'bowl': 'bowl', 'bowls': 'bowl',
+    'glass': 'glass', 'glasses': 'glass', 'can': 'can', 'cans': 'can',
+    'km': 'km', 'mi': 'mi', 'mile': 'mi', 'miles': 'mi',
+}
+
+STOPWORDS = {'and', 'with', 'of', 'the', 'some', 'plus', 'for', 'in', 'on'}
+
+_TOKEN_RE = re.compile(r'\d+(?:[./]\d+)?|[a-z]+')
+_VULGAR_RE = re.compile(r'(\d*)\s*([\u00bc-\u00be\u2150-\u215e])')
+_MIXED_RE = re.compile(r'\b(\d+)\s+(\d+)/(\d+)\b')
+
+def _vulgar(match):
+    return f' {int(match.group(1) or 0) + unicodedata.numeric(match.group(2)):g} '
+
+def _mixed(match):
+    whole, num, den = (int(x) for x in match.groups())
+    return f'{whole + num / den:g}' if den and num < den else match.group(0)
+
+def _number(text):
+    if '/' in text:
+        num, den = text.split('/')
+        return float(num) / float(den) if float(den) else None
+    return float(text)
+
+def _format_number(value):
+    return str(int(value)) if float(value).is_integer() else f'{value:.3g}'
+
+def _singular(word):
+    if len(word) <= 3 or word.endswith(('ss', 'us', 'is')):
+        return word
+    if word.endswith('ies'):
+        return word[:-3] + 'y'
+    if word.endswith(('oes', 'ches', 'shes', 'xes')):
+        return word[:-2]
+    if word.endswith('s'):
+        return word[:-1]
+    return word
+
+def normalize_tokens(description):
+    """Canonical token list: numbers as digits, units abbreviated, hours as minutes, plurals dropped."""
+    text = _VULGAR_RE.sub(_vulgar, description)
+    text = unicodedata.normalize('NFKC', text).casefold().replace('\u2044', '/')
+    text = _MIXED_RE.sub(_mixed, text)
+    text = re.sub(r'(\d)([a-z])', r'\1 \2', text)
+    raw = _TOKEN_RE.findall(text)
+
+    tokens = []
+    i = 0
+    while i < len(raw):
+        word = raw[i]
+        if word == 'half' and i + 1 < len(raw) and raw[i + 1] in ('a', 'an'):
+            tokens.append(0.5)
+            i += 2
+            continue
+        if word[0].isdigit():
+            value = _number(word)
+            if value is not None:
+                tokens.append(value)
+        elif word in NUMBER_WORDS and i + 1 < len(raw) and not raw[i + 1][0].isdigit():
+            tokens.append(float(NUMBER_WORDS[word]))
+        elif word in UNITS and tokens and isinstance(tokens[-1], float):
+            unit = UNITS[word]
+            if unit == 'h':
+                tokens[-1] *= 60
+                unit = 'min'
+            tokens.append(unit)
+        elif word not in STOPWORDS:
+            tokens.append(_singular(word))
+        i += 1
+    return [_format_number(t) if isinstance(t, float) else t for t in tokens]
+
+def normalize_description(description):
+    return ' '.join(normalize_tokens(description))
+
+def token_set(tokens):
+    """Similarity tokens: a number is bound to the unit and word after it ("2 cup rice")."""
+    terms, quantities = set(), set()
+    i = 0
+    while i < len(tokens):
+        if tokens[i][0].isdigit():
+            j = i + 1
+            while j < len(tokens) and tokens[j] in UNITS.values():
+                j += 1
+            term = ' '.join(tokens[i:j + 1])
+            quantities.add(term)
+            terms.add(term)
+            i = j + 1
+        else:
+            terms.add(tokens[i])
+            i += 1
+    return terms, quantities
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS llm_cache (
+        key TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        version TEXT NOT NULL,
+        normalized TEXT NOT NULL,
+        quantities TEXT NOT NULL,
+        n_terms INTEGER NOT NULL,
+        result TEXT NOT NULL,
+        latency_ms REAL NOT NULL,
+        created_at REAL NOT NULL,
+        last_hit REAL NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_llm_cache_last_hit ON llm_cache (last_hit)',
+    '''
+    CREATE TABLE IF NOT EXISTS llm_cache_terms (
+        term TEXT NOT NULL,
+        key TEXT NOT NULL,
+        PRIMARY KEY (term, key)
+    ) WITHOUT ROWID
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_llm_cache_terms_key ON llm_cache_terms (key)',
+]
+
+class AnalysisCache:
+    """SQLite-backed cache of parsed LLM results, one connection per worker process."""
+    def __init__(self, path, ttl_days=30.0, max_entries=50000, similarity=0.0, busy_timeout_ms=5000):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.busy_timeout_ms = busy_timeout_ms
+        self._lock = threading.Lock()
+        self._pid = None
+        self._conn = None
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evicted = 0
+        self.lookup_seconds = 0.0
+        self.saved_ms = 0.0
+
+    def _db(self):
+        # Called with self._lock held; a forked worker opens its own connection.
+        if self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000.0,
+                                   check_same_thread=False, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            for sql in SCHEMA:
+                conn.execute(sql)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    @staticmethod
+    def key(kind, version, normalized):
+        return f'{kind}:{version}:{normalized}'
+
+    def get(self, kind, version, description):
+        """Cached result for a description, or None."""
+        t0 = time.perf_counter()
+        tokens = normalize_tokens(description)
+        normalized = ' '.join(tokens)
+        now = time.time()
+        with self._lock:
+            conn = self._db()
+            row = conn.execute('SELECT key, result, latency_ms FROM llm_cache WHERE key = ? AND created_at > ?',
+                               (self.key(kind, version, normalized), now - self.ttl)).fetchone()
+            similar = False
+            if row is None and self.similarity > 0:
+                row = self._similar(conn, kind, version, tokens, now)
+                similar = row is not None
+            if row is not None:
+                conn.execute('UPDATE llm_cache SET hits = hits + 1, last_hit = ? WHERE key = ?', (now, row[0]))
+            self.lookup_seconds += time.perf_counter() - t0
+            if row is None:
+                self.misses += 1
+                return None
+            if similar:
+                self.similar_hits += 1
+            else:
+                self.exact_hits += 1
+            self.saved_ms += row[2]
+        return json.loads(row[1])
+
+    def _similar(self, conn, kind, version, tokens, now):
+        terms, quantities = token_set(tokens)
+        if not terms:
+            return None
+        placeholders = ','.join('?' * len(terms))
+        candidates = conn.execute(f'''
+            SELECT c.key, c.result, c.latency_ms, c.n_terms, c.quantities, COUNT(*) AS shared
+            FROM llm_cache_terms t JOIN llm_cache c ON c.key = t.key
+            WHERE t.term IN ({placeholders}) AND c.kind = ? AND c.version = ? AND c.created_at > ?
+            GROUP BY c.key ORDER BY shared DESC LIMIT 20
+        ''', (*terms, kind, version, now - self.ttl)).fetchall()
+        wanted = json.dumps(sorted(quantities))
+        best, best_score = None, self.similarity
+        for key, result, latency_ms, n_terms, cand_quantities, shared in candidates:
+            score = shared / (len(terms) + n_terms - shared)
+            if cand_quantities == wanted and score >= best_score:
+                best, best_score = (key, result, latency_ms), score
+        return best
+
+    def put(self, kind, version, description, result, latency_seconds):
+        tokens = normalize_tokens(description)
+        normalized = ' '.join(tokens)
+        terms, quantities = token_set(tokens)
+        key = self.key(kind, version, normalized)
+        now = time.time()
+        with self._lock:
+            conn = self._db()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute('''INSERT OR REPLACE INTO llm_cache
+                                (key, kind, version, normalized, quantities, n_terms, result,
+                                 latency_ms, created_at, last_hit, hits)
+                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)''',
+                             (key, kind, version, normalized, json.dumps(sorted(quantities)), len(terms),
+                              json.dumps(result), 1000.0 * latency_seconds, now, now))
+                conn.execute('DELETE FROM llm_cache_terms WHERE key = ?', (key,))
+                conn.executemany('INSERT INTO llm_cache_terms (term, key) VALUES (?, ?)',
+                                 [(term, key) for term in terms])
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            self.stores += 1
+            if self.stores % 64 == 1:
+                self.evicted += self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        """Drop expired entries, then the least recently hit ones beyond max_entries."""
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            expired = [r[0] for r in conn.execute('SELECT key FROM llm_cache WHERE created_at <= ?',
+                                                  (now - self.ttl,))]
+            excess = conn.execute('SELECT COUNT(*) FROM llm_cache').fetchone()[0] - len(expired) - self.max_entries
+            if excess > 0:
+                # Evict an extra 10% so this does not run on every store.
+                expired += [r[0] for r in conn.execute(
+                    'SELECT key FROM llm_cache WHERE created_at > ? ORDER BY last_hit LIMIT ?',
+                    (now - self.ttl, excess + self.max_entries // 10))]
+            for i in range(0, len(expired), 500):
+                batch = expired[i:i + 500]
+                placeholders = ','.join('?' * len(batch))
+                conn.execute(f'DELETE FROM llm_cache WHERE key IN ({placeholders})', batch)
+                conn.execute(f'DELETE FROM llm_cache_terms WHERE key IN ({placeholders})', batch)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return len(expired)
+
+    def clear(self):
+        with self._lock:
+            conn = self._db()
+            conn.execute('DELETE FROM llm_cache')
+            conn.execute('DELETE FROM llm_cache_terms')
+
+    def stats(self):
+        with self._lock:
+            entries, total_hits, saved_total = self._db().execute(
+                'SELECT COUNT(*), COALESCE(SUM(hits), 0), COALESCE(SUM(hits * latency_ms), 0) FROM llm_cache'
+            ).fetchone()
+            lookups = self.exact_hits + self.similar_hits + self.misses
+            return {
+                "lookups": lookups,
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.exact_hits + self.similar_hits) / lookups, 4) if lookups else None,
+                "stores": self.stores,
+                "evicted": self.evicted,
+                "avg_lookup_ms": round(1000.0 * self.lookup_seconds / lookups, 3) if lookups else None,
+                "saved_ms": round(self.saved_ms, 1),
+                "entries": entries,
+                "lifetime_hits": total_hits,
+                "lifetime_saved_s": round(saved_total / 1000.0, 1),
+                "similarity": self.similarity,
+                "ttl_days": self.ttl / 86400,
+                "max_entries": self.max_entries,
+            }
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Inspect or clear the LLM analysis cache")
+    ap.add_argument("--db", default=os.environ.get('LLM_CACHE_DB', 'llm_cache.db'))
+    ap.add_argument("--stats", action="store_true")
+    ap.add_argument("--clear", action="store_true")
+    ap.add_argument("--normalize", metavar="TEXT", help="print the cache key text for a description")
+    args = ap.parse_args(argv)
+
+    if args.normalize is not None:
+        tokens = normalize_tokens(args.normalize)
+        terms, quantities = token_set(tokens)
+        print(json.dumps({"normalized": ' '.join(tokens), "terms": sorted(terms),
+                          "quantities": sorted(quantities)}, indent=2))
+    cache = AnalysisCache(args.db)
+    if args.clear:
+        cache.clear()
+        print(f"Cleared {args.db}")
+    if args.stats:
+        print(json.dumps(cache.stats(), indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+# llm_client.py
+# ================================================================
+# Shared, pooled OpenAI client for the /analyze-* endpoints
+# ================================================================
+# One OpenAI / AsyncOpenAI client per worker process, each on an httpx
+# connection pool with keep-alive, so calls reuse TLS connections instead of
+# building a client per request. Calls go through a concurrency limiter
+# (bursts wait for a slot, up to OPENAI_QUEUE_TIMEOUT) and are retried on
+# connection errors, timeouts, 429 and 5xx with capped exponential backoff
+# and full jitter. stats() feeds /health.
+#
+# Point OPENAI_BASE_URL at fake_openai.py to exercise it offline.
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import httpx
+import openai
+from openai import OpenAI, AsyncOpenAI
+
+OPENAI_POOL_SIZE = int(os.environ.get('OPENAI_POOL_SIZE', 100))
+OPENAI_KEEPALIVE = int(os.environ.get('OPENAI_KEEPALIVE', 20))
+OPENAI_KEEPALIVE_EXPIRY = float(os.environ.get('OPENAI_KEEPALIVE_EXPIRY', 30))
+OPENAI_CONNECT_TIMEOUT = float(os.environ.get('OPENAI_CONNECT_TIMEOUT', 5))
+OPENAI_TIMEOUT = float(os.environ.get('OPENAI_TIMEOUT', 60))
+OPENAI_MAX_RETRIES = int(os.environ.get('OPENAI_MAX_RETRIES', 2))
+OPENAI_RETRY_BASE = float(os.environ.get('OPENAI_RETRY_BASE', 0.5))
+OPENAI_RETRY_MAX = float(os.environ.get('OPENAI_RETRY_MAX', 8))
+OPENAI_MAX_CONCURRENCY = int(os.environ.get('OPENAI_MAX_CONCURRENCY', 100))
+OPENAI_QUEUE_TIMEOUT = float(os.environ.get('OPENAI_QUEUE_TIMEOUT', 30))
+
+RETRYABLE_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
+class LLMBusyError(RuntimeError):
+    """No concurrency slot freed up within the queue timeout."""
+
+class LLMKeyMissingError(RuntimeError):
+    """A call has to reach the API but OPENAI_API_KEY is not set."""
+
+def require_api_key():
+    if not os.environ.get('OPENAI_API_KEY'):
+        raise LLMKeyMissingError("OPENAI_API_KEY not set")
+
+class LLMClient:
+    def __init__(self, pool_size=100, keepalive=20, keepalive_expiry=30.0, connect_timeout=5.0, timeout=60.0,
+                 max_retries=2, retry_base=0.5, retry_max=8.0, max_concurrency=100, queue_timeout=30.0):
+        # Idle connections beyond `keepalive` are closed: a large idle pool
+        # makes httpcore scan more connections per request than it saves.
+        self.limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=min(keepalive, pool_size),
+                                   keepalive_expiry=keepalive_expiry)
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._reset()
+
+    @classmethod
+    def from_env(cls):
+        return cls(pool_size=OPENAI_POOL_SIZE, keepalive=OPENAI_KEEPALIVE,
+                   keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+                   connect_timeout=OPENAI_CONNECT_TIMEOUT, timeout=OPENAI_TIMEOUT,
+                   max_retries=OPENAI_MAX_RETRIES, retry_base=OPENAI_RETRY_BASE,
+                   retry_max=OPENAI_RETRY_MAX, max_concurrency=OPENAI_MAX_CONCURRENCY,
+                   queue_timeout=OPENAI_QUEUE_TIMEOUT)
+
+    def _reset(self):
+        # Also called after a fork: the parent's sockets must not be shared.
+        self._pid = os.getpid()
+        self._sync = None
+        self._async = None
+        self._async_slots = None
+        self._sync_slots = threading.BoundedSemaphore(self.max_concurrency)
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.waiting = 0
+        self.queue_seconds = 0.0
+        self.latencies = deque(maxlen=1024)
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset()
+
+    def sync_client(self):
+        self._check_pid()
+        if self._sync is None:
+            with self._lock:
+                if self._sync is None:
+                    self._sync = OpenAI(api_key=os.environ.get('OPENAI_API_KEY'), max_retries=0,
+                                        timeout=self.timeout,
+                                        http_client=httpx.Client(limits=self.limits, timeout=self.timeout))
+        return self._sync
+
+    def async_client(self):
+        # Used from a single event loop per process (uvicorn worker).
+        self._check_pid()
+        if self._async is None:
+            self._async = AsyncOpenAI(api_key=os.environ.get('OPENAI_API_KEY'), max_retries=0,
+                                      timeout=self.timeout,
+                                      http_client=httpx.AsyncClient(limits=self.limits, timeout=self.timeout))
+            self._async_slots = asyncio.Semaphore(self.max_concurrency)
+        return self._async
+
+    def backoff(self, attempt, error=None):
+        """Full-jitter exponential backoff; a server's Retry-After wins when it is shorter than the cap."""
+        response = getattr(error, 'response', None)
+        retry_after = response.headers.get('retry-after') if response is not None else None
+        try:
+            if retry_after is not None and 0 <= float(retry_after) <= self.retry_max:
+                return float(retry_after)
+        except ValueError:
+            pass
+        return random.uniform(0, min(self.retry_max, self.retry_base * 2 ** attempt))
+
+    def _queued(self, waited):
+        with self._lock:
+            self.waiting -= 1
+            self.queue_seconds += waited
+
+    def _started(self):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _finished(self, elapsed, ok):
+        with self._lock:
+            self.in_flight -= 1
+            self.latencies.append(elapsed)
+            if not ok:
+                self.failures += 1
+
+    def _reject(self):
+        with self._lock:
+            self.rejected += 1
+        raise LLMBusyError(f"Too many concurrent AI requests; none finished within {self.queue_timeout:.0f}s")
+
+    def _retrying(self):
+        with self._lock:
+            self.retries += 1
+
+    def complete(self, request_kwargs):
+        """chat.completions.create with pooling, limiting and retries (blocking)."""
+        client = self.sync_client()
+        with self._lock:
+            self.waiting += 1
+        t0 = time.perf_counter()
+        acquired = self._sync_slots.acquire(timeout=self.queue_timeout)
+        self._queued(time.perf_counter() - t0)
+        if not acquired:
+            self._reject()
+        self._started()
+        t0, ok = time.perf_counter(), False
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = client.chat.completions.create(**request_kwargs)
+                    ok = True
+                    return response
+                except RETRYABLE_ERRORS as e:
+                    if attempt == self.max_retries:
+                        raise
+                    self._retrying()
+                    time.sleep(self.backoff(attempt, e))
+        finally:
+            self._finished(time.perf_counter() - t0, ok)
+            self._sync_slots.release()
+
+    async def acomplete(self, request_kwargs):
+        """Async twin of complete() for asgi.py."""
+        client = self.async_client()
+        with self._lock:
+            self.waiting += 1
+        t0 = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._async_slots.acquire(), self.queue_timeout)
+            acquired = True
+        except asyncio.TimeoutError:
+            acquired = False
+        self._queued(time.perf_counter() - t0)
+        if not acquired:
+            self._reject()
+        self._started()
+        t0, ok = time.perf_counter(), False
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = await client.chat.completions.create(**request_kwargs)
+                    ok = True
+                    return response
+                except RETRYABLE_ERRORS as e:
+                    if attempt == self.max_retries:
+                        raise
+                    self._retrying()
+                    await asyncio.sleep(self.backoff(attempt, e))
+        finally:
+            self._finished(time.perf_counter() - t0, ok)
+            self._async_slots.release()
+
+    def close(self):
+        if self._sync is not None:
+            self._sync.close()
+            self._sync = None
+
+    async def aclose(self):
+        if self._async is not None:
+            await self._async.close()
+            self._async = None
+
+    def stats(self):
+        with self._lock:
+            lat = sorted(self.latencies)
+            pick = lambda q: round(1000.0 * lat[min(len(lat) - 1, int(q * len(lat)))], 1) if lat else None
+            return {
+                "calls": self.calls,
+                "failures": self.failures,
+                "retries": self.retries,
+                "rejected": self.rejected,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "waiting": self.waiting,
+                "avg_queue_ms": (round(1000.0 * self.queue_seconds / (self.calls + self.rejected), 1)
+                                 if self.calls + self.rejected else None),
+                "latency_ms": {"p50": pick(0.5), "p95": pick(0.95), "max": pick(1.0)},
+                "pool": {
+                    "max_connections": self.limits.max_connections,
+                    "max_keepalive": self.limits.max_keepalive_connections,
+                    "keepalive_expiry": self.limits.keepalive_expiry,
+                    "max_concurrency": self.max_concurrency,
+                    "open_connections": _open_connections(self._sync) + _open_connections(self._async),
+                },
+            }
+
+def _open_connections(client):
+    # httpx keeps its pool on the transport; best effort, it is not public API.
+    pool = getattr(getattr(getattr(client, '_client', None), '_transport', None), '_pool', None)
+    return len(getattr(pool, 'connections', ()))
@@ -0,0 +1,120 @@
+# memory_report.py
+# ================================================================
+# Per-worker memory report for gunicorn (Linux only)
+# ================================================================
+# Starts gunicorn twice -- once with every worker loading its own model, once
+# with a preloaded master and memory-mapped model arrays -- sends a few
+# /predict requests, and prints RSS / PSS / private memory for each worker
+# from /proc/<pid>/smaps_rollup.
+#
+# Usage:
+#   python memory_report.py [--workers 4] [--format auto|bundle|compiled]
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+SAMPLE_PAYLOAD = {"RIAGENDR": 1, "RIDAGEYR": 55, "RIDRETH1": 3, "BMXWT": 95, "BMXHT": 172}
+
+SCENARIOS = [
+    ("before (per-worker load)", {"GUNICORN_PRELOAD": "0", "MODEL_MMAP": "0"}),
+    ("after (preload + mmap)", {"GUNICORN_PRELOAD": "1", "MODEL_MMAP": "1"}),
+]
+
+def read_smaps_rollup(pid):
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])  # kB
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+def child_pids(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+def wait_healthy(port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=2) as r:
+                if json.load(r).get("model_loaded"):
+                    return True
+        except Exception:
+            pass
+        time.sleep(0.5)
+    return False
+
+def post_predict(port):
+    req = urllib.request.Request(
+        f"http://127.0.0.1:{port}/predict",
+        data=json.dumps(SAMPLE_PAYLOAD).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(req, timeout=30) as r:
+        r.read()
+
+def measure(label, extra_env, args):
+    env = dict(os.environ, PORT=str(args.port), WEB_CONCURRENCY=str(args.workers),
+               MODEL_FORMAT=args.format, **extra_env)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "api:app"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        if not wait_healthy(args.port, args.timeout):
+            raise RuntimeError(f"{label}: gunicorn did not become healthy")
+        # Without preload, /health can answer before every worker has loaded.
+        deadline = time.monotonic() + args.timeout
+        workers = child_pids(proc.pid)
+        while len(workers) < args.workers and time.monotonic() < deadline:
+            time.sleep(0.5)
+            workers = child_pids(proc.pid)
+        for _ in range(args.requests):
+            post_predict(args.port)
+        time.sleep(args.settle)
+        return {"master": read_smaps_rollup(proc.pid),
+                "workers": {pid: read_smaps_rollup(pid) for pid in child_pids(proc.pid)}}
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+def print_report(label, report):
+    mb = lambda kb: kb / 1024.0
+    print(f"\n=== {label} ===")
+    print(f"{'process':>14s} {'RSS MB':>9s} {'PSS MB':>9s} {'shared MB':>10s} {'private MB':>11s}")
+    rows = [("master", report["master"])] + [(f"worker {pid}", m) for pid, m in report["workers"].items()]
+    for name, m in rows:
+        print(f"{name:>14s} {mb(m['rss']):9.1f} {mb(m['pss']):9.1f} {mb(m['shared']):10.1f} {mb(m['private']):11.1f}")
+    total_pss = sum(m["pss"] for _, m in rows)
+    print(f"{'total PSS':>14s} {mb(total_pss):9.1f}")
+    return total_pss
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-worker gunicorn memory report")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--port", type=int, default=5055)
+    ap.add_argument("--format", default="auto", choices=["auto", "bundle", "compiled"])
+    ap.add_argument("--requests", type=int, default=20)
+    ap.add_argument("--timeout", type=float, default=180.0)
+    ap.add_argument("--settle", type=float, default=5.0,
+                    help="seconds to wait after the requests (covers non-preloaded worker startup)")
+    args = ap.parse_args()
+
+    totals = []
+    for label, extra_env in SCENARIOS:
+        totals.append(print_report(label, measure(label, extra_env, args)))
+    print(f"\nTotal PSS: {totals[0] / 1024.0:.1f} MB -> {totals[1] / 1024.0:.1f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+# migrations.py
+# ================================================================
+# Versioned SQLite schema for api.py
+# ================================================================
+# Each migration runs once, in order, inside a BEGIN IMMEDIATE transaction
+# (steps are SQL strings or callables taking the connection);
+# the applied version is stored in PRAGMA user_version. Databases created by
+# the old CREATE TABLE IF NOT EXISTS init_db start at version 0 and pick up
+# migration 1 as a no-op. Append new migrations -- never edit applied ones.
+#
+# Usage:
+#   python migrations.py [--db diabetes_app.db] [--check-plans]
+import argparse
+import re
+import sqlite3
+import sys
+
+import rollups
+import streaks
+
+MIGRATIONS = [
+    (1, "baseline schema", [
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS auth_tokens (
+            token TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS glucose_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            value REAL NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS nutrition_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            name TEXT NOT NULL,
+            servings REAL NOT NULL,
+            carbs REAL NOT NULL,
+            protein REAL NOT NULL,
+            fat REAL NOT NULL,
+            fiber REAL NOT NULL,
+            calories REAL NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS activity_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            minutes INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            calories INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS weight_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            weight REAL NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS risk_assessments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            probability REAL NOT NULL,
+            risk_level INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS goals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL UNIQUE,
+            glucose_min REAL,
+            glucose_max REAL,
+            calorie_target REAL,
+            carb_target REAL,
+            activity_weekly_minutes INTEGER,
+            weight_target REAL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS streaks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL UNIQUE,
+            current_streak INTEGER DEFAULT 0,
+            longest_streak INTEGER DEFAULT 0,
+            last_activity_date TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS milestones (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            milestone_type TEXT NOT NULL,
+            milestone_name TEXT NOT NULL,
+            achieved_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+        ''',
+    ]),
+    # Keyset pagination orders by (date, id); with a value column in the
+    # glucose/weight indexes the rowid no longer follows date and SQLite adds
+    # a sort step, so those two index (user_id, date) only.
+    (2, "per-user time-series indexes", [
+        'CREATE INDEX IF NOT EXISTS idx_glucose_user_date ON glucose_data (user_id, date)',
+        'CREATE INDEX IF NOT EXISTS idx_nutrition_user_date ON nutrition_data (user_id, date)',
+        'CREATE INDEX IF NOT EXISTS idx_activity_user_date ON activity_data (user_id, date)',
+        'CREATE INDEX IF NOT EXISTS idx_weight_user_date ON weight_data (user_id, date)',
+        'CREATE INDEX IF NOT EXISTS idx_risk_user_created ON risk_assessments (user_id, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_milestones_user_name ON milestones (user_id, milestone_name)',
+        'CREATE INDEX IF NOT EXISTS idx_auth_tokens_expires ON auth_tokens (expires_at)',
+    ]),
+    # Folded into migration 2 before release; the number stays reserved so
+    # user_version keeps its meaning.
+    (3, "reserved", []),
+    (4, "daily_rollups table, backfilled from raw rows", [
+        '''
+        CREATE TABLE IF NOT EXISTS daily_rollups (
+            user_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            metric TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            total REAL,
+            min_value REAL,
+            max_value REAL,
+            PRIMARY KEY (user_id, date, metric)
+        ) WITHOUT ROWID
+        ''',
+        # Backfill frozen as of this migration; rollups.py may change later.
+        'DELETE FROM daily_rollups',
+        '''
+        INSERT INTO daily_rollups (user_id, date, metric, count, total, min_value, max_value)
+        SELECT user_id, date, 'glucose', COUNT(value), SUM(value), MIN(value), MAX(value)
+        FROM glucose_data GROUP BY user_id, date
+        UNION ALL
+        SELECT d.user_id, d.date, 'glucose_below', SUM(d.value < gl.glucose_min), NULL, NULL, NULL
+        FROM glucose_data d JOIN goals gl ON gl.user_id = d.user_id
+        WHERE gl.glucose_min IS NOT NULL GROUP BY d.user_id, d.date
+        UNION ALL
+        SELECT d.user_id, d.date, 'glucose_above', SUM(d.value > gl.glucose_max), NULL, NULL, NULL
+        FROM glucose_data d JOIN goals gl ON gl.user_id = d.user_id
+        WHERE gl.glucose_max IS NOT NULL GROUP BY d.user_id, d.date
+        ''',
+        '''
+        INSERT INTO daily_rollups (user_id, date, metric, count, total, min_value, max_value)
+        SELECT user_id, date, 'calories', COUNT(calories), SUM(calories), MIN(calories), MAX(calories)
+        FROM nutrition_data GROUP BY user_id, date
+        UNION ALL
+        SELECT user_id, date, 'carbs', COUNT(carbs), SUM(carbs), MIN(carbs), MAX(carbs)
+        FROM nutrition_data GROUP BY user_id, date
+        UNION ALL
+        SELECT user_id, date, 'protein', COUNT(protein), SUM(protein), MIN(protein), MAX(protein)
+        FROM nutrition_data GROUP BY user_id, date
+        UNION ALL
+        SELECT user_id, date, 'fat', COUNT(fat), SUM(fat), MIN(fat), MAX(fat)
+        FROM nutrition_data GROUP BY user_id, date
+        UNION ALL
+        SELECT user_id, date, 'fiber', COUNT(fiber), SUM(fiber), MIN(fiber), MAX(fiber)
+        FROM nutrition_data GROUP BY user_id, date
+        ''',
+        '''
+        INSERT INTO daily_rollups (user_id, date, metric, count, total, min_value, max_value)
+        SELECT user_id, date, 'activity_minutes', COUNT(minutes), SUM(minutes), MIN(minutes), MAX(minutes)
+        FROM activity_data GROUP BY user_id, date
+        UNION ALL
+        SELECT user_id, date, 'activity_calories', COUNT(calories), SUM(calories), MIN(calories), MAX(calories)
+        FROM activity_data GROUP BY user_id, date
+        ''',
+        '''
+        INSERT INTO daily_rollups (user_id, date, metric, count, total, min_value, max_value)
+        SELECT user_id, date, 'weight', COUNT(weight), SUM(weight), MIN(weight), MAX(weight)
+        FROM weight_data GROUP BY user_id, date
+        ''',
+    ]),
+    # jti of logged-out signed tokens, kept until the token would expire anyway.
+    (5, "revoked_tokens denylist for signed auth tokens", [
+        '''
+        CREATE TABLE IF NOT EXISTS revoked_tokens (
+            jti TEXT PRIMARY KEY,
+            expires_at INTEGER NOT NULL
+        ) WITHOUT ROWID
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires ON revoked_tokens (expires_at)',
+    ]),
+    # Per-user change counters behind the ETags of goals/streaks/milestones/risk.
+    (6, "data_versions for cached read-mostly responses", [
+        '''
+        CREATE TABLE IF NOT EXISTS data_versions (
+            user_id INTEGER NOT NULL,
+            resource TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            PRIMARY KEY (user_id, resource)
+        ) WITHOUT ROWID
+        ''',
+    ]),
+    # check_milestones now relies on INSERT OR IGNORE; keep the first award
+    # of each milestone and enforce uniqueness from here on.
+    (7, "unique (user_id, milestone_name) on milestones", [
+        '''
+        DELETE FROM milestones WHERE id NOT IN (
+            SELECT MIN(id) FROM milestones GROUP BY user_id, milestone_name)
+        ''',
+        'DROP INDEX IF EXISTS idx_milestones_user_name',
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_milestones_user_name ON milestones (user_id, milestone_name)',
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def apply_migrations(conn):
+    """Bring the database up to SCHEMA_VERSION; returns the resulting version."""
+    for version, name, statements in MIGRATIONS:
+        if schema_version(conn) >= version:
+            continue
+        # Several gunicorn workers may start at once: take the write lock and
+        # re-check so each migration is applied exactly once.
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            applied = schema_version(conn) < version
+            if applied:
+                for sql in statements:
+                    if callable(sql):
+                        sql(conn)
+                    else:
+                        conn.execute(sql)
+                conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        if applied:
+            print(f"Applied migration {version}: {name}")
+    return schema_version(conn)
+
+# ================================================================
+# Query plan check
+# ================================================================
+# Hot per-user statements, taken from the modules that run them. None of them
+# may fall back to a full table scan; run `python migrations.py --check-plans`
+# after schema changes. api.py's own statements (api.HOT_QUERIES) are checked
+# the same way by tests/test_query_plans.py.
+HOT_QUERIES = {**streaks.HOT_QUERIES, **rollups.HOT_QUERIES}
+
+_CTE_RE = re.compile(r'\b(\w+)\s*(?:\([^()]*\)\s*)?AS\s*\(', re.IGNORECASE)
+_ALIAS_RE = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+AS)?\s+(\w+)', re.IGNORECASE)
+
+def query_plan(conn, sql, params=()):
+    return [row[-1] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params).fetchall()]
+
+def scanned_tables(conn, sql, plan):
+    """Tables a plan walks in full: "SCAN t [USING [COVERING] INDEX ...]" of a
+    real table or an alias of one, not of a CTE, subquery or VALUES list."""
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    ctes = {name.lower() for name in _CTE_RE.findall(sql)}
+    aliases = {alias: name for name, alias in _ALIAS_RE.findall(sql) if name.lower() not in ctes}
+    scanned = []
+    for step in plan:
+        if step.startswith('SCAN '):
+            target = step.split()[1]
+            table = target if target in tables else aliases.get(target)
+            if table in tables:
+                scanned.append(table)
+    return scanned
+
+def check_query_plans(conn, queries=None):
+    """Return {name: plan} for every hot query whose plan contains a full table scan."""
+    failures = {}
+    for name, (sql, params) in (HOT_QUERIES if queries is None else queries).items():
+        plan = query_plan(conn, sql, params)
+        if scanned_tables(conn, sql, plan):
+            failures[name] = plan
+    return failures
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Apply schema migrations to the app database")
+    ap.add_argument("--db", default="diabetes_app.db")
+    ap.add_argument("--check-plans", action="store_true",
+                    help="fail if a hot query plans a full table scan")
+    args = ap.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    print(f"Schema version {schema_version(conn)} -> {apply_migrations(conn)}")
+    if args.check_plans:
+        failures = check_query_plans(conn)
+        for name, plan in failures.items():
+            print(f"[plan] {name}: {' | '.join(plan)}")
+        print(f"{len(HOT_QUERIES) - len(failures)}/{len(HOT_QUERIES)} hot queries use an index")
+        conn.close()
+        return 1 if failures else 0
+    conn.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
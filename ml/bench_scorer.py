@@ -0,0 +1,94 @@
+# bench_scorer.py
+# ================================================================
+# Parity check + microbenchmark: NumPy fast paths vs predict_one
+# ================================================================
+# Usage (from ml/, after train_model.py):
+#   python bench_scorer.py [--rows 200] [--repeat 3]
+# Exits non-zero if the fast path (or the compiled artifact, when present)
+# disagrees with the DataFrame path or is not faster, so it can guard
+# against regressions in CI.
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from scorer import load_bundle, load_compiled, predict_one, ArrayScorer, COMPILED_PATH
+
+def sample_payloads(n, seed=0):
+    rng = np.random.default_rng(seed)
+    payloads = []
+    for _ in range(n):
+        height = float(rng.uniform(145, 200))
+        weight = float(rng.uniform(40, 160))
+        row = {
+            "RIAGENDR": int(rng.integers(1, 3)),
+            "RIDAGEYR": int(rng.integers(18, 81)),
+            "RIDRETH1": int(rng.integers(1, 6)),
+            "BMXWT": weight,
+            "BMXHT": height,
+            "BMXBMI": weight / (height / 100.0) ** 2,
+            "BMXWAIST": float(rng.uniform(60, 150)),
+            "BMXHIP": float(rng.uniform(70, 150)),
+        }
+        # Drop a field now and then so the imputer is exercised too.
+        if rng.random() < 0.3:
+            row.pop(str(rng.choice(["BMXWAIST", "BMXHIP"])))
+        payloads.append(row)
+    return payloads
+
+def time_per_call(fn, payloads, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for p in payloads:
+            fn(p)
+        best = min(best, (time.perf_counter() - t0) / len(payloads))
+    return best
+
+def main():
+    ap = argparse.ArgumentParser(description="Fast-path parity check and microbenchmark")
+    ap.add_argument("--rows", type=int, default=200)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--atol", type=float, default=1e-12)
+    # xgboost accumulates margins in float32, so the compiled artifact gets a looser bound.
+    ap.add_argument("--compiled-atol", type=float, default=1e-6)
+    args = ap.parse_args()
+
+    bundle = load_bundle()
+    fast = ArrayScorer(bundle)
+    payloads = sample_payloads(args.rows)
+
+    ref = np.array([predict_one(p, bundle=bundle)["probability"] for p in payloads])
+    got = fast.predict_proba(fast.to_array(payloads))
+    one = np.array([fast.predict_one(p)["probability"] for p in payloads])
+    max_diff = float(max(np.max(np.abs(ref - got)), np.max(np.abs(ref - one))))
+    print(f"Parity: max |fast - predict_one| = {max_diff:.3e} over {len(payloads)} rows")
+
+    t_ref = time_per_call(lambda p: predict_one(p, bundle=bundle), payloads, args.repeat)
+    t_fast = time_per_call(fast.predict_one, payloads, args.repeat)
+    print(f"predict_one:            {t_ref * 1e6:10.1f} us/row")
+    print(f"ArrayScorer.predict_one:{t_fast * 1e6:10.1f} us/row  ({t_ref / t_fast:.2f}x)")
+
+    status = 0
+    if max_diff > args.atol:
+        print("FAIL: fast path probabilities differ from predict_one")
+        status = 1
+    if t_fast >= t_ref:
+        print("FAIL: fast path is not faster than predict_one")
+        status = 1
+
+    if os.path.exists(COMPILED_PATH):
+        compiled = load_compiled()
+        c_diff = float(np.max(np.abs(compiled.predict_proba(compiled.to_array(payloads)) - ref)))
+        t_comp = time_per_call(compiled.predict_one, payloads, args.repeat)
+        print(f"Compiled parity: max |compiled - predict_one| = {c_diff:.3e}")
+        print(f"CompiledScorer.predict_one:{t_comp * 1e6:7.1f} us/row  ({t_ref / t_comp:.2f}x)")
+        if c_diff > args.compiled_atol:
+            print("FAIL: compiled artifact probabilities differ from predict_one")
+            status = 1
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
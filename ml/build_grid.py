@@ -0,0 +1,44 @@
+# build_grid.py
+# ================================================================
+# Precompute the dense risk grid served by /predict when PREDICT_GRID=1
+# ================================================================
+# Usage (from ml/, after train_model.py):
+#   python build_grid.py [--format auto|bundle|compiled] [--bmi-step 0.5] [--height-step 5]
+# Scores every (gender, age, race, height, BMI) cell once and writes
+# ml_outputs/risk_grid.npz together with an empirical error bound against
+# the live model. The grid is tied to the model file's fingerprint; api.py
+# ignores it after a retrain until it is rebuilt.
+import argparse
+import json
+import os
+import time
+
+from scorer import (load_bundle, load_compiled, model_fingerprint, build_risk_grid,
+                    ArrayScorer, GRID_AXES, GRID_PATH, BUNDLE_PATH, COMPILED_PATH)
+
+def main():
+    ap = argparse.ArgumentParser(description="Build the precomputed risk grid")
+    ap.add_argument("--format", default="auto", choices=["auto", "bundle", "compiled"])
+    ap.add_argument("--bmi-step", type=float, default=None)
+    ap.add_argument("--height-step", type=float, default=None)
+    ap.add_argument("--check", type=int, default=20000, help="random inputs used for the error bound")
+    ap.add_argument("--out", default=GRID_PATH)
+    args = ap.parse_args()
+
+    if args.format == "compiled" or (args.format == "auto" and os.path.exists(COMPILED_PATH)):
+        scorer, model_path = load_compiled(), COMPILED_PATH
+    else:
+        scorer, model_path = ArrayScorer(load_bundle()), BUNDLE_PATH
+
+    steps = {"BMXBMI": args.bmi_step, "BMXHT": args.height_step}
+    axes = [(name, start, stop, steps.get(name) or step) for name, start, stop, step in GRID_AXES]
+
+    t0 = time.perf_counter()
+    grid = build_risk_grid(scorer, model_fingerprint(model_path), axes=axes, n_check=args.check)
+    grid.save(args.out)
+    print(f"Saved {grid.table.size} cells to {args.out} in {time.perf_counter() - t0:.1f}s")
+    print("Error bound vs live model:")
+    print(json.dumps(grid.spec["error_bound"], indent=2))
+
+if __name__ == "__main__":
+    main()
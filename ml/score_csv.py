@@ -0,0 +1,142 @@
+# score_csv.py
+# ================================================================
+# Streaming batch scorer for large population files
+# ================================================================
+# Usage (from ml/, after train_model.py):
+#   python score_csv.py people.csv scores.parquet [--chunksize 100000] [--workers 4]
+#   python score_csv.py people.csv scores.csv --keep SEQN --reader pyarrow
+# Reads the input in chunks, scores each chunk on the raw float array
+# (compiled artifact or ArrayScorer) and appends it to the output, so memory
+# stays at a few chunks regardless of input size. Output is Parquet when the
+# path ends in .parquet (needs pyarrow), CSV otherwise.
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from scorer import (load_bundle, load_compiled, predict_batch, ArrayScorer,
+                    BUNDLE_PATH, COMPILED_PATH)
+
+_worker_scorer = None
+
+def load_scorer(fmt="auto", mmap_mode="r"):
+    if fmt == "compiled" or (fmt == "auto" and os.path.exists(COMPILED_PATH)):
+        return load_compiled(COMPILED_PATH, mmap_mode=mmap_mode)
+    return ArrayScorer(load_bundle(BUNDLE_PATH, mmap_mode=mmap_mode))
+
+def iter_chunks(path, chunksize, reader="pandas"):
+    if reader == "pyarrow":
+        # pandas' pyarrow engine has no chunksize; stream record batches instead.
+        import pyarrow.csv as pacsv
+
+        # block_size is in bytes; ~64 bytes per row is typical for these files.
+        opts = pacsv.ReadOptions(block_size=max(1 << 20, chunksize * 64))
+        with pacsv.open_csv(path, read_options=opts) as stream:
+            for batch in stream:
+                yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize, low_memory=False)
+
+def score_chunk(chunk, scorer, keep):
+    feats = scorer.feature_names
+    missing = [c for c in feats if c not in chunk.columns]
+    if missing:
+        raise ValueError(f"Missing required features for scoring: {missing}")
+    X = chunk[feats].apply(pd.to_numeric, errors="coerce")
+    scored = predict_batch(X, scorer=scorer, keep=[])
+    cols = chunk.columns if keep is None else [c for c in keep if c in chunk.columns]
+    return pd.concat([chunk[cols].reset_index(drop=True), scored.reset_index(drop=True)], axis=1)
+
+def _init_worker(fmt):
+    global _worker_scorer
+    _worker_scorer = load_scorer(fmt)
+
+def _score_in_worker(chunk, keep):
+    return score_chunk(chunk, _worker_scorer, keep)
+
+def score_stream(chunks, fmt="auto", keep=None, workers=1):
+    """Yield scored chunks in input order, at most 2 * workers chunks in flight."""
+    if workers <= 1:
+        scorer = load_scorer(fmt)
+        for chunk in chunks:
+            yield score_chunk(chunk, scorer, keep)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(fmt,)) as ex:
+        pending = []
+        for chunk in chunks:
+            pending.append(ex.submit(_score_in_worker, chunk, keep))
+            if len(pending) >= 2 * workers:
+                yield pending.pop(0).result()
+        for fut in pending:
+            yield fut.result()
+
+class CsvSink:
+    def __init__(self, path):
+        self.path = path
+        self.header = True
+
+    def write(self, df):
+        df.to_csv(self.path, mode="w" if self.header else "a", header=self.header, index=False)
+        self.header = False
+
+    def close(self):
+        if self.header:
+            open(self.path, "w").close()
+
+class ParquetSink:
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa, self._pq = pa, pq
+        self.path = path
+        self.writer = None
+
+    def write(self, df):
+        if self.writer is None:
+            table = self._pa.Table.from_pandas(df, preserve_index=False)
+            self.writer = self._pq.ParquetWriter(self.path, table.schema)
+        else:
+            # Later chunks may infer different dtypes (e.g. an all-NaN int column).
+            table = self._pa.Table.from_pandas(df, schema=self.writer.schema, preserve_index=False)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+def open_sink(path):
+    return ParquetSink(path) if path.endswith(".parquet") else CsvSink(path)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Score a large CSV in constant memory")
+    ap.add_argument("input")
+    ap.add_argument("output", help="*.parquet for Parquet, anything else for CSV")
+    ap.add_argument("--chunksize", type=int, default=100000, help="rows per chunk")
+    ap.add_argument("--reader", default="pandas", choices=["pandas", "pyarrow"])
+    ap.add_argument("--format", default="auto", choices=["auto", "bundle", "compiled"])
+    ap.add_argument("--keep", nargs="*", default=None,
+                    help="input columns copied to the output (default: all)")
+    ap.add_argument("--workers", type=int, default=1, help="scoring processes")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    rows = 0
+    sink = open_sink(args.output)
+    try:
+        chunks = iter_chunks(args.input, args.chunksize, args.reader)
+        for scored in score_stream(chunks, fmt=args.format, keep=args.keep, workers=args.workers):
+            sink.write(scored)
+            rows += len(scored)
+            print(f"\r{rows} rows scored", end="", file=sys.stderr, flush=True)
+    finally:
+        sink.close()
+    elapsed = time.perf_counter() - t0
+    print(f"\nScored {rows} rows into {args.output} in {elapsed:.1f}s "
+          f"({rows / max(elapsed, 1e-9):.0f} rows/s)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
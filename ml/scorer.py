@@ -1,21 +1,43 @@
 # scorer.py
+import glob
+import hashlib
+import io
+import json
 import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
 import joblib
 import numpy as np
 import pandas as pd
 
 RESULTS_DIR = "ml_outputs"
 BUNDLE_PATH = os.path.join(RESULTS_DIR, "risk_model_bundle.joblib")
+COMPILED_PATH = os.path.join(RESULTS_DIR, "risk_model_compiled.npz")
+GRID_PATH = os.path.join(RESULTS_DIR, "risk_grid.npz")
+COMPILED_FORMAT = "diametrics-compiled"
+COMPILED_VERSION = 1
 
-def load_bundle(path=BUNDLE_PATH):
+def load_bundle(path=BUNDLE_PATH, mmap_mode=None):
+    # mmap_mode="r" maps the bundle's NumPy arrays read-only from the file so
+    # that every worker shares the same page-cache pages.
     if not os.path.exists(path):
         raise FileNotFoundError(f"Model bundle not found at: {os.path.abspath(path)}")
-    return joblib.load(path)
+    return joblib.load(path, mmap_mode=mmap_mode)
 
 def prob_to_risk_level(prob, n_levels=10):
     prob = float(prob)
     return int(np.clip(np.ceil(prob * n_levels), 1, n_levels))
 
+def risk_levels(probs, n_levels=10):
+    """Vectorized prob_to_risk_level over an array of probabilities."""
+    return np.clip(np.ceil(np.asarray(probs, dtype=np.float64) * n_levels), 1, n_levels).astype(np.int8)
+
 def predict_one(payload: dict, bundle=None):
     if bundle is None:
         bundle = load_bundle()
@@ -30,15 +52,612 @@ def predict_one(payload: dict, bundle=None):
         "risk_level": prob_to_risk_level(prob),
     }
 
-def predict_batch(df: pd.DataFrame, bundle=None):
+def predict_batch(df: pd.DataFrame, bundle=None, scorer=None, keep=None):
+    """Append probability/risk_level to df.
+
+    With keep=None the result is a full copy of df; otherwise only the keep
+    columns are carried over. A _RowScorer (ArrayScorer/CompiledScorer) can be
+    passed instead of a bundle to score the raw float array.
+    """
+    if scorer is not None:
+        feats = scorer.feature_names
+        probs = scorer.predict_proba(df[feats].to_numpy(dtype=np.float64))
+    else:
+        if bundle is None:
+            bundle = load_bundle()
+        feats = bundle["feature_names"]
+        probs = bundle["pipeline_calibrated"].predict_proba(df[feats])[:, 1]
+    out = df.copy() if keep is None else df[list(keep)].copy()
+    out["probability"] = probs
+    out["risk_level"] = risk_levels(probs)
+    return out
+
+def predict_many(payloads, bundle=None):
+    """Score a list of payload dicts with a single predict_proba call."""
     if bundle is None:
         bundle = load_bundle()
-    pipe = bundle["pipeline_calibrated"]
+    if not payloads:
+        return []
     feats = bundle["feature_names"]
-    X = df[feats]
-    probs = pipe.predict_proba(X)[:, 1]
-    levels = [prob_to_risk_level(p) for p in probs]
-    out = df.copy()
-    out["probability"] = probs
-    out["risk_level"] = levels
-    return out
+    df = pd.DataFrame.from_records(
+        [{k: p.get(k, np.nan) for k in feats} for p in payloads],
+        columns=feats,
+    ).astype(float)
+    scored = predict_batch(df, bundle=bundle)
+    return [
+        {"probability": float(prob), "risk_level": int(level)}
+        for prob, level in zip(scored["probability"], scored["risk_level"])
+    ]
+
+# ================================================================
+# NumPy fast path
+# ================================================================
+# Evaluates the calibrated pipeline on raw float64 arrays, bypassing the
+# one-row DataFrame and sklearn's feature-name validation. Imputer and
+# scaler are applied with plain NumPy; any other preprocessing step falls
+# back to its own transform(). SMOTE is a fit-time-only step and is skipped.
+
+class _RowScorer:
+    # Subclasses set feature_names and implement predict_proba(X) -> P(class 1).
+    def _set_features(self, feature_names):
+        self.feature_names = list(feature_names)
+        self._index = {k: j for j, k in enumerate(self.feature_names)}
+
+    def to_array(self, payloads):
+        X = np.full((len(payloads), len(self.feature_names)), np.nan, dtype=np.float64)
+        for i, payload in enumerate(payloads):
+            for k, v in payload.items():
+                j = self._index.get(k)
+                if j is not None and v is not None:
+                    X[i, j] = v
+        return X
+
+    def predict_one(self, payload):
+        prob = float(self.predict_proba(self.to_array([payload]))[0])
+        return {
+            "probability": prob,
+            "risk_level": prob_to_risk_level(prob),
+        }
+
+    def predict_many(self, payloads):
+        if not payloads:
+            return []
+        probs = self.predict_proba(self.to_array(payloads))
+        return [{"probability": float(p), "risk_level": int(level)}
+                for p, level in zip(probs, risk_levels(probs))]
+
+class ArrayScorer(_RowScorer):
+    def __init__(self, bundle):
+        self._set_features(bundle["feature_names"])
+        self._members = [
+            (self._compile_steps(cc.estimator), cc.estimator.steps[-1][1], cc.calibrators[0])
+            for cc in bundle["pipeline_calibrated"].calibrated_classifiers_
+        ]
+
+    @staticmethod
+    def _compile_steps(pipe):
+        from sklearn.impute import SimpleImputer
+        from sklearn.preprocessing import MinMaxScaler
+
+        ops = []
+        for _, step in pipe.steps[:-1]:
+            if step is None or step == "passthrough" or hasattr(step, "fit_resample"):
+                continue
+            if isinstance(step, SimpleImputer) and isinstance(step.missing_values, float) \
+                    and np.isnan(step.missing_values) and step.indicator_ is None \
+                    and not np.isnan(step.statistics_).any():
+                ops.append(("impute", np.asarray(step.statistics_, dtype=np.float64)))
+            elif isinstance(step, MinMaxScaler) and not step.clip:
+                ops.append(("scale", (step.scale_, step.min_)))
+            else:
+                ops.append(("transform", step))
+        return ops
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        probs = np.zeros(X.shape[0], dtype=np.float64)
+        for ops, clf, calibrator in self._members:
+            Xt = X
+            for kind, arg in ops:
+                if kind == "impute":
+                    Xt = np.where(np.isnan(Xt), arg, Xt)
+                elif kind == "scale":
+                    Xt = Xt * arg[0] + arg[1]
+                else:
+                    Xt = arg.transform(Xt)
+            if hasattr(clf, "decision_function"):
+                scores = clf.decision_function(Xt)
+            else:
+                scores = clf.predict_proba(Xt)[:, 1]
+            probs += calibrator.predict(scores)
+        probs /= len(self._members)
+        probs[(1.0 < probs) & (probs <= 1.0 + 1e-5)] = 1.0
+        return probs
+
+# ================================================================
+# Compiled inference artifact
+# ================================================================
+# train_model.py exports the calibrated pipeline as an .npz holding a JSON
+# spec plus flat NumPy arrays (imputer medians, scaler min/scale, tree node
+# arrays or linear coefficients, calibration thresholds). Evaluating it needs
+# only NumPy, so workers never import sklearn/imblearn/xgboost/lightgbm.
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+def _unflatten(node, arrays):
+    if isinstance(node, dict):
+        if "__array__" in node:
+            return arrays[node["__array__"]]
+        return {k: _unflatten(v, arrays) for k, v in node.items()}
+    if isinstance(node, list):
+        return [_unflatten(v, arrays) for v in node]
+    return node
+
+def _eval_trees(trees, X):
+    # Walk every (row, tree) pair one level per iteration until all hit a leaf.
+    if trees["dtype"] == "float32":
+        X = X.astype(np.float32).astype(np.float64)
+    feature, threshold = trees["feature"], trees["threshold"]
+    left, right = trees["left"], trees["right"]
+    node = np.repeat(trees["roots"][None, :], X.shape[0], axis=0)
+    rows = np.arange(X.shape[0])[:, None]
+    for _ in range(trees["max_depth"]):
+        feat = feature[node]
+        is_leaf = feat < 0
+        if is_leaf.all():
+            break
+        x = X[rows, np.where(is_leaf, 0, feat)]
+        if trees["cmp"] == "lt":
+            go_left = x < threshold[node]
+        else:
+            go_left = x <= threshold[node]
+        node = np.where(is_leaf, node, np.where(go_left, left[node], right[node]))
+    return trees["value"][node]
+
+def _eval_model(model, X):
+    """Return (P(class 1), decision score or None) for a compiled model node."""
+    kind = model["kind"]
+    if kind == "linear":
+        z = X @ model["coef"] + model["intercept"]
+        return _sigmoid(z), z
+    if kind == "forest":
+        return _eval_trees(model["trees"], X).mean(axis=1), None
+    if kind == "boosted":
+        z = model["base_score"] + _eval_trees(model["trees"], X).sum(axis=1)
+        return _sigmoid(z), z
+    if kind == "voting":
+        probs = np.column_stack([_eval_model(m, X)[0] for m in model["estimators"]])
+        return np.average(probs, axis=1, weights=model.get("weights")), None
+    if kind == "stacking":
+        meta = np.column_stack([_eval_model(m, X)[0] for m in model["estimators"]])
+        return _eval_model(model["final_estimator"], meta)
+    raise ValueError(f"Unknown compiled model kind: {kind}")
+
+def _eval_calibrator(cal, scores):
+    if cal["kind"] == "isotonic":
+        return np.interp(scores, cal["x"], cal["y"])
+    if cal["kind"] == "sigmoid":
+        return _sigmoid(-(cal["a"] * scores + cal["b"]))
+    raise ValueError(f"Unknown calibrator kind: {cal['kind']}")
+
+class CompiledScorer(_RowScorer):
+    def __init__(self, spec, arrays):
+        if spec.get("format") != COMPILED_FORMAT or spec.get("version") != COMPILED_VERSION:
+            raise ValueError(f"Unsupported compiled model: {spec.get('format')} v{spec.get('version')}")
+        self.model_name = spec.get("model_name")
+        self._set_features(spec["feature_names"])
+        self._members = _unflatten(spec["members"], arrays)
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        probs = np.zeros(X.shape[0], dtype=np.float64)
+        for member in self._members:
+            Xt = X
+            for op in member["preprocess"]:
+                if op["kind"] == "impute":
+                    Xt = np.where(np.isnan(Xt), op["statistics"], Xt)
+                elif op["kind"] == "scale":
+                    Xt = Xt * op["scale"] + op["min"]
+            proba, decision = _eval_model(member["model"], Xt)
+            scores = decision if member["response"] == "decision" else proba
+            probs += _eval_calibrator(member["calibrator"], scores)
+        probs /= len(self._members)
+        probs[(1.0 < probs) & (probs <= 1.0 + 1e-5)] = 1.0
+        return probs
+
+def _unpack_compiled(path):
+    # .npz members cannot be memory-mapped, so they are unpacked once into a
+    # sibling directory named after the artifact's content hash
+    # (risk_model_compiled.<sha1>/). A directory only ever appears complete,
+    # through one atomic rename, and loaders never modify or delete it, so
+    # concurrent loaders (workers, score_csv.py --workers) can never read
+    # the spec of one version and the arrays of another. Hashing and
+    # unpacking use the same bytes, so a re-export mid-load cannot mislabel it.
+    with open(path, "rb") as f:
+        data = f.read()
+    out_dir = f"{os.path.splitext(path)[0]}.{hashlib.sha1(data).hexdigest()[:16]}"
+    if os.path.isdir(out_dir):
+        return out_dir
+    tmp_dir = tempfile.mkdtemp(prefix=".unpack-", dir=os.path.dirname(path) or ".")
+    try:
+        with np.load(io.BytesIO(data), allow_pickle=False) as npz:
+            for key in npz.files:
+                if key == "spec":
+                    with open(os.path.join(tmp_dir, "spec.json"), "w") as f:
+                        f.write(str(npz[key]))
+                else:
+                    np.save(os.path.join(tmp_dir, f"{key}.npy"), npz[key])
+        try:
+            os.rename(tmp_dir, out_dir)
+        except OSError:
+            # Another loader unpacked the same version first; use its copy.
+            if not os.path.isdir(out_dir):
+                raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return out_dir
+
+def remove_compiled(path=COMPILED_PATH):
+    """Delete a compiled artifact and its unpacked copies, so loaders fall back to the bundle.
+
+    Only for offline use (train_model.py): processes that already mapped the
+    arrays keep them, but a loader in the middle of unpacking would fail.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    base = os.path.splitext(path)[0]
+    for out_dir in [base] + glob.glob(glob.escape(base) + ".*"):
+        if os.path.isdir(out_dir):
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+def load_compiled(path=COMPILED_PATH, mmap_mode=None):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Compiled model not found at: {os.path.abspath(path)}")
+    if mmap_mode is None:
+        with np.load(path, allow_pickle=False) as npz:
+            arrays = {k: npz[k] for k in npz.files}
+        spec = json.loads(str(arrays.pop("spec")))
+        return CompiledScorer(spec, arrays)
+
+    out_dir = _unpack_compiled(path)
+    with open(os.path.join(out_dir, "spec.json")) as f:
+        spec = json.load(f)
+    arrays = {
+        name[:-len(".npy")]: np.load(os.path.join(out_dir, name), mmap_mode=mmap_mode, allow_pickle=False)
+        for name in os.listdir(out_dir) if name.endswith(".npy")
+    }
+    return CompiledScorer(spec, arrays)
+
+# ================================================================
+# Micro-batching
+# ================================================================
+# Concurrent single-row requests are queued and scored together once the
+# window expires (or max_batch rows are waiting), amortizing the per-call
+# overhead of the calibrated pipeline across requests.
+
+class MicroBatcher:
+    def __init__(self, bundle, window_ms=5.0, max_batch=256, scorer=None):
+        self.bundle = bundle
+        self.scorer = scorer
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+
+    def _ensure_started(self):
+        # Started lazily so that a gunicorn --preload master can build the
+        # batcher before forking; each worker then starts its own thread.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                threading.Thread(target=self._run, args=(self._queue,),
+                                 name="predict-microbatcher", daemon=True).start()
+                self._pid = os.getpid()
+
+    def submit(self, payload):
+        self._ensure_started()
+        fut = Future()
+        self._queue.put((payload, fut))
+        return fut
+
+    def predict(self, payload, timeout=None):
+        return self.submit(payload).result(timeout=timeout)
+
+    def _drain(self, q):
+        batch = [q.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(q.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _score(self, payloads):
+        if self.scorer is not None:
+            return self.scorer.predict_many(payloads)
+        return predict_many(payloads, bundle=self.bundle)
+
+    def _run(self, q):
+        while True:
+            batch = self._drain(q)
+            try:
+                results = self._score([p for p, _ in batch])
+            except Exception:
+                # Re-score one by one so only the offending request fails.
+                for payload, fut in batch:
+                    try:
+                        fut.set_result(self._score([payload])[0])
+                    except Exception as e:
+                        fut.set_exception(e)
+                continue
+            for (_, fut), res in zip(batch, results):
+                fut.set_result(res)
+
+# ================================================================
+# Prediction cache + precomputed risk grid
+# ================================================================
+
+def model_fingerprint(path):
+    """Content hash of a model file; caches and grids are tied to it."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+class BundleScorer(_RowScorer):
+    # Row-scorer interface over the DataFrame path, for PREDICT_FAST_PATH=0.
+    def __init__(self, bundle):
+        self.bundle = bundle
+        self._set_features(bundle["feature_names"])
+
+    def predict_proba(self, X):
+        X = pd.DataFrame(np.asarray(X, dtype=np.float64).reshape(-1, len(self.feature_names)),
+                         columns=self.feature_names)
+        return self.bundle["pipeline_calibrated"].predict_proba(X)[:, 1]
+
+class CachedScorer:
+    """Bounded LRU cache in front of a row scorer.
+
+    Keys are the model fingerprint plus the payload's exact feature values
+    (as floats, missing as None), so a hit returns exactly what the live
+    model would for that payload. Swapping in a scorer with a different
+    fingerprint clears the cache.
+    """
+
+    def __init__(self, scorer, model_id, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.set_scorer(scorer, model_id)
+
+    def set_scorer(self, scorer, model_id):
+        with self._lock:
+            if getattr(self, "model_id", None) != model_id:
+                self._entries.clear()
+            self.scorer = scorer
+            self.feature_names = list(scorer.feature_names)
+            self.model_id = model_id
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _normalize(self, payload):
+        key = []
+        for k in self.feature_names:
+            v = payload.get(k)
+            key.append(None if v is None or v != v else float(v))
+        return tuple(key)
+
+    def _lookup(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def _store(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def predict_one(self, payload):
+        return self.predict_many([payload])[0]
+
+    def predict_many(self, payloads):
+        keys = [(self.model_id,) + self._normalize(p) for p in payloads]
+        results = [self._lookup(k) for k in keys]
+        todo = [i for i, r in enumerate(results) if r is None]
+        if todo:
+            feats = self.feature_names
+            rows = [{f: v for f, v in zip(feats, keys[i][1:]) if v is not None} for i in todo]
+            for i, result in zip(todo, self.scorer.predict_many(rows)):
+                results[i] = result
+                self._store(keys[i], result)
+        return [dict(r) for r in results]
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "model_id": self.model_id,
+            }
+
+# Grid axes: (feature, start, stop, step). Weight is derived from BMI and
+# height, so a cell is (gender, age, race, height, BMI); waist and hip are
+# left missing and imputed exactly as for a /predict call that omits them.
+GRID_AXES = [
+    ("RIAGENDR", 1, 2, 1),
+    ("RIDAGEYR", 18, 80, 1),
+    ("RIDRETH1", 1, 5, 1),
+    ("BMXHT", 140, 205, 5),
+    ("BMXBMI", 14.0, 60.0, 0.5),
+]
+GRID_FORMAT = "diametrics-risk-grid"
+
+def _integer_axis(start, step):
+    # Step-1 axes starting on a whole number hold integer codes/years; the
+    # error bound is only measured (and lookups only served) on integers.
+    return float(step) == 1 and float(start).is_integer()
+
+def _grid_matrix(axes, cells, feature_names):
+    # cells: (n, len(axes)) axis values -> (n, len(feature_names)) model input
+    X = np.full((len(cells), len(feature_names)), np.nan, dtype=np.float64)
+    cols = {name: cells[:, j] for j, (name, *_) in enumerate(axes)}
+    cols["BMXWT"] = cols["BMXBMI"] * (cols["BMXHT"] / 100.0) ** 2
+    for j, name in enumerate(feature_names):
+        if name in cols:
+            X[:, j] = cols[name]
+    return X
+
+def build_risk_grid(scorer, model_id, axes=GRID_AXES, n_check=20000, seed=0, batch=4096):
+    """Score every grid cell, then measure the lookup error on random inputs.
+
+    The error bound is empirical: `n_check` inputs drawn uniformly inside the
+    grid's range (integers on integer axes, matching what lookup() serves) are
+    scored by the live model and by nearest-cell lookup, and the max / p99 /
+    mean absolute probability differences are stored with the grid.
+    """
+    feats = scorer.feature_names
+    axis_values = [start + step * np.arange(int(round((stop - start) / step)) + 1)
+                   for _, start, stop, step in axes]
+    shape = tuple(len(v) for v in axis_values)
+    cells = np.stack(np.meshgrid(*axis_values, indexing="ij"), axis=-1).reshape(-1, len(axes))
+    probs = np.empty(len(cells), dtype=np.float64)
+    for lo in range(0, len(cells), batch):
+        probs[lo:lo + batch] = scorer.predict_proba(_grid_matrix(axes, cells[lo:lo + batch], feats))
+
+    grid = RiskGrid({
+        "format": GRID_FORMAT,
+        "model_id": model_id,
+        "axes": [list(a) for a in axes],
+        "error_bound": None,
+    }, probs.reshape(shape).astype(np.float32))
+
+    rng = np.random.default_rng(seed)
+    check = np.column_stack([
+        rng.integers(start, stop + 1, n_check).astype(float) if _integer_axis(start, step)
+        else rng.uniform(start, stop, n_check)
+        for _, start, stop, step in axes
+    ])
+    live = np.concatenate([scorer.predict_proba(_grid_matrix(axes, check[lo:lo + batch], feats))
+                           for lo in range(0, n_check, batch)])
+    looked_up = grid.table[grid.cell_index(check)].astype(np.float64)
+    err = np.abs(live - looked_up)
+    grid.spec["error_bound"] = {
+        "n_samples": int(n_check),
+        "max_abs_error": float(err.max()),
+        "p99_abs_error": float(np.quantile(err, 0.99)),
+        "mean_abs_error": float(err.mean()),
+        "risk_level_agreement": float(np.mean(
+            np.clip(np.ceil(live * 10), 1, 10) == np.clip(np.ceil(looked_up * 10), 1, 10))),
+    }
+    return grid
+
+class RiskGrid:
+    def __init__(self, spec, table):
+        if spec.get("format") != GRID_FORMAT:
+            raise ValueError(f"Unsupported risk grid format: {spec.get('format')}")
+        self.spec = spec
+        self.table = table
+        self._axes = [(name, float(start), float(stop), float(step), _integer_axis(start, step))
+                      for name, start, stop, step in spec["axes"]]
+        self._start = np.array([a[1] for a in self._axes])
+        self._step = np.array([a[3] for a in self._axes])
+        self._shape = np.array(table.shape)
+
+    def cell_index(self, cells):
+        idx = np.rint((np.asarray(cells, dtype=np.float64) - self._start) / self._step).astype(np.int64)
+        return tuple(np.clip(idx, 0, self._shape - 1).T)
+
+    def lookup(self, payload):
+        """Nearest-cell probability, or None if the payload is outside the grid.
+
+        Values on integer axes (gender, age in years, race) must be whole
+        numbers: a fractional age is not covered by the measured error bound,
+        so it returns None and the caller scores it with the live model.
+        """
+        idx = []
+        for (name, start, stop, step, integer), size in zip(self._axes, self.table.shape):
+            v = payload.get(name)
+            if isinstance(v, bool) or not isinstance(v, (int, float)) or v != v \
+                    or v < start - step / 2 or v > stop + step / 2 or (integer and v != int(v)):
+                return None
+            idx.append(min(int(round((v - start) / step)), size - 1))
+        return float(self.table[tuple(idx)])
+
+    def save(self, path):
+        np.savez(path, spec=np.array(json.dumps(self.spec)), table=self.table)
+
+    def info(self):
+        return {"model_id": self.spec["model_id"], "cells": int(self.table.size),
+                "error_bound": self.spec["error_bound"]}
+
+def load_risk_grid(path=GRID_PATH):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Risk grid not found at: {os.path.abspath(path)}")
+    with np.load(path, allow_pickle=False) as npz:
+        return RiskGrid(json.loads(str(npz["spec"])), npz["table"])
+
+class GridScorer:
+    # Answers from the grid when a payload falls inside it and sets no feature
+    # beyond the grid axes (weight is derived); otherwise uses the fallback.
+    def __init__(self, grid, fallback):
+        self.grid = grid
+        self.fallback = fallback
+        self.feature_names = fallback.feature_names
+        grid_features = {a[0] for a in grid.spec["axes"]} | {"BMXWT"}
+        self._other_features = [k for k in self.feature_names if k not in grid_features]
+        self._lock = threading.Lock()
+        self.grid_hits = 0
+        self.fallbacks = 0
+
+    def _from_grid(self, payload):
+        if any(payload.get(k) is not None for k in self._other_features):
+            return None
+        prob = self.grid.lookup(payload)
+        if prob is None:
+            return None
+        return {"probability": prob, "risk_level": prob_to_risk_level(prob)}
+
+    def predict_one(self, payload):
+        return self.predict_many([payload])[0]
+
+    def predict_many(self, payloads):
+        results = [self._from_grid(p) for p in payloads]
+        todo = [i for i, r in enumerate(results) if r is None]
+        with self._lock:
+            self.grid_hits += len(payloads) - len(todo)
+            self.fallbacks += len(todo)
+        if todo:
+            for i, result in zip(todo, self.fallback.predict_many([payloads[i] for i in todo])):
+                results[i] = result
+        return results
+
+    def stats(self):
+        return dict(self.grid.info(), hits=self.grid_hits, fallbacks=self.fallbacks)
@@ -1,13 +1,24 @@
 # ================================================================
 # Diabetes Risk Prediction Tool (NHANES-based, Risk Level 1–10)
 # ================================================================
+# Usage:
+#   python train_model.py                      # all candidates
+#   python train_model.py --models logreg rf   # subset
+#   python train_model.py --workers 4          # candidates fitted in parallel
+#   python train_model.py --no-cache           # ignore cached candidates
+#   python train_model.py --ensemble-mode refit  # ensembles refit their members
+#   python train_model.py --explain approximate  # cheaper top_features for deep forests
 import os
+import json
+import argparse
+import hashlib
 import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import joblib
 import numpy as np
 import pandas as pd
 
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import train_test_split, cross_val_predict, StratifiedKFold
 from sklearn.metrics import (
     accuracy_score,
     precision_recall_fscore_support,
@@ -29,127 +40,111 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, ExtraTreesClassifier
 from sklearn.ensemble import VotingClassifier, StackingClassifier
 from sklearn.base import clone
+from sklearn.preprocessing import LabelEncoder
+from sklearn.utils import Bunch
+
+from scorer import COMPILED_FORMAT, COMPILED_VERSION
 
 RANDOM_STATE = 42
 N_JOBS = -1
 RESULTS_DIR = "ml_outputs"
+CACHE_DIR = os.path.join(RESULTS_DIR, "cache")
+CSV_PATH = "clean.csv"
 
 # ================================================================
 # Load Data
 # ================================================================
-CSV_PATH = "clean.csv"
-df = pd.read_csv(CSV_PATH)
-
-missing_req = [c for c in ["SEQN", "DIQ010"] if c not in df.columns]
-if missing_req:
-    raise ValueError(f"Missing required columns: {missing_req}")
-
-# Label mapping: keep only {1,2}
-label_map = {1: 1, 1.0: 1, "1": 1, 2: 0, 2.0: 0, "2": 0}
-y = df["DIQ010"].map(label_map)
-mask = y.notna()
-df = df.loc[mask].reset_index(drop=True)
-y = y.loc[mask].astype(int).reset_index(drop=True)
-
-candidate_features = [
-    "RIAGENDR", "RIDAGEYR", "RIDRETH1",
-    "BMXWT", "BMXHT", "BMXBMI", "BMXWAIST", "BMXHIP"
-]
-feature_names = [c for c in candidate_features if c in df.columns]
-if not feature_names:
-    raise ValueError("No usable feature columns found in the dataset.")
-
-X = df[feature_names].select_dtypes(include=[np.number]).copy()
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, stratify=y, random_state=RANDOM_STATE
-)
+def load_data(csv_path=CSV_PATH):
+    df = pd.read_csv(csv_path)
+
+    missing_req = [c for c in ["SEQN", "DIQ010"] if c not in df.columns]
+    if missing_req:
+        raise ValueError(f"Missing required columns: {missing_req}")
+
+    # Label mapping: keep only {1,2}
+    label_map = {1: 1, 1.0: 1, "1": 1, 2: 0, 2.0: 0, "2": 0}
+    y = df["DIQ010"].map(label_map)
+    mask = y.notna()
+    df = df.loc[mask].reset_index(drop=True)
+    y = y.loc[mask].astype(int).reset_index(drop=True)
+
+    candidate_features = [
+        "RIAGENDR", "RIDAGEYR", "RIDRETH1",
+        "BMXWT", "BMXHT", "BMXBMI", "BMXWAIST", "BMXHIP"
+    ]
+    feature_names = [c for c in candidate_features if c in df.columns]
+    if not feature_names:
+        raise ValueError("No usable feature columns found in the dataset.")
+
+    X = df[feature_names].select_dtypes(include=[np.number]).copy()
+    return df, X, y, feature_names
+
 target_names = ["class_0", "class_1"]
 
 # ================================================================
 # Preprocessing + Models
 # ================================================================
-imputer = SimpleImputer(strategy="median")
-scaler = MinMaxScaler()
-smote = SMOTE(random_state=RANDOM_STATE)
-
-models = {}
-
-models["logreg"] = ImbPipeline([
-    ("imputer", imputer),
-    ("scaler", scaler),
-    ("smote", smote),
-    ("clf", LogisticRegression(max_iter=500, random_state=RANDOM_STATE))
-])
-
-models["rf"] = ImbPipeline([
-    ("imputer", imputer),
-    ("scaler", scaler),
-    ("smote", smote),
-    ("clf", RandomForestClassifier(
-        n_estimators=400, n_jobs=N_JOBS, random_state=RANDOM_STATE
+def _pipeline(clf):
+    # Fresh preprocessing steps per candidate so fits never share state.
+    return ImbPipeline([
+        ("imputer", SimpleImputer(strategy="median")),
+        ("scaler", MinMaxScaler()),
+        ("smote", SMOTE(random_state=RANDOM_STATE)),
+        ("clf", clf)
+    ])
+
+def build_models(n_jobs=N_JOBS):
+    models = {}
+
+    models["logreg"] = _pipeline(LogisticRegression(max_iter=500, random_state=RANDOM_STATE))
+
+    models["rf"] = _pipeline(RandomForestClassifier(
+        n_estimators=400, n_jobs=n_jobs, random_state=RANDOM_STATE
     ))
-])
-
-models["gboost"] = ImbPipeline([
-    ("imputer", imputer),
-    ("scaler", scaler),
-    ("smote", smote),
-    ("clf", GradientBoostingClassifier(random_state=RANDOM_STATE))
-])
-
-models["extratrees"] = ImbPipeline([
-    ("imputer", imputer),
-    ("scaler", scaler),
-    ("smote", smote),
-    ("clf", ExtraTreesClassifier(
-        n_estimators=600, n_jobs=N_JOBS, random_state=RANDOM_STATE
+
+    models["gboost"] = _pipeline(GradientBoostingClassifier(random_state=RANDOM_STATE))
+
+    models["extratrees"] = _pipeline(ExtraTreesClassifier(
+        n_estimators=600, n_jobs=n_jobs, random_state=RANDOM_STATE
     ))
-])
-
-try:
-    from xgboost import XGBClassifier
-    models["xgb"] = ImbPipeline([
-        ("imputer", imputer),
-        ("scaler", scaler),
-        ("smote", smote),
-        ("clf", XGBClassifier(
+
+    try:
+        from xgboost import XGBClassifier
+        models["xgb"] = _pipeline(XGBClassifier(
             n_estimators=600, max_depth=4, learning_rate=0.05,
             subsample=0.8, colsample_bytree=0.8, reg_lambda=1.0,
             objective="binary:logistic", eval_metric="auc",
             tree_method="hist", random_state=RANDOM_STATE,
-            n_jobs=N_JOBS, scale_pos_weight=1.0
+            n_jobs=n_jobs, scale_pos_weight=1.0
         ))
-    ])
-except Exception as e:
-    print(f"[xgboost] skipped: {e}")
-
-try:
-    from lightgbm import LGBMClassifier
-    models["lgbm"] = ImbPipeline([
-        ("imputer", imputer),
-        ("scaler", scaler),
-        ("smote", smote),
-        ("clf", LGBMClassifier(
+    except Exception as e:
+        print(f"[xgboost] skipped: {e}")
+
+    try:
+        from lightgbm import LGBMClassifier
+        models["lgbm"] = _pipeline(LGBMClassifier(
             n_estimators=800, learning_rate=0.03, num_leaves=31,
             subsample=0.8, colsample_bytree=0.8, objective="binary",
-            random_state=RANDOM_STATE, n_jobs=N_JOBS,
+            random_state=RANDOM_STATE, n_jobs=n_jobs,
             is_unbalance=False
         ))
-    ])
-except Exception as e:
-    print(f"[lightgbm] skipped: {e}")
+    except Exception as e:
+        print(f"[lightgbm] skipped: {e}")
+
+    add_ensembles(models)
+    return models
 
 # ================================================================
 # Ensembles: Soft Voting + Stacking
 # ================================================================
 # Build ensembles from available base classifiers by cloning only their "clf"
-# and wrapping them in the same ImbPipeline so your loop works unchanged.
+# and wrapping them in the same ImbPipeline so the training loop works unchanged.
+BASE_MODEL_ORDER = ["logreg", "rf", "gboost", "extratrees", "xgb", "lgbm"]
 
-def _available_base_names():
-    order = ["logreg", "rf", "gboost", "extratrees", "xgb", "lgbm"]
-    return [n for n in order if n in models]
+def _available_base_names(models):
+    return [n for n in BASE_MODEL_ORDER if n in models]
 
-def _clone_base_estimators(names):
+def _clone_base_estimators(models, names):
     ests = []
     for n in names:
         try:
@@ -159,38 +154,27 @@ def _clone_base_estimators(names):
             pass
     return ests
 
-base_names = _available_base_names()
-base_ests = _clone_base_estimators(base_names)
+def add_ensembles(models):
+    base_ests = _clone_base_estimators(models, _available_base_names(models))
+
+    if len(base_ests) < 2:
+        print("[ensembles] Skipped: need at least 2 base models to build voting/stacking.")
+        return
 
-if len(base_ests) >= 2:
     # Soft Voting (probability averaging)
-    voting_soft = VotingClassifier(
+    models["voting_soft"] = _pipeline(VotingClassifier(
         estimators=base_ests,
         voting="soft"
-    )
-    models["voting_soft"] = ImbPipeline([
-        ("imputer", imputer),
-        ("scaler", scaler),
-        ("smote", smote),
-        ("clf", voting_soft)
-    ])
+    ))
 
     # Stacking (meta-learner on base probas)
     meta_lr = LogisticRegression(max_iter=500, random_state=RANDOM_STATE)
-    stacking = StackingClassifier(
+    models["stacking"] = _pipeline(StackingClassifier(
         estimators=base_ests,
         final_estimator=meta_lr,
         stack_method="predict_proba",
         passthrough=False
-    )
-    models["stacking"] = ImbPipeline([
-        ("imputer", imputer),
-        ("scaler", scaler),
-        ("smote", smote),
-        ("clf", stacking)
-    ])
-else:
-    print("[ensembles] Skipped: need at least 2 base models to build voting/stacking.")
+    ))
 
 # ================================================================
 # Feature Importance Helpers
@@ -206,38 +190,38 @@ def _native_importance(clf):
     if imp is not None: return np.asarray(imp)
     return _coef_importance(clf)
 
-def _permutation_importance(pipe, X_val, y_val):
+def _permutation_importance(pipe, X_val, y_val, n_jobs=N_JOBS):
     try:
         r = permutation_importance(
             pipe, X_val, y_val, scoring="roc_auc",
-            n_repeats=5, random_state=RANDOM_STATE, n_jobs=N_JOBS
+            n_repeats=5, random_state=RANDOM_STATE, n_jobs=n_jobs
         )
         return r.importances_mean
     except Exception as e:
         print(f"[perm-importance] fallback failed: {e}")
         return None
 
-def compute_feature_importance(pipe, X_val, y_val, feat_names, top_k=10):
+def compute_feature_importance(pipe, X_val, y_val, feat_names, top_k=10, n_jobs=N_JOBS):
     clf = pipe.named_steps.get("clf", pipe)
     imp = _native_importance(clf)
-    if imp is None: imp = _permutation_importance(pipe, X_val, y_val)
+    if imp is None: imp = _permutation_importance(pipe, X_val, y_val, n_jobs=n_jobs)
     if imp is None: imp = np.zeros(len(feat_names), dtype=float)
     fi_df = pd.DataFrame({"feature": feat_names, "importance": imp})
     fi_df = fi_df.sort_values("importance", ascending=False).reset_index(drop=True)
     return fi_df.head(top_k), fi_df
 
-def print_topk_importances(model_name, topk_df):
-    print(f"\nTop 10 Feature Importances — {model_name}")
+def format_topk_importances(model_name, topk_df):
+    lines = [f"\nTop 10 Feature Importances — {model_name}"]
     for i, row in topk_df.iterrows():
-        print(f"  {i+1:>2}. {row['feature']}: {row['importance']:.6f}")
+        lines.append(f"  {i+1:>2}. {row['feature']}: {row['importance']:.6f}")
+    return "\n".join(lines)
+
+def print_topk_importances(model_name, topk_df):
+    print(format_topk_importances(model_name, topk_df))
 
 # ================================================================
-# Train + Evaluate
+# Train + Evaluate (parallel, cached)
 # ================================================================
-os.makedirs(RESULTS_DIR, exist_ok=True)
-all_rows = []
-auroc_scores = {}
-
 def get_scores_for_auroc(pipeline, X):
     if hasattr(pipeline, "predict_proba"):
         return pipeline.predict_proba(X)[:, 1]
@@ -247,9 +231,35 @@ def get_scores_for_auroc(pipeline, X):
         return s
     return pipeline.predict(X).astype(float)
 
-print("Using features:", feature_names)
-for name, pipe in models.items():
-    pipe.fit(X_train, y_train)
+def set_n_jobs(pipe, n_jobs):
+    """Give the classifier n_jobs threads without nesting parallel pools.
+
+    An ensemble with its own n_jobs (voting/stacking) runs its members in
+    parallel, so it gets n_jobs and every member gets 1; otherwise each
+    n_jobs-aware estimator under clf gets n_jobs.
+    """
+    keys = [k for k in pipe.get_params(deep=True) if k.startswith("clf__") and k.endswith("n_jobs")]
+    if "clf__n_jobs" in keys:
+        params = {k: n_jobs if k == "clf__n_jobs" else 1 for k in keys}
+    else:
+        params = {k: n_jobs for k in keys}
+    pipe.set_params(**params)
+    return pipe
+
+def data_hash(*arrays):
+    return joblib.hash(arrays)
+
+def candidate_key(name, pipe, d_hash):
+    # n_jobs only changes speed, so it is left out of the cache key.
+    spec = set_n_jobs(clone(pipe), None)
+    h = hashlib.sha1(f"{name}|{d_hash}|{joblib.hash(spec)}".encode()).hexdigest()
+    return h[:16]
+
+def evaluate_candidate(name, pipe, X_train, y_train, X_test, y_test, feature_names, n_jobs, fit=True):
+    """Fit one candidate (unless prefit) and return its pipeline, metrics and report text."""
+    set_n_jobs(pipe, n_jobs)
+    if fit:
+        pipe.fit(X_train, y_train)
     y_pred = pipe.predict(X_test)
     y_score = get_scores_for_auroc(pipe, X_test)
     acc = accuracy_score(y_test, y_pred)
@@ -260,17 +270,19 @@ for name, pipe in models.items():
         auroc = roc_auc_score(y_test, y_score)
     except Exception:
         auroc = np.nan
-    print(f"\n=== {name} ===")
-    print(f"Accuracy: {acc:.4f} | AUROC: {auroc:.4f}")
-    print(classification_report(y_test, y_pred, target_names=target_names, digits=4, zero_division=0))
 
-    topk_df, full_df = compute_feature_importance(pipe, X_test, y_test, feature_names, top_k=10)
-    print_topk_importances(name, topk_df)
-    full_df.to_csv(os.path.join(RESULTS_DIR, f"feature_importance_{name}.csv"), index=False)
+    topk_df, full_df = compute_feature_importance(pipe, X_test, y_test, feature_names, top_k=10, n_jobs=n_jobs)
+    report = "\n".join([
+        f"\n=== {name} ===",
+        f"Accuracy: {acc:.4f} | AUROC: {auroc:.4f}",
+        classification_report(y_test, y_pred, target_names=target_names, digits=4, zero_division=0),
+        format_topk_importances(name, topk_df),
+    ])
 
+    rows = []
     for lbl, tn in zip([0, 1], target_names):
         idx = [0, 1].index(lbl)
-        all_rows.append({
+        rows.append({
             "model": name, "label": lbl, "class_name": tn,
             "precision": float(prec[idx]) if len(prec) > idx else 0.0,
             "recall": float(rec[idx]) if len(rec) > idx else 0.0,
@@ -279,46 +291,408 @@ for name, pipe in models.items():
             "accuracy": float(acc), "auroc": float(auroc) if not np.isnan(auroc) else np.nan
         })
 
-    joblib.dump(pipe, os.path.join(RESULTS_DIR, f"{name}.joblib"))
-    auroc_scores[name] = auroc
+    return {"name": name, "pipeline": pipe, "rows": rows, "auroc": auroc,
+            "importance": full_df, "report": report}
 
-metrics_df = pd.DataFrame(all_rows)
-metrics_df.to_csv(os.path.join(RESULTS_DIR, "per_class_metrics.csv"), index=False)
-print(f"\nSaved per-class metrics to: {os.path.abspath(os.path.join(RESULTS_DIR, 'per_class_metrics.csv'))}")
+def _dump_atomic(obj, path):
+    if path is not None:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        joblib.dump(obj, tmp_path)
+        os.replace(tmp_path, path)
+    return obj
+
+def _load_cached(path, use_cache, label):
+    if not use_cache or path is None or not os.path.exists(path):
+        return None
+    try:
+        obj = joblib.load(path)
+        print(f"[cache] {label}: reusing {path}")
+        return obj
+    except Exception as e:
+        print(f"[cache] {label}: unreadable cache entry ({e}), recomputing")
+        return None
+
+def _fit_and_cache(name, pipe, data, n_jobs, cache_path):
+    return _dump_atomic(evaluate_candidate(name, pipe, *data, n_jobs=n_jobs), cache_path)
+
+def split_n_jobs(n_workers, total=None):
+    """Per-candidate n_jobs so that workers x n_jobs does not exceed the cores."""
+    total = total or os.cpu_count() or 1
+    return max(1, total // max(1, n_workers))
+
+def _run_jobs(jobs, workers, on_done):
+    """Run {key: (fn, args)} in-process or across a process pool."""
+    if workers == 1:
+        for key, (fn, args) in jobs.items():
+            on_done(key, fn(*args))
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fn, *args): key for key, (fn, args) in jobs.items()}
+        for fut in as_completed(futures):
+            on_done(futures[fut], fut.result())
 
 # ================================================================
-# Pick best model and calibrate
+# Ensembles from already fitted base learners
 # ================================================================
-best_name = max((k for k in auroc_scores if auroc_scores[k] == auroc_scores[k]),
-                key=lambda k: auroc_scores[k], default=None)
-if best_name is None:
-    raise RuntimeError("No valid model trained (AUROC all NaN).")
+# Every candidate shares the same imputer/scaler/SMOTE configuration and
+# random_state, so each base pipeline's "clf" was fitted on exactly the
+# resampled data a VotingClassifier/StackingClassifier would refit its
+# clones on. In "reuse" mode the ensembles are assembled from those fitted
+# estimators, and the stacker's meta-learner is trained on out-of-fold base
+# probabilities computed once per base model (same StratifiedKFold that
+# StackingClassifier uses) and cached next to the candidate.
+ENSEMBLE_NAMES = ("voting_soft", "stacking")
+STACKING_CV = 5
+
+def _resampled_training_data(base_pipe, X_train, y_train):
+    """Replay the fitted pipeline's preprocessing + SMOTE on the training set."""
+    Xt, yt = X_train, y_train
+    for _, step in base_pipe.steps[:-1]:
+        if hasattr(step, "fit_resample"):
+            Xt, yt = clone(step).fit_resample(Xt, yt)
+        else:
+            Xt = step.transform(Xt)
+    return Xt, np.asarray(yt)
+
+def _oof_and_cache(base_pipe, X_train, y_train, n_jobs, cache_path):
+    X_res, y_res = _resampled_training_data(base_pipe, X_train, y_train)
+    est = set_n_jobs(clone(base_pipe), n_jobs).named_steps["clf"]
+    oof = cross_val_predict(est, X_res, y_res, cv=StratifiedKFold(n_splits=STACKING_CV),
+                            method="predict_proba")
+    return _dump_atomic(oof, cache_path)
+
+def assemble_ensemble(template_pipe, fitted_bases, X_train, y_train, oof=None):
+    """Build a fitted voting/stacking pipeline without refitting its members."""
+    template = template_pipe.named_steps["clf"]
+    names = [n for n, est in template.estimators if est != "drop"]
+    base_pipe = fitted_bases[names[0]]
+    X_res, y_res = _resampled_training_data(base_pipe, X_train, y_train)
+
+    ens = clone(template)
+    ens.estimators_ = [fitted_bases[n].named_steps["clf"] for n in names]
+    ens.named_estimators_ = Bunch(**dict(zip(names, ens.estimators_)))
+    le = LabelEncoder().fit(y_res)
+    ens.classes_ = le.classes_
+
+    if isinstance(ens, VotingClassifier):
+        ens.le_ = le
+    elif isinstance(ens, StackingClassifier):
+        if ens.passthrough or ens.stack_method != "predict_proba" or len(le.classes_) != 2:
+            raise NotImplementedError("reuse mode supports binary predict_proba stacking without passthrough")
+        ens._label_encoder = le
+        ens.stack_method_ = ["predict_proba"] * len(names)
+        X_meta = np.hstack([oof[n][:, 1:] for n in names])
+        final = ens.final_estimator if ens.final_estimator is not None else LogisticRegression()
+        ens.final_estimator_ = clone(final).fit(X_meta, le.transform(y_res))
+    else:
+        raise NotImplementedError(f"Cannot assemble {type(ens).__name__}")
+
+    return ImbPipeline(list(base_pipe.steps[:-1]) + [("clf", ens)])
 
-best_pipe = models[best_name]
-print(f"\nBest model by AUROC: {best_name} ({auroc_scores[best_name]:.4f})")
+# ================================================================
+# Candidate runner
+# ================================================================
+def train_candidates(models, selected, data, feature_names, workers=1, cache_dir=CACHE_DIR,
+                     use_cache=True, ensemble_mode="reuse"):
+    X_train, y_train, X_test, y_test = data
+    d_hash = data_hash(X_train, y_train, X_test, y_test)
+    eval_data = (X_train, y_train, X_test, y_test, feature_names)
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def cache_path(name, suffix=""):
+        if cache_dir is None:
+            return None
+        key = candidate_key(name, models[name], d_hash + suffix)
+        return os.path.join(cache_dir, f"{name}-{key}{suffix}.joblib")
+
+    ensembles = [n for n in selected if n in ENSEMBLE_NAMES]
+    reuse = ensemble_mode == "reuse" and bool(ensembles)
+    bases = [n for n in selected if n not in ENSEMBLE_NAMES]
+    if reuse:
+        # Members of the selected ensembles are fitted (or loaded) too.
+        for ens_name in ensembles:
+            for n, est in models[ens_name].named_steps["clf"].estimators:
+                if est != "drop" and n not in bases:
+                    bases.append(n)
+    first_stage = bases if reuse else list(selected)
+
+    results = {}
+
+    def report(name, result):
+        results[name] = result
+        print(result["report"])
+
+    def fit_stage(names):
+        pending = []
+        for name in names:
+            cached = _load_cached(cache_path(name), use_cache, name)
+            if cached is not None:
+                report(name, cached)
+            else:
+                pending.append(name)
+        if pending:
+            w = max(1, min(workers, len(pending)))
+            n_jobs = split_n_jobs(w)
+            print(f"Fitting {len(pending)} candidate(s) with {w} worker(s) x n_jobs={n_jobs}")
+            jobs = {n: (_fit_and_cache, (n, models[n], eval_data, n_jobs, cache_path(n))) for n in pending}
+            _run_jobs(jobs, w, report)
+
+    fit_stage(first_stage)
+    if not reuse:
+        return results
+
+    fitted = {n: results[n]["pipeline"] for n in bases}
+    oof = {}
+    stacking_cached = use_cache and cache_path("stacking", "-reuse") is not None \
+        and os.path.exists(cache_path("stacking", "-reuse"))
+    if "stacking" in ensembles and not stacking_cached:
+        pending = []
+        for n in bases:
+            cached = _load_cached(cache_path(n, "-oof"), use_cache, f"{n} out-of-fold")
+            if cached is not None:
+                oof[n] = cached
+            else:
+                pending.append(n)
+        if pending:
+            w = max(1, min(workers, len(pending)))
+            n_jobs = split_n_jobs(w)
+            print(f"Computing out-of-fold probabilities for {len(pending)} base model(s)")
+            jobs = {n: (_oof_and_cache, (fitted[n], X_train, y_train, n_jobs, cache_path(n, "-oof")))
+                    for n in pending}
+            _run_jobs(jobs, w, oof.__setitem__)
+
+    for name in ensembles:
+        path = cache_path(name, "-reuse")
+        cached = _load_cached(path, use_cache, name)
+        if cached is None:
+            pipe = assemble_ensemble(models[name], fitted, X_train, y_train, oof=oof)
+            cached = _dump_atomic(
+                evaluate_candidate(name, pipe, *eval_data, n_jobs=split_n_jobs(1), fit=False), path)
+        report(name, cached)
+    return results
 
-X_tr, X_val, y_tr, y_val = train_test_split(
-    X_train, y_train, test_size=0.2, stratify=y_train, random_state=RANDOM_STATE
-)
-best_pipe.fit(X_tr, y_tr)
-
-with warnings.catch_warnings():
-    warnings.simplefilter("ignore")
-    calib = CalibratedClassifierCV(best_pipe, method="isotonic", cv="prefit")
-    calib.fit(X_val, y_val)
-
-test_probs = calib.predict_proba(X_test)[:, 1]
-test_auroc_cal = roc_auc_score(y_test, test_probs)
-print(f"Calibrated {best_name} AUROC on test: {test_auroc_cal:.4f}")
-
-bundle = {
-    "model_name": best_name,
-    "pipeline_calibrated": calib,
-    "feature_names": feature_names,
-    "label_meaning": {0: "No diabetes (DIQ010=2)", 1: "Diabetes (DIQ010=1)"}
-}
-joblib.dump(bundle, os.path.join(RESULTS_DIR, "risk_model_bundle.joblib"))
-print("Saved calibrated model bundle to ml_outputs/risk_model_bundle.joblib")
+# ================================================================
+# Export compiled inference artifact (NumPy-only scoring)
+# ================================================================
+# Flattens the calibrated pipeline into ml_outputs/risk_model_compiled.npz,
+# which scorer.load_compiled() evaluates without sklearn/imblearn/xgboost/
+# lightgbm. Layout: a JSON "spec" entry plus flat arrays it references,
+# tagged with scorer.COMPILED_FORMAT / COMPILED_VERSION.
+def _pack_trees(trees, cmp, dtype):
+    """Concatenate per-tree node arrays into one flat node table."""
+    feature, threshold, left, right, value, roots = [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for t in trees:
+        n = len(t["feature"])
+        is_leaf = t["feature"] < 0
+        roots.append(offset)
+        feature.append(np.where(is_leaf, -1, t["feature"]).astype(np.int32))
+        threshold.append(np.asarray(t["threshold"], dtype=np.float64))
+        left.append(np.where(is_leaf, -1, t["left"] + offset).astype(np.int32))
+        right.append(np.where(is_leaf, -1, t["right"] + offset).astype(np.int32))
+        value.append(np.asarray(t["value"], dtype=np.float64))
+        max_depth = max(max_depth, t["depth"])
+        offset += n
+    return {
+        "feature": np.concatenate(feature), "threshold": np.concatenate(threshold),
+        "left": np.concatenate(left), "right": np.concatenate(right),
+        "value": np.concatenate(value), "roots": np.asarray(roots, dtype=np.int32),
+        "max_depth": int(max_depth) + 1, "cmp": cmp, "dtype": dtype,
+    }
+
+def _sklearn_tree(tree, value):
+    return {"feature": tree.feature, "threshold": tree.threshold,
+            "left": tree.children_left, "right": tree.children_right,
+            "value": value, "depth": tree.max_depth}
+
+def _xgb_trees(booster, value_scale=1.0):
+    model = json.loads(booster.save_raw(raw_format="json"))
+    learner = model["learner"]
+    if not learner["objective"]["name"].startswith("binary:logistic"):
+        raise NotImplementedError(f"xgboost objective {learner['objective']['name']}")
+    gb = learner["gradient_booster"]
+    if gb["name"] != "gbtree":
+        raise NotImplementedError(f"xgboost booster {gb['name']}")
+    trees = []
+    for t in gb["model"]["trees"]:
+        left = np.asarray(t["left_children"], dtype=np.int64)
+        right = np.asarray(t["right_children"], dtype=np.int64)
+        # XGBoost stores leaf outputs in split_conditions; thresholds are float32.
+        cond = np.asarray(t["split_conditions"], dtype=np.float32).astype(np.float64)
+        is_leaf = left < 0
+        depth = np.zeros(len(left), dtype=int)
+        for i in range(len(left)):
+            if not is_leaf[i]:
+                depth[left[i]] = depth[right[i]] = depth[i] + 1
+        trees.append({
+            "feature": np.where(is_leaf, -1, np.asarray(t["split_indices"])),
+            "threshold": np.where(is_leaf, 0.0, cond),
+            "left": left, "right": right,
+            "value": np.where(is_leaf, cond * value_scale, 0.0),
+            "depth": int(depth.max()),
+        })
+    base = float(learner["learner_model_param"]["base_score"])
+    return trees, float(np.log(base / (1.0 - base)))
+
+def _lgbm_trees(booster):
+    dump = booster.dump_model()
+    objective = dump["objective"].split()
+    if objective[0] != "binary":
+        raise NotImplementedError(f"lightgbm objective {dump['objective']}")
+    sigmoid = next((float(o.split(":")[1]) for o in objective if o.startswith("sigmoid:")), 1.0)
+    trees = []
+    for info in dump["tree_info"]:
+        feature, threshold, left, right, value, depth = [], [], [], [], [], []
+
+        def walk(node, d):
+            i = len(feature)
+            for arr in (feature, threshold, left, right, value, depth):
+                arr.append(0)
+            depth[i] = d
+            if "leaf_value" in node or "leaf_index" in node:
+                feature[i], left[i], right[i] = -1, -1, -1
+                value[i] = node.get("leaf_value", 0.0) * sigmoid
+                return i
+            if node["decision_type"] != "<=" or node.get("missing_type") == "Zero":
+                raise NotImplementedError(f"lightgbm split {node['decision_type']}/{node.get('missing_type')}")
+            feature[i], threshold[i] = node["split_feature"], node["threshold"]
+            left[i] = walk(node["left_child"], d + 1)
+            right[i] = walk(node["right_child"], d + 1)
+            return i
+
+        walk(info["tree_structure"], 0)
+        trees.append({k: np.asarray(v) for k, v in
+                      zip(["feature", "threshold", "left", "right", "value"],
+                          [feature, threshold, left, right, value])})
+        trees[-1]["depth"] = max(depth)
+    return trees
+
+def export_classifier(clf, X_sample):
+    """Translate a fitted classifier into a compiled model node."""
+    name = clf.__class__.__name__
+    if name == "LogisticRegression":
+        if clf.coef_.shape[0] != 1:
+            raise NotImplementedError("multiclass LogisticRegression")
+        return {"kind": "linear", "coef": clf.coef_[0].astype(np.float64),
+                "intercept": float(clf.intercept_[0])}
+    if name in ("RandomForestClassifier", "ExtraTreesClassifier"):
+        trees = []
+        for est in clf.estimators_:
+            v = est.tree_.value[:, 0, :]
+            trees.append(_sklearn_tree(est.tree_, v[:, 1] / v.sum(axis=1)))
+        return {"kind": "forest", "trees": _pack_trees(trees, "le", "float32")}
+    if name == "GradientBoostingClassifier":
+        lr = clf.learning_rate
+        trees = [_sklearn_tree(est.tree_, lr * est.tree_.value[:, 0, 0]) for est in clf.estimators_[:, 0]]
+        # Recover the init estimator's raw prediction from the public API.
+        x0 = np.asarray(X_sample[:1], dtype=np.float32)
+        init = float(clf.decision_function(x0)[0] - lr * sum(est.predict(x0)[0] for est in clf.estimators_[:, 0]))
+        return {"kind": "boosted", "base_score": init, "trees": _pack_trees(trees, "le", "float32")}
+    if name == "XGBClassifier":
+        trees, base = _xgb_trees(clf.get_booster())
+        return {"kind": "boosted", "base_score": base, "trees": _pack_trees(trees, "lt", "float32")}
+    if name == "LGBMClassifier":
+        trees = _lgbm_trees(clf.booster_)
+        return {"kind": "boosted", "base_score": 0.0, "trees": _pack_trees(trees, "le", "float64")}
+    if name == "VotingClassifier":
+        if clf.voting != "soft":
+            raise NotImplementedError("hard voting")
+        return {"kind": "voting",
+                "estimators": [export_classifier(e, X_sample) for e in clf.estimators_],
+                "weights": None if clf.weights is None else [float(w) for w in clf.weights]}
+    if name == "StackingClassifier":
+        if clf.passthrough or any(m != "predict_proba" for m in clf.stack_method_):
+            raise NotImplementedError("stacking with passthrough or non-proba stack_method")
+        return {"kind": "stacking",
+                "estimators": [export_classifier(e, X_sample) for e in clf.estimators_ if e != "drop"],
+                "final_estimator": export_classifier(clf.final_estimator_, X_sample)}
+    raise NotImplementedError(f"Cannot compile classifier: {name}")
+
+def export_preprocessing(pipe):
+    ops = []
+    for step_name, step in pipe.steps[:-1]:
+        if step is None or step == "passthrough" or hasattr(step, "fit_resample"):
+            continue  # SMOTE only runs during fit
+        if isinstance(step, SimpleImputer):
+            if step.indicator_ is not None or np.isnan(step.statistics_).any():
+                raise NotImplementedError("imputer with indicator or all-missing features")
+            ops.append({"kind": "impute", "statistics": step.statistics_.astype(np.float64)})
+        elif isinstance(step, MinMaxScaler):
+            if step.clip:
+                raise NotImplementedError("MinMaxScaler(clip=True)")
+            ops.append({"kind": "scale", "scale": step.scale_.astype(np.float64),
+                        "min": step.min_.astype(np.float64)})
+        else:
+            raise NotImplementedError(f"Cannot compile preprocessing step: {step_name}")
+    return ops
+
+def export_calibrator(cal):
+    name = cal.__class__.__name__
+    if name == "IsotonicRegression":
+        return {"kind": "isotonic", "x": cal.X_thresholds_.astype(np.float64),
+                "y": cal.y_thresholds_.astype(np.float64)}
+    if name == "_SigmoidCalibration":
+        return {"kind": "sigmoid", "a": float(cal.a_), "b": float(cal.b_)}
+    raise NotImplementedError(f"Cannot compile calibrator: {name}")
+
+def _flatten_arrays(node, arrays):
+    if isinstance(node, dict):
+        return {k: _flatten_arrays(v, arrays) for k, v in node.items()}
+    if isinstance(node, (list, tuple)):
+        return [_flatten_arrays(v, arrays) for v in node]
+    if isinstance(node, np.ndarray):
+        key = f"a{len(arrays)}"
+        arrays[key] = node
+        return {"__array__": key}
+    return node
+
+def export_compiled_bundle(bundle, path, X_sample):
+    members = []
+    for cc in bundle["pipeline_calibrated"].calibrated_classifiers_:
+        pipe = cc.estimator
+        clf = pipe.steps[-1][1]
+        Xt = X_sample
+        for _, step in pipe.steps[:-1]:
+            if not hasattr(step, "fit_resample"):
+                Xt = step.transform(Xt)
+        members.append({
+            "preprocess": export_preprocessing(pipe),
+            "model": export_classifier(clf, Xt),
+            "response": "decision" if hasattr(clf, "decision_function") else "proba",
+            "calibrator": export_calibrator(cc.calibrators[0]),
+        })
+    arrays = {}
+    spec = {
+        "format": COMPILED_FORMAT, "version": COMPILED_VERSION,
+        "model_name": bundle["model_name"],
+        "feature_names": list(bundle["feature_names"]),
+        "members": _flatten_arrays(members, arrays),
+    }
+    np.savez_compressed(path, spec=np.array(json.dumps(spec)), **arrays)
+    return path
+
+def write_compiled_bundle(bundle, path, X_check, ref_probs, atol=1e-6):
+    """Export and verify the compiled artifact; returns max |diff| or None if none was written.
+
+    Any artifact from an earlier run is removed first, since the backend
+    prefers it over the bundle whenever it exists. An export that fails or
+    disagrees with ref_probs by more than atol is deleted again.
+    """
+    from scorer import load_compiled, remove_compiled
+    remove_compiled(path)
+    try:
+        export_compiled_bundle(bundle, path, X_check)
+        probs = load_compiled(path).predict_proba(np.asarray(X_check, dtype=np.float64))
+        max_diff = float(np.max(np.abs(probs - ref_probs)))
+        if not max_diff <= atol:
+            raise ValueError(f"max |diff| vs bundle {max_diff:.2e} exceeds {atol:.0e}")
+    except Exception as e:
+        remove_compiled(path)
+        print(f"[compile] skipped, the backend will load the bundle: {e}")
+        return None
+    print(f"Saved compiled inference artifact to {path} (max |diff| vs bundle: {max_diff:.2e})")
+    return max_diff
 
 # ================================================================
 # Risk Scoring Functions — Numeric Levels (1–10)
@@ -329,52 +703,104 @@ def prob_to_risk_level(prob, n_levels=10):
     level = int(np.clip(np.ceil(prob * n_levels), 1, n_levels))
     return level
 
-def top_feature_contributions(pipe, X_row, feature_names, top_k=3):
-    try:
-        import shap
-        clf = pipe.named_steps.get("clf", pipe)
-        pre_steps = [s for s in pipe.steps if s[0] != "clf"]
-        from sklearn.pipeline import Pipeline
-        pre = Pipeline(pre_steps)
-        X_t = pre.transform(pd.DataFrame([X_row], columns=feature_names))
-        if any(k in clf.__class__.__name__.lower() for k in ["forest","tree","boost","xgb","lgbm","extra"]):
-            explainer = shap.TreeExplainer(clf)
-            shap_vals = explainer.shap_values(X_t)
-            if isinstance(shap_vals, list):
-                shap_vals = shap_vals[1]
-            vals = shap_vals[0]
-        else:
-            raise ImportError("Fallback to linear")
-        pairs = list(zip(feature_names, vals))
-        pairs.sort(key=lambda x: abs(x[1]), reverse=True)
-        out = []
-        for feat, v in pairs[:top_k]:
-            direction = "↑" if v > 0 else "↓"
-            out.append(f"{feat} {direction}")
-        return out
-    except Exception:
+TREE_MODEL_HINTS = ("forest", "tree", "boost", "xgb", "lgbm", "extra")
+
+def _unwrap_pipeline(model):
+    """Fitted pipeline behind a prefit CalibratedClassifierCV (or the model itself)."""
+    calibrated = getattr(model, "calibrated_classifiers_", None)
+    if calibrated:
+        inner = calibrated[0]
+        return inner.estimator if hasattr(inner, "estimator") else inner.base_estimator
+    return model
+
+class ContributionExplainer:
+    """Per-feature contributions for a whole frame with a single explainer.
+
+    Tree models use one shap.TreeExplainer (approximate=True switches to the
+    much cheaper Saabas attribution); models with coef_ fall back to
+    coef * transformed value. Resamplers (SMOTE) are skipped since they only
+    act at fit time. Anything else yields no contributions.
+    """
+    def __init__(self, model, feature_names, approximate=False):
+        pipe = _unwrap_pipeline(model)
+        steps = getattr(pipe, "steps", [("clf", pipe)])
+        self.feature_names = np.asarray(feature_names, dtype=object)
+        self.pre = [step for name, step in steps if name != "clf" and hasattr(step, "transform")]
+        self.clf = dict(steps).get("clf", pipe)
+        self.approximate = approximate
+        self.explainer = None
+        self.coef = None
+        if any(k in self.clf.__class__.__name__.lower() for k in TREE_MODEL_HINTS):
+            try:
+                import shap
+                self.explainer = shap.TreeExplainer(self.clf)
+            except Exception:
+                self.explainer = None
+        if self.explainer is None and getattr(self.clf, "coef_", None) is not None:
+            self.coef = np.asarray(self.clf.coef_, dtype=np.float64).ravel()
+
+    def transform(self, X):
+        X_t = X
+        for step in self.pre:
+            X_t = step.transform(X_t)
+        return np.asarray(X_t, dtype=np.float64)
+
+    def _shap_matrix(self, X_t):
+        # A failing batch gets NaN rows (no explanation) instead of aborting
+        # the run, as the per-row explainer this replaced did.
         try:
-            clf = pipe.named_steps.get("clf", pipe)
-            coef = getattr(clf, "coef_", None)
-            if coef is None: return []
-            coef = np.asarray(coef).ravel()
-            pre_steps = [s for s in pipe.steps if s[0] != "clf"]
-            from sklearn.pipeline import Pipeline
-            pre = Pipeline(pre_steps)
-            X_t = pre.transform(pd.DataFrame([X_row], columns=feature_names))
-            contrib = coef * X_t.ravel()
-            pairs = list(zip(feature_names, contrib))
-            pairs.sort(key=lambda x: abs(x[1]), reverse=True)
-            out = []
-            for feat, v in pairs[:top_k]:
-                direction = "↑" if v > 0 else "↓"
-                out.append(f"{feat} {direction}")
-            return out
-        except Exception:
-            return []
+            vals = self.explainer.shap_values(X_t, approximate=self.approximate, check_additivity=False)
+            if isinstance(vals, list):
+                vals = vals[1]
+            vals = np.asarray(vals, dtype=np.float64)
+            return vals[:, :, 1] if vals.ndim == 3 else vals
+        except Exception as e:
+            print(f"[explain] no contributions for {len(X_t)} row(s): {e}")
+            return np.full(X_t.shape, np.nan)
+
+    def contributions(self, X, n_jobs=1, chunk_size=2048):
+        """(n_rows, n_features) contribution matrix, NaN rows where explaining failed, or None."""
+        if self.explainer is None and self.coef is None:
+            return None
+        try:
+            X_t = self.transform(X)
+            if self.explainer is None:
+                return X_t * self.coef
+        except Exception as e:
+            print(f"[explain] no contributions: {e}")
+            return None
+        chunks = np.array_split(X_t, max(1, -(-len(X_t) // chunk_size)))
+        if n_jobs == 1 or len(chunks) == 1:
+            return np.vstack([self._shap_matrix(c) for c in chunks])
+        parts = joblib.Parallel(n_jobs=n_jobs)(joblib.delayed(self._shap_matrix)(c) for c in chunks)
+        return np.vstack(parts)
+
+    def top_features(self, X, top_k=3, n_jobs=1):
+        """'FEATURE ↑/↓' labels of the top_k contributions per row, joined with '; '."""
+        contrib = self.contributions(X, n_jobs=n_jobs)
+        if contrib is None:
+            return [""] * len(X)
+        k = min(top_k, contrib.shape[1])
+        failed = np.isnan(contrib).any(axis=1)
+        contrib = np.where(failed[:, None], 0.0, contrib)
+        order = np.argsort(-np.abs(contrib), axis=1, kind="stable")[:, :k]
+        picked = np.take_along_axis(contrib, order, axis=1)
+        labels = np.char.add(self.feature_names[order].astype(str),
+                             np.where(picked > 0, " ↑", " ↓"))
+        return ["" if bad else "; ".join(row) for row, bad in zip(labels, failed)]
+
+def top_feature_contributions(pipe, X_row, feature_names, top_k=3):
+    """Single-row convenience wrapper; use ContributionExplainer for frames."""
+    X = pd.DataFrame([X_row], columns=feature_names)
+    labels = ContributionExplainer(pipe, feature_names).top_features(X, top_k=top_k)[0]
+    return labels.split("; ") if labels else []
 
-def score_dataframe(df_new, id_col="SEQN", top_k=3):
-    """Produces numeric risk levels (1–10) per participant."""
+def score_dataframe(df_new, id_col="SEQN", top_k=3, explain="exact", n_jobs=1):
+    """Produces numeric risk levels (1–10) per participant.
+
+    explain: "exact" (TreeSHAP / linear), "approximate" (Saabas for trees)
+    or "none" to skip the top_features column.
+    """
     bundle = joblib.load(os.path.join(RESULTS_DIR, "risk_model_bundle.joblib"))
     calib = bundle["pipeline_calibrated"]
     feats = bundle["feature_names"]
@@ -383,26 +809,23 @@ def score_dataframe(df_new, id_col="SEQN", top_k=3):
     if missing:
         raise ValueError(f"Missing required features for scoring: {missing}")
 
-    X_new = df_new[feats].select_dtypes(include=[np.number]).copy()
+    X_new = df_new[feats].select_dtypes(include=[np.number])
     probs = calib.predict_proba(X_new)[:, 1]
-
-    rows = []
-    for i, prob in enumerate(probs):
-        seqn = df_new.iloc[i][id_col] if id_col in df_new.columns else i
-        risk_level = prob_to_risk_level(prob, n_levels=10)
-        contribs = top_feature_contributions(calib, X_new.iloc[i].to_dict(), feats, top_k=top_k)
-        rows.append({
-            "SEQN": seqn,
-            "probability": float(prob),
-            "risk_level": int(risk_level),
-            "top_features": "; ".join(contribs)
-        })
-    return pd.DataFrame(rows)
-
-scored = score_dataframe(df)
-out_path = os.path.join(RESULTS_DIR, "diabetes_risk_scores.csv")
-scored.to_csv(out_path, index=False)
-print(f"\nSaved numeric risk levels (1–10) to: {os.path.abspath(out_path)}")
+    levels = np.clip(np.ceil(probs * 10), 1, 10).astype(int)
+    seqn = df_new[id_col].to_numpy() if id_col in df_new.columns else np.arange(len(df_new))
+
+    if explain == "none":
+        top_features = [""] * len(X_new)
+    else:
+        explainer = ContributionExplainer(calib, feats, approximate=(explain == "approximate"))
+        top_features = explainer.top_features(X_new, top_k=top_k, n_jobs=n_jobs)
+
+    return pd.DataFrame({
+        "SEQN": seqn,
+        "probability": probs.astype(float),
+        "risk_level": levels,
+        "top_features": top_features,
+    })
 
 # ================================================================
 # Model Ranking Summary
@@ -411,8 +834,112 @@ def _score_key(item):
     name, score = item
     return (-score) if (score == score) else float("inf")
 
-print("\n=== Model Ranking by AUROC (high → low) ===")
-for name, score in sorted(auroc_scores.items(), key=_score_key):
-    print(f"{name:12s}  AUROC = {score:.4f}" if score == score else f"{name:12s}  AUROC = NaN")
+def print_ranking(auroc_scores):
+    print("\n=== Model Ranking by AUROC (high → low) ===")
+    for name, score in sorted(auroc_scores.items(), key=_score_key):
+        print(f"{name:12s}  AUROC = {score:.4f}" if score == score else f"{name:12s}  AUROC = NaN")
 
-print("\nDone. Open ml_outputs/diabetes_risk_scores.csv to view numeric risk levels (1–10).")
+# ================================================================
+# Main
+# ================================================================
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Train, compare and calibrate diabetes risk models")
+    ap.add_argument("--csv", default=CSV_PATH, help="cleaned NHANES CSV")
+    ap.add_argument("--models", nargs="+", default=None,
+                    help="subset of candidates to fit (default: all available)")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="candidates fitted in parallel; each gets cores // workers threads")
+    ap.add_argument("--cache-dir", default=CACHE_DIR)
+    ap.add_argument("--no-cache", action="store_true", help="refit every candidate")
+    ap.add_argument("--ensemble-mode", choices=["reuse", "refit"], default="reuse",
+                    help="reuse: assemble voting/stacking from the fitted base models; "
+                         "refit: let the ensembles refit their own clones")
+    ap.add_argument("--explain", choices=["exact", "approximate", "none"], default="exact",
+                    help="top_features in the scores CSV: exact TreeSHAP, approximate (Saabas) or none")
+    ap.add_argument("--compiled-atol", type=float, default=1e-6,
+                    help="largest allowed |compiled - bundle| probability on the test split")
+    return ap.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+
+    df, X, y, feature_names = load_data(args.csv)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, stratify=y, random_state=RANDOM_STATE
+    )
+
+    models = build_models()
+    selected = list(models)
+    if args.models:
+        unknown = [m for m in args.models if m not in models]
+        if unknown:
+            raise SystemExit(f"Unknown model(s): {unknown}. Available: {list(models)}")
+        selected = [k for k in models if k in args.models]
+
+    print("Using features:", feature_names)
+    results = train_candidates(
+        models, selected, (X_train, y_train, X_test, y_test), feature_names,
+        workers=args.workers, cache_dir=args.cache_dir, use_cache=not args.no_cache, ensemble_mode=args.ensemble_mode
+    )
+
+    all_rows = []
+    auroc_scores = {}
+    for name in selected:
+        res = results[name]
+        res["importance"].to_csv(os.path.join(RESULTS_DIR, f"feature_importance_{name}.csv"), index=False)
+        joblib.dump(res["pipeline"], os.path.join(RESULTS_DIR, f"{name}.joblib"))
+        all_rows.extend(res["rows"])
+        auroc_scores[name] = res["auroc"]
+
+    metrics_df = pd.DataFrame(all_rows)
+    metrics_df.to_csv(os.path.join(RESULTS_DIR, "per_class_metrics.csv"), index=False)
+    print(f"\nSaved per-class metrics to: {os.path.abspath(os.path.join(RESULTS_DIR, 'per_class_metrics.csv'))}")
+
+    # ================================================================
+    # Pick best model and calibrate
+    # ================================================================
+    best_name = max((k for k in auroc_scores if auroc_scores[k] == auroc_scores[k]),
+                    key=lambda k: auroc_scores[k], default=None)
+    if best_name is None:
+        raise RuntimeError("No valid model trained (AUROC all NaN).")
+
+    best_pipe = set_n_jobs(models[best_name], N_JOBS)
+    print(f"\nBest model by AUROC: {best_name} ({auroc_scores[best_name]:.4f})")
+
+    X_tr, X_val, y_tr, y_val = train_test_split(
+        X_train, y_train, test_size=0.2, stratify=y_train, random_state=RANDOM_STATE
+    )
+    best_pipe.fit(X_tr, y_tr)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        calib = CalibratedClassifierCV(best_pipe, method="isotonic", cv="prefit")
+        calib.fit(X_val, y_val)
+
+    test_probs = calib.predict_proba(X_test)[:, 1]
+    test_auroc_cal = roc_auc_score(y_test, test_probs)
+    print(f"Calibrated {best_name} AUROC on test: {test_auroc_cal:.4f}")
+
+    bundle = {
+        "model_name": best_name,
+        "pipeline_calibrated": calib,
+        "feature_names": feature_names,
+        "label_meaning": {0: "No diabetes (DIQ010=2)", 1: "Diabetes (DIQ010=1)"}
+    }
+    joblib.dump(bundle, os.path.join(RESULTS_DIR, "risk_model_bundle.joblib"))
+    print("Saved calibrated model bundle to ml_outputs/risk_model_bundle.joblib")
+
+    compiled_path = os.path.join(RESULTS_DIR, "risk_model_compiled.npz")
+    write_compiled_bundle(bundle, compiled_path, X_test, test_probs, atol=args.compiled_atol)
+
+    scored = score_dataframe(df, explain=args.explain, n_jobs=args.workers)
+    out_path = os.path.join(RESULTS_DIR, "diabetes_risk_scores.csv")
+    scored.to_csv(out_path, index=False)
+    print(f"\nSaved numeric risk levels (1–10) to: {os.path.abspath(out_path)}")
+
+    print_ranking(auroc_scores)
+    print("\nDone. Open ml_outputs/diabetes_risk_scores.csv to view numeric risk levels (1–10).")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+# nutrition.py
+# ================================================================
+# Local nutrition index for /analyze-food
+# ================================================================
+# Loads foods.csv (the client's foodDatabase plus common staples, macros per
+# serving) into flat arrays and a term index at startup. A meal description
+# is split into items ("2 eggs, a slice of toast and coffee"); each item's
+# quantity and unit are parsed with the same normalization as llm_cache.py
+# and its remaining words matched against the food aliases. A meal is only
+# answered locally when every item resolves; otherwise the whole description
+# goes to the LLM, since the split may have cut a dish in two ("mac and
+# cheese", "chicken and waffles").
+#
+# Matching is deliberately strict: every word of the item must be covered by
+# one alias (after expanding unambiguous prefixes like "broc") apart from a
+# few harmless modifiers ("large", "cooked"), so "fried rice" or "chicken
+# curry" go to the LLM instead of resolving to plain rice or chicken.
+#
+# Usage:
+#   python nutrition.py "2 eggs, a slice of whole wheat toast and black coffee"
+#   python nutrition.py --stats
+import argparse
+import bisect
+import csv
+import json
+import os
+import re
+import sys
+import threading
+import time
+from array import array
+
+from llm_cache import UNITS, normalize_tokens
+
+NUTRITION_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'foods.csv')
+
+MACROS = ('carbs', 'protein', 'fat', 'fiber', 'calories')
+
+# Words that may accompany an alias without changing the match.
+MODIFIERS = {'large', 'medium', 'small', 'big', 'cooked', 'raw', 'fresh', 'plain', 'boiled',
+             'steamed', 'hard', 'soft', 'scrambled', 'poached', 'sliced', 'chopped', 'diced',
+             'organic', 'homemade', 'cup', 'serving', 'x'}
+
+MASS_G = {'g': 1.0, 'oz': 28.35, 'lb': 453.6, 'kg': 1000.0}
+VOLUME_ML = {'ml': 1.0, 'tsp': 5.0, 'tbsp': 15.0, 'cup': 240.0, 'glass': 240.0, 'can': 355.0}
+COUNT_UNITS = {'each', 'piece', 'slice'}
+PLURAL_UNITS = {'piece', 'slice', 'cup', 'can', 'glass', 'serving', 'bowl'}
+
+_SPLIT_RE = re.compile(r'[,;\n+&]|\band\b|\bwith\b|\bplus\b', re.IGNORECASE)
+_PERCENT_RE = re.compile(r'\d+(?:\.\d+)?\s*%')
+
+def _format_amount(value):
+    return str(int(value)) if float(value).is_integer() else f'{value:.2g}'
+
+class NutritionIndex:
+    """Foods with per-serving macros, their aliases, and a term -> alias index."""
+    def __init__(self, rows):
+        self.names = []
+        self.units = []
+        self.labels = []
+        self.amounts = array('f')
+        self.grams = array('f')
+        self.macros = array('f')
+        self.aliases = []
+        terms = {}
+        for row in rows:
+            food_id = len(self.names)
+            self.names.append(row['name'])
+            self.units.append(row['unit'])
+            self.labels.append(row.get('label') or '')
+            self.amounts.append(float(row['amount']))
+            self.grams.append(float(row['grams'] or 0))
+            self.macros.extend(float(row[m]) for m in MACROS)
+            for alias in row['aliases'].split('|'):
+                alias_terms = frozenset(normalize_tokens(alias))
+                if not alias_terms:
+                    continue
+                for term in alias_terms:
+                    terms.setdefault(term, []).append(len(self.aliases))
+                self.aliases.append((alias_terms, food_id))
+        self.terms = {term: tuple(ids) for term, ids in terms.items()}
+        self.vocabulary = sorted(self.terms)
+        self._lock = threading.Lock()
+        self.meals = 0
+        self.local_meals = 0
+        self.resolved = 0
+        self.unresolved = 0
+        self.parse_seconds = 0.0
+
+    @classmethod
+    def load(cls, path=NUTRITION_CSV):
+        with open(path, newline='') as f:
+            return cls(list(csv.DictReader(f)))
+
+    def expand(self, word):
+        """The word itself if indexed, else its only indexed completion ("broc" -> "broccoli")."""
+        if word in self.terms or len(word) < 4:
+            return word
+        i = bisect.bisect_left(self.vocabulary, word)
+        matches = [t for t in self.vocabulary[i:i + 2] if t.startswith(word)]
+        return matches[0] if len(matches) == 1 else word
+
+    def match(self, words):
+        """Food id whose alias covers all non-modifier words, preferring the longest alias."""
+        words = {self.expand(w) for w in words}
+        best, best_len = None, 0
+        seen = set()
+        for word in words:
+            for alias_id in self.terms.get(word, ()):
+                if alias_id in seen:
+                    continue
+                seen.add(alias_id)
+                alias_terms, food_id = self.aliases[alias_id]
+                if len(alias_terms) > best_len and alias_terms <= words and words - alias_terms <= MODIFIERS:
+                    best, best_len = food_id, len(alias_terms)
+        return best
+
+    def servings(self, food_id, quantity, unit):
+        """Servings of a food for a parsed quantity, or None when the units do not convert."""
+        food_unit, amount = self.units[food_id], self.amounts[food_id]
+        if quantity is None:
+            return 1.0
+        if unit == 'serving':
+            return quantity
+        if unit is None or unit in COUNT_UNITS:
+            # "2 eggs", "2 pieces of pizza", "2 coffees"; a bare count of a food
+            # weighed in grams ("10 almonds") has no known size, so the LLM gets it.
+            if food_unit in COUNT_UNITS and unit in (None, 'piece', food_unit):
+                return quantity / amount
+            if unit is None and (food_unit == 'serving' or food_unit in VOLUME_ML):
+                return quantity
+            return None
+        if unit in MASS_G:
+            grams = quantity * MASS_G[unit]
+            if food_unit in MASS_G:
+                return grams / (amount * MASS_G[food_unit])
+            return grams / self.grams[food_id] if self.grams[food_id] else None
+        if unit in VOLUME_ML and food_unit in VOLUME_ML:
+            return quantity * VOLUME_ML[unit] / (amount * VOLUME_ML[food_unit])
+        return None
+
+    def resolve_item(self, text):
+        """{"name", carbs, protein, fat, fiber, calories} for one item, or None."""
+        tokens = normalize_tokens(_PERCENT_RE.sub(' ', text))
+        quantity, unit, words = None, None, set()
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if token[0].isdigit():
+                if quantity is not None:
+                    return None
+                quantity = float(token)
+                if i + 1 < len(tokens) and tokens[i + 1] in UNITS.values():
+                    unit = tokens[i + 1]
+                    i += 1
+            else:
+                words.add(token)
+            i += 1
+        if not words or quantity == 0:
+            return None
+        food_id = self.match(words)
+        if food_id is None:
+            return None
+        servings = self.servings(food_id, quantity, unit)
+        if servings is None:
+            return None
+
+        if quantity is None:
+            label = self.labels[food_id] or f'{_format_amount(self.amounts[food_id])} {self.units[food_id]}'
+        elif unit is None:
+            label = _format_amount(quantity)
+        else:
+            label = f'{_format_amount(quantity)} {unit}{"s" if unit in PLURAL_UNITS and quantity > 1 else ""}'
+        item = {"name": f"{self.names[food_id]} ({label})"}
+        base = food_id * len(MACROS)
+        for k, macro in enumerate(MACROS):
+            value = self.macros[base + k] * servings
+            item[macro] = round(value) if macro == 'calories' else round(value, 1)
+        return item
+
+    def analyze(self, description):
+        """(foods resolved locally, texts left for the LLM).
+
+        All or nothing: if any item does not resolve, no foods are returned
+        and the unresolved text is the full description.
+        """
+        t0 = time.perf_counter()
+        foods, unresolved = [], []
+        for part in _SPLIT_RE.split(description):
+            part = part.strip()
+            if not part:
+                continue
+            item = self.resolve_item(part)
+            if item is None:
+                unresolved.append(part)
+            else:
+                foods.append(item)
+        if unresolved:
+            foods, unresolved = [], [description.strip()]
+        with self._lock:
+            self.meals += 1
+            self.local_meals += not unresolved
+            self.resolved += len(foods)
+            self.unresolved += len(unresolved)
+            self.parse_seconds += time.perf_counter() - t0
+        return foods, unresolved
+
+    def stats(self):
+        with self._lock:
+            items = self.resolved + self.unresolved
+            return {
+                "foods": len(self.names),
+                "aliases": len(self.aliases),
+                "terms": len(self.terms),
+                "meals": self.meals,
+                "local_meals": self.local_meals,
+                "items_resolved": self.resolved,
+                "items_unresolved": self.unresolved,
+                "item_hit_ratio": round(self.resolved / items, 4) if items else None,
+                "avg_parse_us": round(1e6 * self.parse_seconds / self.meals, 1) if self.meals else None,
+            }
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Resolve meal descriptions against the local nutrition index")
+    ap.add_argument("description", nargs="*")
+    ap.add_argument("--csv", default=os.environ.get('NUTRITION_CSV', NUTRITION_CSV))
+    ap.add_argument("--stats", action="store_true")
+    args = ap.parse_args(argv)
+
+    index = NutritionIndex.load(args.csv)
+    for description in args.description:
+        foods, unresolved = index.analyze(description)
+        print(json.dumps({"description": description, "foods": foods, "unresolved": unresolved}, indent=2))
+    if args.stats:
+        print(json.dumps(index.stats(), indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
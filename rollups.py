@@ -0,0 +1,141 @@
+# rollups.py
+# ================================================================
+# Materialized per-day aggregates (daily_rollups)
+# ================================================================
+# One row per (user_id, date, metric) holding count / total / min / max of
+# the raw entries for that day. api.py refreshes the affected day in the
+# same transaction as every insert or delete, so /data/summary reads
+# O(days) rollup rows instead of every raw entry.
+#
+# Usage:
+#   python rollups.py --rebuild [--user-id N]   # backfill / rebuild from raw rows
+#   python rollups.py --check [--user-id N]     # compare with a fresh aggregate
+import argparse
+import math
+import sqlite3
+import sys
+
+# series -> (raw table, [(metric, value expression)])
+ROLLUP_SOURCES = {
+    'glucose': ('glucose_data', [('glucose', 'd.value')]),
+    'nutrition': ('nutrition_data', [('calories', 'd.calories'), ('carbs', 'd.carbs'),
+                                     ('protein', 'd.protein'), ('fat', 'd.fat'), ('fiber', 'd.fiber')]),
+    'activity': ('activity_data', [('activity_minutes', 'd.minutes'), ('activity_calories', 'd.calories')]),
+    'weight': ('weight_data', [('weight', 'd.weight')]),
+}
+
+# Readings outside the user's glucose goals; refreshed whenever goals change.
+GLUCOSE_RANGE_METRICS = [
+    ('glucose_below', 'glucose_min', 'd.value < gl.glucose_min'),
+    ('glucose_above', 'glucose_max', 'd.value > gl.glucose_max'),
+]
+
+ROLLUP_METRICS = {
+    series: [m for m, _ in parts] + ([m for m, _, _ in GLUCOSE_RANGE_METRICS] if series == 'glucose' else [])
+    for series, (_, parts) in ROLLUP_SOURCES.items()
+}
+
+def _scope(user_id=None, date=None, prefix=''):
+    where, args = [], []
+    if user_id is not None:
+        where.append(f'{prefix}user_id = ?')
+        args.append(user_id)
+    if date is not None:
+        where.append(f'{prefix}date = ?')
+        args.append(date)
+    return (' AND '.join(where) or '1'), args
+
+def rollup_select(series, user_id=None, date=None):
+    """SELECT producing the daily_rollups rows of one series from its raw table."""
+    table, parts = ROLLUP_SOURCES[series]
+    where, args = _scope(user_id, date, 'd.')
+    selects, params = [], []
+    for metric, expr in parts:
+        selects.append(f'''SELECT d.user_id, d.date, '{metric}', COUNT({expr}), SUM({expr}), MIN({expr}), MAX({expr})
+                           FROM {table} d WHERE {where} GROUP BY d.user_id, d.date''')
+        params += args
+    if series == 'glucose':
+        for metric, column, cond in GLUCOSE_RANGE_METRICS:
+            selects.append(f'''SELECT d.user_id, d.date, '{metric}', SUM({cond}), NULL, NULL, NULL
+                               FROM glucose_data d JOIN goals gl ON gl.user_id = d.user_id
+                               WHERE gl.{column} IS NOT NULL AND {where} GROUP BY d.user_id, d.date''')
+            params += args
+    return ' UNION ALL '.join(selects), params
+
+def refresh_statements(series, user_id=None, date=None):
+    """(delete, insert) (sql, params) pairs behind refresh_rollups."""
+    metrics = ROLLUP_METRICS[series]
+    where, args = _scope(user_id, date)
+    sql, params = rollup_select(series, user_id, date)
+    return [(f"DELETE FROM daily_rollups WHERE {where} AND metric IN ({','.join('?' * len(metrics))})",
+             args + metrics),
+            ('INSERT INTO daily_rollups (user_id, date, metric, count, total, min_value, max_value) ' + sql,
+             params)]
+
+def refresh_rollups(cursor, series, user_id=None, date=None):
+    """Recompute one series' rollups for a day, a user, or everything.
+
+    Runs inside the caller's transaction; the caller commits.
+    """
+    for sql, params in refresh_statements(series, user_id, date):
+        cursor.execute(sql, params)
+
+def rebuild_rollups(conn, user_id=None):
+    for series in ROLLUP_SOURCES:
+        refresh_rollups(conn, series, user_id)
+
+# What api.py runs on every write (one user and day) and on a goals change
+# (one user, glucose only); plan-checked by migrations.py.
+HOT_QUERIES = {
+    f"rollups_{series}_{scope}_{i}": statement
+    for series in ROLLUP_SOURCES
+    for scope, date in (("day", "2024-01-01"), ("user", None))
+    if scope == "day" or series == "glucose"
+    for i, statement in enumerate(refresh_statements(series, 1, date))
+}
+
+def check_rollups(conn, user_id=None, rel_tol=1e-9):
+    """Return [(user_id, date, metric, stored, expected)] for every rollup row that disagrees."""
+    expected = {}
+    for series in ROLLUP_SOURCES:
+        sql, params = rollup_select(series, user_id)
+        for row in conn.execute(sql, params):
+            expected[tuple(row[:3])] = tuple(row[3:])
+    where, args = _scope(user_id)
+    stored = {tuple(row[:3]): tuple(row[3:]) for row in conn.execute(
+        f'SELECT user_id, date, metric, count, total, min_value, max_value FROM daily_rollups WHERE {where}', args)}
+
+    def same(a, b):
+        return all(x == y or (x is not None and y is not None and math.isclose(x, y, rel_tol=rel_tol))
+                   for x, y in zip(a, b))
+
+    return [(*key, stored.get(key), expected.get(key))
+            for key in sorted(set(expected) | set(stored), key=str)
+            if key not in stored or key not in expected or not same(stored[key], expected[key])]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Rebuild or verify the daily_rollups table")
+    ap.add_argument("--db", default="diabetes_app.db")
+    ap.add_argument("--user-id", type=int, default=None)
+    mode = ap.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--rebuild", action="store_true")
+    mode.add_argument("--check", action="store_true")
+    args = ap.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    if args.rebuild:
+        conn.execute('BEGIN IMMEDIATE')
+        rebuild_rollups(conn, args.user_id)
+        conn.commit()
+        count = conn.execute('SELECT COUNT(*) FROM daily_rollups').fetchone()[0]
+        print(f"Rebuilt daily_rollups ({count} rows)")
+        return 0
+
+    mismatches = check_rollups(conn, args.user_id)
+    for user_id, date, metric, stored, expected in mismatches[:50]:
+        print(f"[rollup] user {user_id} {date} {metric}: stored {stored} expected {expected}")
+    print(f"{len(mismatches)} inconsistent rollup rows")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+# streaks.py
+# ================================================================
+# Set-based streak and milestone tracking
+# ================================================================
+# A data POST advances the user's streak with one UPSERT on streaks and
+# awards newly crossed thresholds with one INSERT ... SELECT into milestones,
+# whose unique (user_id, milestone_name) index makes re-awarding a no-op.
+# A bulk import, whose dates can land anywhere around the stored streak,
+# rebuilds the user's streak with recompute_streaks instead. All of these run
+# inside the caller's transaction; api.py commits them with the data rows.
+#
+# Usage:
+#   python streaks.py --recompute [--user-id N]   # rebuild streaks from the data tables
+import argparse
+import sqlite3
+import sys
+
+STREAK_MILESTONES = {
+    3: "3_day_streak",
+    7: "7_day_streak",
+    14: "14_day_streak",
+    30: "30_day_streak",
+    60: "60_day_streak",
+    100: "100_day_streak",
+}
+
+ACTIVITY_TABLES = ['glucose_data', 'nutrition_data', 'activity_data', 'weight_data']
+
+_THRESHOLDS = 'thresholds (days, name) AS (VALUES {})'.format(
+    ', '.join(f"({days}, '{name}')" for days, name in STREAK_MILESTONES.items()))
+
+# Day difference between the new activity date and the stored one; NULL
+# when either is not a date, in which case the streak is left alone.
+_DAY_DIFF = 'julianday(excluded.last_activity_date) - julianday(streaks.last_activity_date)'
+_NEXT_STREAK = f'''CASE WHEN streaks.last_activity_date IS NULL OR {_DAY_DIFF} > 1 THEN 1
+                        WHEN {_DAY_DIFF} = 1 THEN streaks.current_streak + 1
+                        ELSE streaks.current_streak END'''
+
+UPSERT_STREAK_SQL = f'''
+    INSERT INTO streaks (user_id, current_streak, longest_streak, last_activity_date)
+    VALUES (?, 1, 1, ?)
+    ON CONFLICT (user_id) DO UPDATE SET
+        current_streak = {_NEXT_STREAK},
+        longest_streak = max(streaks.longest_streak, {_NEXT_STREAK}),
+        last_activity_date = excluded.last_activity_date,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE streaks.last_activity_date IS NULL
+       OR (streaks.last_activity_date != excluded.last_activity_date AND {_DAY_DIFF} IS NOT NULL)
+'''
+
+AWARD_MILESTONES_SQL = f'''
+    INSERT OR IGNORE INTO milestones (user_id, milestone_type, milestone_name)
+    WITH {_THRESHOLDS}
+    SELECT ?, 'streak', name FROM thresholds
+    WHERE days <= (SELECT current_streak FROM streaks WHERE user_id = ?)
+'''
+
+def upsert_streak(cursor, user_id, activity_date):
+    """Advance a user's streak for one activity date; returns True if the row changed.
+
+    Same rules as before: the next day extends the streak, a gap resets it to
+    1, the same day changes nothing.
+    """
+    cursor.execute(UPSERT_STREAK_SQL, (user_id, activity_date))
+    return cursor.rowcount > 0
+
+def award_milestones(cursor, user_id):
+    """Insert every milestone reached by the user's stored current streak that
+    they do not have yet; returns how many were new."""
+    cursor.execute(AWARD_MILESTONES_SQL, (user_id, user_id))
+    return cursor.rowcount
+
+def _scope(user_id, column='user_id'):
+    return (f'{column} = ?', [user_id]) if user_id is not None else ('1', [])
+
+def recompute_statements(user_id=None):
+    """(delete, rebuild, award) (sql, params) pairs behind recompute_streaks,
+    for one user or, with user_id=None, everyone."""
+    where, args = _scope(user_id)
+    days = ' UNION '.join(f'SELECT user_id, date(date) AS day FROM {table} WHERE {where}'
+                          for table in ACTIVITY_TABLES)
+    # Gaps and islands: day - row_number is constant along a run of
+    # consecutive days. MAX(last_day) makes SQLite take run_length from the
+    # run with the latest day.
+    rebuild = f'''
+        INSERT INTO streaks (user_id, current_streak, longest_streak, last_activity_date)
+        WITH days AS ({days}),
+        runs AS (
+            SELECT user_id, day,
+                   julianday(day) - ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY day) AS run
+            FROM days WHERE day IS NOT NULL
+        ),
+        islands AS (
+            SELECT user_id, COUNT(*) AS run_length, MAX(day) AS last_day
+            FROM runs GROUP BY user_id, run
+        ),
+        per_user AS (
+            SELECT user_id, run_length AS current_streak, MAX(last_day) AS last_day
+            FROM islands GROUP BY user_id
+        )
+        SELECT p.user_id, p.current_streak,
+               (SELECT MAX(run_length) FROM islands i WHERE i.user_id = p.user_id), p.last_day
+        FROM per_user p
+    '''
+    award = f'''
+        INSERT OR IGNORE INTO milestones (user_id, milestone_type, milestone_name)
+        WITH {_THRESHOLDS}
+        SELECT s.user_id, 'streak', t.name FROM streaks s JOIN thresholds t ON t.days <= s.longest_streak
+        WHERE {_scope(user_id, 's.user_id')[0]}
+    '''
+    return [(f'DELETE FROM streaks WHERE {where}', args),
+            (rebuild, args * len(ACTIVITY_TABLES)),
+            (award, args)]
+
+def recompute_streaks(conn, user_id=None):
+    """Rebuild streaks (and award missing milestones) from the data tables.
+
+    Every distinct activity day counts; consecutive days form a run, the
+    current streak is the run ending on the latest day and the longest streak
+    the longest run. Runs in the caller's transaction; returns the number of
+    streak rows written.
+    """
+    delete, rebuild, award = recompute_statements(user_id)
+    conn.execute(*delete)
+    written = conn.execute(*rebuild).rowcount
+    conn.execute(*award)
+    return written
+
+# Per-user statements of this module, plan-checked by migrations.py.
+HOT_QUERIES = {
+    "streak_upsert": (UPSERT_STREAK_SQL, (1, "2024-01-01")),
+    "milestones_award": (AWARD_MILESTONES_SQL, (1, 1)),
+    **{f"streak_recompute_{i}": statement for i, statement in enumerate(recompute_statements(1))},
+}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Rebuild streaks and milestones from the data tables")
+    ap.add_argument("--db", default="diabetes_app.db")
+    ap.add_argument("--user-id", type=int, default=None)
+    ap.add_argument("--recompute", action="store_true", required=True)
+    args = ap.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    conn.execute('BEGIN IMMEDIATE')
+    written = recompute_streaks(conn, args.user_id)
+    # Invalidate the cached /data/streaks and /data/milestones responses.
+    where, params = _scope(args.user_id, 'id')
+    conn.execute(f'''
+        INSERT INTO data_versions (user_id, resource, version)
+        SELECT id, resource, 1 FROM users, (SELECT 'streaks' AS resource UNION ALL SELECT 'milestones')
+        WHERE {where}
+        ON CONFLICT (user_id, resource) DO UPDATE SET version = version + 1
+    ''', params)
+    conn.commit()
+    print(f"Recomputed streaks for {written} users")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
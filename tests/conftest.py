@@ -0,0 +1,84 @@
+import itertools
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "ml"))
+
+FEATURES = ["RIAGENDR", "RIDAGEYR", "RIDRETH1", "BMXWT", "BMXHT", "BMXBMI", "BMXWAIST", "BMXHIP"]
+
+def synthetic_frame(n=400, seed=0):
+    """NHANES-shaped features with a few gaps and a label that depends on age and BMI."""
+    rng = np.random.default_rng(seed)
+    height = rng.uniform(145, 200, n)
+    weight = rng.uniform(40, 160, n)
+    X = pd.DataFrame({
+        "RIAGENDR": rng.integers(1, 3, n).astype(float),
+        "RIDAGEYR": rng.integers(18, 81, n).astype(float),
+        "RIDRETH1": rng.integers(1, 6, n).astype(float),
+        "BMXWT": weight,
+        "BMXHT": height,
+        "BMXBMI": weight / (height / 100.0) ** 2,
+        "BMXWAIST": rng.uniform(60, 150, n),
+        "BMXHIP": rng.uniform(70, 150, n),
+    }, columns=FEATURES)
+    X.loc[rng.random(n) < 0.2, "BMXWAIST"] = np.nan
+    logit = 0.06 * (X["RIDAGEYR"] - 50) + 0.12 * (X["BMXBMI"] - 28) + rng.normal(0, 1, n)
+    return X, (logit > 0).astype(int).to_numpy()
+
+def calibrated_bundle(clf, seed=0):
+    """A bundle shaped like train_model.py's, fitted on synthetic data."""
+    from sklearn.calibration import CalibratedClassifierCV
+    from train_model import _pipeline
+
+    X, y = synthetic_frame(seed=seed)
+    pipe = _pipeline(clf).fit(X.iloc[:300], y[:300])
+    calib = CalibratedClassifierCV(pipe, method="isotonic", cv="prefit").fit(X.iloc[300:], y[300:])
+    return {"model_name": type(clf).__name__, "pipeline_calibrated": calib, "feature_names": FEATURES}
+
+@pytest.fixture(scope="session")
+def logreg_bundle():
+    from sklearn.linear_model import LogisticRegression
+    return calibrated_bundle(LogisticRegression(max_iter=500, random_state=0))
+
+@pytest.fixture(scope="session")
+def forest_bundle():
+    from sklearn.ensemble import RandomForestClassifier
+    return calibrated_bundle(RandomForestClassifier(n_estimators=25, random_state=0))
+
+@pytest.fixture(scope="session")
+def api_dir(tmp_path_factory):
+    return tmp_path_factory.mktemp("api")
+
+@pytest.fixture(scope="session")
+def api_module(api_dir):
+    """api.py imported against an empty database in a scratch directory."""
+    mp = pytest.MonkeyPatch()
+    mp.chdir(api_dir)
+    mp.setenv("AUTH_SWEEP_INTERVAL", "0")
+    mp.setenv("LLM_CACHE_DB", str(api_dir / "llm_cache.db"))
+    import api
+    yield api
+    mp.undo()
+
+@pytest.fixture
+def client(api_module, api_dir, monkeypatch):
+    # DATABASE is a relative path, resolved when a connection is opened.
+    monkeypatch.chdir(api_dir)
+    return api_module.app.test_client()
+
+_users = itertools.count()
+
+@pytest.fixture
+def auth(client):
+    """Authorization header of a freshly signed-up user."""
+    creds = {"username": f"user{next(_users)}", "password": "secret123"}
+    assert client.post("/auth/signup", json=creds).status_code == 201
+    resp = client.post("/auth/login", json=creds)
+    assert resp.status_code == 200, resp.get_json()
+    return {"Authorization": f"Bearer {resp.get_json()['token']}"}
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+ACTIVITY = {"type": "Walking", "minutes": 30, "calories": 120}
+
+
+@pytest.fixture
+def cached_activity(api_module, monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    _, version, _ = api_module.ANALYSIS_KINDS["activity"]
+    api_module.analysis_cache.put("activity", version, "walked the dog for 30 minutes", ACTIVITY, 1.0)
+    return api_module
+
+
+@pytest.fixture
+def asgi_client(cached_activity):
+    from starlette.testclient import TestClient
+
+    import asgi
+    return TestClient(asgi.app)
+
+
+def test_cache_hit_needs_no_api_key(client, cached_activity):
+    resp = client.post("/analyze-activity", json={"description": "Walked the dog for 30 minutes"})
+    assert resp.status_code == 200
+    assert resp.get_json() == ACTIVITY
+
+    resp = client.post("/analyze-activity", json={"description": "swam 40 laps"})
+    assert resp.status_code == 500
+    assert resp.get_json() == {"error": "OPENAI_API_KEY not set"}
+
+
+def test_async_cache_hit_needs_no_api_key(asgi_client):
+    resp = asgi_client.post("/analyze-activity", json={"description": "Walked the dog for 30 minutes"})
+    assert resp.status_code == 200
+    assert resp.json() == ACTIVITY
+
+    resp = asgi_client.post("/analyze-activity", json={"description": "swam 40 laps"})
+    assert resp.status_code == 500
+    assert resp.json() == {"error": "OPENAI_API_KEY not set"}
+
+
+CURRY = {"name": "Chicken Curry (1 cup)", "carbs": 12, "protein": 25, "fat": 14, "fiber": 3, "calories": 290}
+
+
+def fake_reply(payload):
+    message = type("Message", (), {"content": json.dumps(payload)})
+    choice = type("Choice", (), {"message": message})
+    return type("Completion", (), {"choices": [choice]})
+
+
+@pytest.mark.parametrize("dish, reply, expected", [
+    ("korma", [CURRY], 200),
+    ("vindaloo", {"foods": [CURRY]}, 200),
+    ("madras", CURRY, 500),
+    ("jalfrezi", {"foods": "chicken curry"}, 500),
+])
+def test_food_reply_shape(client, api_module, monkeypatch, dish, reply, expected):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(api_module.llm, "complete", lambda request: fake_reply(reply))
+    description = f"chicken {dish}"
+    resp = client.post("/analyze-food", json={"description": description})
+    assert resp.status_code == expected
+    if expected == 200:
+        assert resp.get_json() == {"foods": [CURRY]}
+    else:
+        assert resp.get_json()["error"].startswith("Failed to parse AI response")
+        # A malformed answer is not cached.
+        _, version, _ = api_module.ANALYSIS_KINDS["food"]
+        assert api_module.analysis_cache.get("food", version, description) is None
+
+
+def test_async_food_reply_shape(asgi_client, api_module, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+
+    async def acomplete(request):
+        return fake_reply(CURRY)
+
+    monkeypatch.setattr(api_module.llm, "acomplete", acomplete)
+    resp = asgi_client.post("/analyze-food", json={"description": "chicken curry, async"})
+    assert resp.status_code == 500
+    assert resp.json()["error"].startswith("Failed to parse AI response")
@@ -0,0 +1,33 @@
+import sqlite3
+import time
+
+
+def test_logout_elsewhere_revokes_a_cached_db_token(client, auth, api_module, api_dir, monkeypatch):
+    token = auth["Authorization"].split()[1]
+    assert client.get("/data/streaks", headers=auth).status_code == 200
+    assert api_module.token_cache.get(token) is not None
+
+    # What /auth/logout does in another worker: this worker's cache still
+    # holds the token and only the shared denylist can tell it apart.
+    conn = sqlite3.connect(str(api_dir / api_module.DATABASE))
+    conn.execute("DELETE FROM auth_tokens WHERE token = ?", (token,))
+    conn.execute("INSERT INTO revoked_tokens (jti, expires_at) VALUES (?, ?)",
+                 (api_module.db_token_jti(token), int(time.time()) + 120))
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(api_module.token_denylist, "refresh", 0)
+
+    assert client.get("/data/streaks", headers=auth).status_code == 401
+    assert api_module.token_cache.get(token) is None
+
+
+def test_logout_records_the_token_hash(client, auth, api_module, api_dir):
+    token = auth["Authorization"].split()[1]
+    assert client.post("/auth/logout", headers=auth).status_code == 200
+    assert client.get("/data/streaks", headers=auth).status_code == 401
+
+    conn = sqlite3.connect(str(api_dir / api_module.DATABASE))
+    jtis = {row[0] for row in conn.execute("SELECT jti FROM revoked_tokens")}
+    conn.close()
+    assert api_module.db_token_jti(token) in jtis
+    assert token not in jtis
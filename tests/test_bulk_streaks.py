@@ -0,0 +1,30 @@
+def _bulk_glucose(client, auth, dates):
+    rows = [{"date": d, "value": 110} for d in dates]
+    resp = client.post("/data/glucose/bulk", json=rows, headers=auth)
+    assert resp.status_code == 201, resp.get_json()
+
+def _streak(client, auth):
+    return client.get("/data/streaks", headers=auth).get_json()
+
+def _milestones(client, auth):
+    return {m["name"] for m in client.get("/data/milestones", headers=auth).get_json()}
+
+def test_backfill_joins_the_existing_streak(client, auth):
+    for day in range(6, 11):
+        resp = client.post("/data/glucose", json={"date": f"2024-01-{day:02d}", "value": 100}, headers=auth)
+        assert resp.status_code == 201
+    assert _streak(client, auth)["current_streak"] == 5
+
+    _bulk_glucose(client, auth, [f"2024-01-{day:02d}" for day in range(1, 12)])
+    streak = _streak(client, auth)
+    assert (streak["current_streak"], streak["longest_streak"]) == (11, 11)
+    assert streak["last_activity_date"] == "2024-01-11"
+    assert _milestones(client, auth) == {"3_day_streak", "7_day_streak"}
+
+def test_backfill_before_a_gap_keeps_the_current_run(client, auth):
+    _bulk_glucose(client, auth, ["2024-03-01", "2024-03-02", "2024-03-03", "2024-03-04"])
+    _bulk_glucose(client, auth, ["2024-03-10", "2024-03-11"])
+    _bulk_glucose(client, auth, ["2024-02-27", "2024-02-28", "2024-02-29"])
+    streak = _streak(client, auth)
+    assert (streak["current_streak"], streak["longest_streak"]) == (2, 7)
+    assert _milestones(client, auth) == {"3_day_streak", "7_day_streak"}
@@ -0,0 +1,44 @@
+import os
+
+import numpy as np
+import pytest
+
+from conftest import calibrated_bundle, synthetic_frame
+from scorer import load_compiled, predict_many
+from train_model import write_compiled_bundle
+
+def _stale_artifact(path):
+    with open(path, "wb") as f:
+        f.write(b"stale")
+    os.makedirs(os.path.splitext(path)[0])
+
+def test_export_matches_bundle(tmp_path, forest_bundle):
+    path = str(tmp_path / "risk_model_compiled.npz")
+    _stale_artifact(path)
+    X, _ = synthetic_frame(seed=3)
+    ref = forest_bundle["pipeline_calibrated"].predict_proba(X)[:, 1]
+
+    assert write_compiled_bundle(forest_bundle, path, X, ref) <= 1e-6
+    assert not os.path.exists(os.path.splitext(path)[0])
+    probs = load_compiled(path).predict_proba(X.to_numpy(dtype=np.float64))
+    np.testing.assert_allclose(probs, [r["probability"] for r in predict_many(
+        X.to_dict("records"), bundle=forest_bundle)], rtol=0, atol=1e-6)
+
+def test_unsupported_model_removes_stale_artifact(tmp_path):
+    from sklearn.neighbors import KNeighborsClassifier
+    bundle = calibrated_bundle(KNeighborsClassifier())
+    path = str(tmp_path / "risk_model_compiled.npz")
+    _stale_artifact(path)
+    X, _ = synthetic_frame(seed=3)
+
+    assert write_compiled_bundle(bundle, path, X, np.zeros(len(X))) is None
+    assert not os.path.exists(path)
+    assert not os.path.exists(os.path.splitext(path)[0])
+
+def test_export_over_tolerance_is_removed(tmp_path, logreg_bundle):
+    path = str(tmp_path / "risk_model_compiled.npz")
+    X, _ = synthetic_frame(seed=3)
+    wrong = logreg_bundle["pipeline_calibrated"].predict_proba(X)[:, 1] + 1e-3
+
+    assert write_compiled_bundle(logreg_bundle, path, X, wrong) is None
+    assert not os.path.exists(path)
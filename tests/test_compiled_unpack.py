@@ -0,0 +1,42 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from conftest import synthetic_frame
+from scorer import load_compiled, remove_compiled
+from train_model import export_compiled_bundle
+
+def _load_and_score(path):
+    X, _ = synthetic_frame(n=50, seed=4)
+    scorer = load_compiled(path, mmap_mode="r")
+    return scorer.predict_proba(X.to_numpy(dtype=np.float64))
+
+def test_concurrent_mmap_loaders_agree(tmp_path, forest_bundle):
+    path = str(tmp_path / "risk_model_compiled.npz")
+    X, _ = synthetic_frame(n=50, seed=4)
+    export_compiled_bundle(forest_bundle, path, X)
+    expected = load_compiled(path).predict_proba(X.to_numpy(dtype=np.float64))
+
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(_load_and_score, [path] * 16))
+    for probs in results:
+        np.testing.assert_array_equal(probs, expected)
+    unpacked = [d for d in os.listdir(tmp_path) if os.path.isdir(tmp_path / d)]
+    assert len(unpacked) == 1 and unpacked[0].startswith("risk_model_compiled.")
+
+def test_new_version_unpacks_beside_the_one_in_use(tmp_path, forest_bundle, logreg_bundle):
+    path = str(tmp_path / "risk_model_compiled.npz")
+    X, _ = synthetic_frame(n=50, seed=4)
+    export_compiled_bundle(forest_bundle, path, X)
+    old = load_compiled(path, mmap_mode="r")
+    old_probs = old.predict_proba(X.to_numpy(dtype=np.float64))
+
+    export_compiled_bundle(logreg_bundle, path, X)
+    new = load_compiled(path, mmap_mode="r")
+    assert not np.array_equal(new.predict_proba(X.to_numpy(dtype=np.float64)), old_probs)
+    np.testing.assert_array_equal(old.predict_proba(X.to_numpy(dtype=np.float64)), old_probs)
+    assert len([d for d in os.listdir(tmp_path) if os.path.isdir(tmp_path / d)]) == 2
+
+    remove_compiled(path)
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,35 @@
+SERIES = ["glucose", "nutrition", "activity", "weight"]
+
+
+def _log_two_days(client, auth):
+    for day in ["2024-02-01", "2024-02-10"]:
+        assert client.post("/data/glucose", json={"date": day, "value": 110}, headers=auth).status_code == 201
+        assert client.post("/data/nutrition", json={"date": day, "name": "Apple (medium)", "servings": 1, "carbs": 25,
+                                                   "protein": 0, "fat": 0, "fiber": 4, "calories": 95},
+                           headers=auth).status_code == 201
+        assert client.post("/data/activity", json={"date": day, "minutes": 30, "type": "Walking"},
+                           headers=auth).status_code == 201
+        assert client.post("/data/weight", json={"date": day, "weight": 80.0}, headers=auth).status_code == 201
+
+
+def test_dashboard_returns_all_eight_datasets(client, auth):
+    _log_two_days(client, auth)
+    resp = client.get("/data/dashboard", headers=auth)
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert set(body) == set(SERIES) | {"risk", "goals", "streaks", "milestones", "since"}
+    assert body["since"] is None
+    for name in SERIES:
+        assert [r["date"] for r in body[name]] == ["2024-02-01", "2024-02-10"], name
+
+
+def test_since_narrows_the_series(client, auth):
+    _log_two_days(client, auth)
+    body = client.get("/data/dashboard?since=2024-02-05", headers=auth).get_json()
+    assert body["since"] == "2024-02-05"
+    for name in SERIES:
+        assert [r["date"] for r in body[name]] == ["2024-02-10"], name
+
+
+def test_bad_since_is_rejected(client, auth):
+    assert client.get("/data/dashboard?since=02/05/2024", headers=auth).status_code == 400
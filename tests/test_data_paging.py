@@ -0,0 +1,70 @@
+import base64
+
+import pytest
+
+
+def _add_glucose(client, auth, readings):
+    for day, value in readings:
+        assert client.post("/data/glucose", json={"date": day, "value": value}, headers=auth).status_code == 201
+
+
+def _weigh_in(client, auth, readings):
+    for day, weight in readings:
+        assert client.post("/data/weight", json={"date": day, "weight": weight}, headers=auth).status_code == 201
+
+
+def test_from_to_limit_the_rows(client, auth):
+    _add_glucose(client, auth, [("2024-03-01", 100), ("2024-03-02", 110), ("2024-03-03", 120), ("2024-03-04", 130)])
+
+    rows = client.get("/data/glucose?from=2024-03-02&to=2024-03-03", headers=auth).get_json()
+    assert [r["date"] for r in rows] == ["2024-03-02", "2024-03-03"]
+
+    rows = client.get("/data/glucose?from=2024-03-04", headers=auth).get_json()
+    assert [r["value"] for r in rows] == [130]
+
+    page = client.get("/data/glucose?to=2024-03-02&limit=10", headers=auth).get_json()
+    assert [r["date"] for r in page["items"]] == ["2024-03-01", "2024-03-02"]
+    assert page["next_cursor"] is None
+
+
+def test_pages_split_inside_one_date(client, auth):
+    # Weight allows several rows per date, so a page boundary can fall
+    # between two rows that share a date; the id tie-break must neither skip
+    # nor repeat them.
+    _weigh_in(client, auth, [("2024-05-01", 80.0), ("2024-05-02", 79.8), ("2024-05-02", 79.6),
+                             ("2024-05-02", 79.4), ("2024-05-03", 79.2)])
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        url = "/data/weight?limit=2" + (f"&cursor={cursor}" if cursor else "")
+        page = client.get(url, headers=auth).get_json()
+        seen.extend(page["items"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert [r["weight"] for r in seen] == [80.0, 79.8, 79.6, 79.4, 79.2]
+    assert len({r["id"] for r in seen}) == 5
+
+
+def test_next_cursor_is_null_on_the_last_page(client, auth):
+    _add_glucose(client, auth, [("2024-06-01", 100), ("2024-06-02", 105)])
+
+    first = client.get("/data/glucose?limit=1", headers=auth).get_json()
+    assert len(first["items"]) == 1 and first["next_cursor"]
+
+    last = client.get(f"/data/glucose?limit=1&cursor={first['next_cursor']}", headers=auth).get_json()
+    assert [r["date"] for r in last["items"]] == ["2024-06-02"]
+    assert last["next_cursor"] is None
+
+    # An exactly full final page has nothing after it either.
+    assert client.get("/data/glucose?limit=2", headers=auth).get_json()["next_cursor"] is None
+
+
+@pytest.mark.parametrize("cursor", ["!!!", "bm9wZQ", base64.urlsafe_b64encode(b"2024-01-01|x").decode(), "%FF"])
+def test_malformed_cursor_is_rejected(client, auth, cursor):
+    resp = client.get(f"/data/glucose?cursor={cursor}", headers=auth)
+    assert resp.status_code == 400
+    assert resp.get_json()["error"] == "Invalid limit or cursor"
@@ -0,0 +1,25 @@
+import pytest
+
+
+@pytest.mark.parametrize("series", ["glucose", "nutrition", "activity", "weight"])
+@pytest.mark.parametrize("body", [{}, {"index": None}, {"index": "0"}, {"index": 1.5}, {"index": True},
+                                  {"index": -1}, {"date": ""}, []])
+def test_delete_without_a_target_is_rejected(client, auth, series, body):
+    resp = client.delete(f"/data/{series}", json=body, headers=auth)
+    assert resp.status_code == 400, resp.get_json()
+
+
+def test_delete_by_id(client, auth):
+    for day, weight in [("2024-01-02", 80.0), ("2024-01-01", 81.0), ("2024-01-03", 79.5)]:
+        assert client.post("/data/weight", json={"date": day, "weight": weight}, headers=auth).status_code == 201
+    rows = client.get("/data/weight", headers=auth).get_json()
+
+    # Positional deletes were removed; they no longer touch any row.
+    assert client.delete("/data/weight", json={"index": 0}, headers=auth).status_code == 400
+    assert len(client.get("/data/weight", headers=auth).get_json()) == 3
+
+    resp = client.delete("/data/weight", json={"id": rows[0]["id"]}, headers=auth)
+    assert resp.get_json()["deleted"] == 1
+    resp = client.delete("/data/weight", json={"ids": [rows[1]["id"], 10 ** 9]}, headers=auth)
+    assert resp.get_json()["deleted"] == 1
+    assert [r["date"] for r in client.get("/data/weight", headers=auth).get_json()] == ["2024-01-03"]
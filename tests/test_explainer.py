@@ -0,0 +1,31 @@
+import numpy as np
+
+from conftest import FEATURES, synthetic_frame
+from train_model import ContributionExplainer
+
+def test_failing_batch_degrades_to_empty_explanations(forest_bundle, monkeypatch):
+    explainer = ContributionExplainer(forest_bundle["pipeline_calibrated"], FEATURES)
+    X, _ = synthetic_frame(n=40, seed=5)
+    labels = explainer.top_features(X)
+    assert all(labels)
+
+    real = explainer.explainer.shap_values
+    calls = []
+    def flaky(X_t, **kwargs):
+        calls.append(len(X_t))
+        if len(calls) == 2:
+            raise ValueError("boom")
+        return real(X_t, **kwargs)
+    monkeypatch.setattr(explainer.explainer, "shap_values", flaky)
+
+    contrib = explainer.contributions(X, chunk_size=10)
+    failed = np.isnan(contrib).any(axis=1)
+    assert failed.tolist() == [False] * 10 + [True] * 10 + [False] * 20
+
+def test_explainer_errors_never_abort(forest_bundle, monkeypatch):
+    explainer = ContributionExplainer(forest_bundle["pipeline_calibrated"], FEATURES)
+    def broken(X_t, **kwargs):
+        raise RuntimeError("shap is broken")
+    monkeypatch.setattr(explainer.explainer, "shap_values", broken)
+    X, _ = synthetic_frame(n=15, seed=5)
+    assert explainer.top_features(X) == [""] * 15
@@ -0,0 +1,34 @@
+import pytest
+
+from nutrition import NutritionIndex
+
+
+@pytest.fixture(scope="module")
+def index():
+    return NutritionIndex.load()
+
+
+@pytest.mark.parametrize("description", [
+    "mac and cheese",
+    "a peanut butter and jelly sandwich",
+    "chicken and waffles",
+    "fish and chips",
+    "2 eggs and a bowl of ramen",
+])
+def test_unresolved_part_sends_the_whole_meal(index, description):
+    assert index.analyze(description) == ([], [description])
+
+
+@pytest.mark.parametrize("description, names", [
+    ("2 eggs and toast", ["Eggs (2)", "Whole Wheat Bread (2 slices)"]),
+    ("a banana with peanut butter", ["Banana (1)", "Peanut Butter (2 tbsp)"]),
+    ("oatmeal, berries & black coffee", ["Oatmeal (1 cup cooked)", "Berries (1 cup)", "Coffee (black)"]),
+])
+def test_fully_resolved_meal_stays_local(index, description, names):
+    foods, unresolved = index.analyze(description)
+    assert unresolved == []
+    assert [f["name"] for f in foods] == names
+
+
+def test_split_meal_forwards_the_original_text(api_module):
+    assert api_module.split_meal("mac and cheese") == ([], "mac and cheese")
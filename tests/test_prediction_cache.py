@@ -0,0 +1,15 @@
+from bench_scorer import sample_payloads
+from scorer import ArrayScorer, CachedScorer
+
+def test_cache_returns_exactly_the_live_scores(logreg_bundle):
+    live = ArrayScorer(logreg_bundle)
+    cache = CachedScorer(live, "model", maxsize=1000)
+    payloads = sample_payloads(100)
+    # Neighbours that would collide under rounding must still be scored separately.
+    payloads += [dict(p, BMXBMI=p["BMXBMI"] + 1e-3) for p in payloads]
+
+    expected = live.predict_many(payloads)
+    assert cache.predict_many(payloads) == expected
+    assert cache.predict_many(payloads) == expected
+    assert cache.stats()["hits"] == len(payloads)
+    assert [cache.predict_one(p) for p in payloads[:10]] == expected[:10]
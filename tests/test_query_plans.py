@@ -0,0 +1,70 @@
+import sqlite3
+
+import pytest
+
+import migrations
+from rollups import check_rollups
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "app.db"))
+    yield conn
+    conn.close()
+
+
+def test_hot_queries_use_an_index(conn):
+    assert migrations.apply_migrations(conn) == migrations.SCHEMA_VERSION
+    assert migrations.check_query_plans(conn) == {}
+
+
+def test_api_hot_queries_use_an_index(api_module, api_dir):
+    conn = sqlite3.connect(str(api_dir / api_module.DATABASE))
+    try:
+        assert migrations.check_query_plans(conn, api_module.HOT_QUERIES) == {}
+    finally:
+        conn.close()
+
+
+def test_hot_queries_are_the_statements_that_run():
+    import rollups
+    import streaks
+
+    assert migrations.HOT_QUERIES["streak_upsert"][0] is streaks.UPSERT_STREAK_SQL
+    assert migrations.HOT_QUERIES["milestones_award"][0] is streaks.AWARD_MILESTONES_SQL
+    assert [sql for sql, _ in streaks.recompute_statements(1)] == \
+        [migrations.HOT_QUERIES[f"streak_recompute_{i}"][0] for i in range(3)]
+    assert [sql for sql, _ in rollups.refresh_statements("weight", 1, "2024-01-01")] == \
+        [migrations.HOT_QUERIES[f"rollups_weight_day_{i}"][0] for i in range(2)]
+
+
+def test_check_query_plans_reports_scans(conn):
+    migrations.apply_migrations(conn)
+    failures = migrations.check_query_plans(conn, {
+        "by_value": ("SELECT id FROM glucose_data WHERE value > ?", (100,)),
+        "aliased": ("SELECT d.id FROM weight_data d WHERE d.weight > ?", (80,)),
+        "covering": ("SELECT user_id, date FROM glucose_data WHERE date = ?", ("2024-01-01",)),
+        "cte": ("WITH t (n) AS (VALUES (1), (2)) SELECT n FROM t x", ()),
+    })
+    assert sorted(failures) == ["aliased", "by_value", "covering"]
+
+
+def test_rollup_backfill_matches_raw_rows(conn, monkeypatch):
+    # Stop before the rollups migration, add data, then migrate the rest.
+    with monkeypatch.context() as m:
+        m.setattr(migrations, "MIGRATIONS", migrations.MIGRATIONS[:3])
+        migrations.apply_migrations(conn)
+    conn.execute("INSERT INTO users (id, username, password_hash) VALUES (1, 'u', 'x')")
+    conn.execute("INSERT INTO goals (user_id, glucose_min, glucose_max) VALUES (1, 70, 180)")
+    conn.executemany("INSERT INTO glucose_data (user_id, date, value) VALUES (1, ?, ?)",
+                     [("2024-01-01", 65), ("2024-01-01", 120), ("2024-01-02", 200)])
+    conn.executemany("INSERT INTO nutrition_data (user_id, date, name, servings, carbs, protein, fat, fiber, calories) "
+                     "VALUES (1, ?, 'x', 1, ?, 5, 3, 1, ?)", [("2024-01-01", 30, 250), ("2024-01-01", 12, 90)])
+    conn.execute("INSERT INTO activity_data (user_id, date, minutes, type, calories) "
+                 "VALUES (1, '2024-01-02', 30, 'walk', NULL)")
+    conn.execute("INSERT INTO weight_data (user_id, date, weight) VALUES (1, '2024-01-02', 81.5)")
+    conn.commit()
+
+    migrations.apply_migrations(conn)
+    assert conn.execute("SELECT COUNT(*) FROM daily_rollups").fetchone()[0] > 0
+    assert check_rollups(conn) == []
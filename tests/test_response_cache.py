@@ -0,0 +1,39 @@
+import sqlite3
+
+GOALS = {"glucose_min": 80, "glucose_max": 130, "calorie_target": 2000, "carb_target": 200,
+         "activity_weekly_minutes": 150, "weight_target": 75}
+
+
+def _goals_version(api_module, api_dir, auth):
+    token = auth["Authorization"].split()[1]
+    conn = sqlite3.connect(str(api_dir / api_module.DATABASE))
+    row = conn.execute("""SELECT v.version FROM data_versions v JOIN auth_tokens t ON t.user_id = v.user_id
+                          WHERE t.token = ? AND v.resource = 'goals'""", (token,)).fetchone()
+    conn.close()
+    return row[0] if row else 0
+
+
+def test_repeat_get_with_if_none_match_is_not_modified(client, auth):
+    first = client.get("/data/goals", headers=auth)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    again = client.get("/data/goals", headers={**auth, "If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+    assert again.headers["ETag"] == etag
+
+
+def test_write_bumps_the_version_and_the_etag(client, auth, api_module, api_dir):
+    etag = client.get("/data/goals", headers=auth).headers["ETag"]
+    version = _goals_version(api_module, api_dir, auth)
+
+    assert client.post("/data/goals", json=GOALS, headers=auth).status_code == 200
+    assert _goals_version(api_module, api_dir, auth) == version + 1
+
+    after = client.get("/data/goals", headers={**auth, "If-None-Match": etag})
+    assert after.status_code == 200
+    assert after.headers["ETag"] != etag
+    assert after.get_json()["glucose_min"] == 80
+    assert client.get("/data/goals", headers={**auth, "If-None-Match": after.headers["ETag"]}).status_code == 304
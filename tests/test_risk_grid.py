@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from scorer import ArrayScorer, GridScorer, build_risk_grid
+
+AXES = [
+    ("RIAGENDR", 1, 2, 1),
+    ("RIDAGEYR", 18, 80, 1),
+    ("RIDRETH1", 1, 5, 1),
+    ("BMXHT", 150, 200, 10),
+    ("BMXBMI", 18.0, 40.0, 2.0),
+]
+
+PAYLOAD = {"RIAGENDR": 2, "RIDAGEYR": 45, "RIDRETH1": 3, "BMXHT": 170, "BMXBMI": 28.0}
+
+
+@pytest.fixture(scope="module")
+def scorer(logreg_bundle):
+    return ArrayScorer(logreg_bundle)
+
+
+@pytest.fixture(scope="module")
+def grid(scorer):
+    return build_risk_grid(scorer, "test", axes=AXES, n_check=2000)
+
+
+def test_error_bound_is_sampled_on_integer_ages(scorer, monkeypatch):
+    seen = []
+    predict_proba = scorer.predict_proba
+
+    def spy(X):
+        seen.append(X)
+        return predict_proba(X)
+
+    monkeypatch.setattr(scorer, "predict_proba", spy)
+    build_risk_grid(scorer, "test", axes=AXES, n_check=500)
+    ages = np.concatenate([X[:, scorer.feature_names.index("RIDAGEYR")] for X in seen])
+    assert np.array_equal(ages, np.round(ages))
+
+
+def test_lookup_serves_whole_numbers_on_integer_axes(grid):
+    assert grid.lookup(PAYLOAD) is not None
+    assert grid.lookup({**PAYLOAD, "RIDAGEYR": 45.0}) == grid.lookup(PAYLOAD)
+    assert grid.lookup({**PAYLOAD, "BMXBMI": 28.7}) is not None
+    assert grid.lookup({**PAYLOAD, "RIDAGEYR": 45.4}) is None
+    assert grid.lookup({**PAYLOAD, "RIAGENDR": True}) is None
+    assert grid.lookup({**PAYLOAD, "RIDAGEYR": 17}) is None
+
+
+def test_grid_scorer_falls_back_for_fractional_age(grid, scorer):
+    grid_scorer = GridScorer(grid, fallback=scorer)
+    payload = {**PAYLOAD, "RIDAGEYR": 45.4}
+    payload["BMXWT"] = payload["BMXBMI"] * (payload["BMXHT"] / 100.0) ** 2
+    assert grid_scorer.predict_one(payload) == scorer.predict_one(payload)
+    assert (grid_scorer.grid_hits, grid_scorer.fallbacks) == (0, 1)
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from bench_scorer import sample_payloads
+from scorer import ArrayScorer, BundleScorer, predict_many, predict_one
+
+@pytest.fixture(params=["logreg_bundle", "forest_bundle"])
+def bundle(request):
+    return request.getfixturevalue(request.param)
+
+def test_fast_path_matches_dataframe_path(bundle):
+    payloads = sample_payloads(200)
+    ref = np.array([r["probability"] for r in predict_many(payloads, bundle=bundle)])
+    fast = ArrayScorer(bundle)
+    np.testing.assert_allclose(fast.predict_proba(fast.to_array(payloads)), ref, rtol=0, atol=1e-12)
+    assert [r["risk_level"] for r in fast.predict_many(payloads)] == \
+        [r["risk_level"] for r in predict_many(payloads, bundle=bundle)]
+
+def test_fast_predict_one_matches_predict_one(bundle):
+    fast = ArrayScorer(bundle)
+    for payload in sample_payloads(25, seed=1):
+        assert fast.predict_one(payload)["probability"] == pytest.approx(
+            predict_one(payload, bundle=bundle)["probability"], abs=1e-12)
+
+def test_bundle_scorer_matches_dataframe_path(bundle):
+    payloads = sample_payloads(50, seed=2)
+    ref = [r["probability"] for r in predict_many(payloads, bundle=bundle)]
+    got = [r["probability"] for r in BundleScorer(bundle).predict_many(payloads)]
+    np.testing.assert_allclose(got, ref, rtol=0, atol=1e-12)
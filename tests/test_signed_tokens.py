@@ -0,0 +1,76 @@
+import base64
+import json
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def signing_key(api_module, monkeypatch):
+    monkeypatch.setattr(api_module, "AUTH_SIGNING_KEY", b"test-signing-key")
+
+
+def _issue(api_module, seconds=3600):
+    return api_module.issue_signed_token(7, datetime.now() + timedelta(seconds=seconds))
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def test_good_signature_is_accepted(client, api_module, signing_key):
+    token = _issue(api_module)
+    assert token.startswith("v1.") and token.count(".") == 2
+
+    claims = api_module.verify_signed_token(token)
+    assert claims["uid"] == 7 and claims["exp"] > time.time()
+    assert client.get("/data/streaks", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+
+
+def test_tampered_payload_is_rejected(client, api_module, signing_key):
+    prefix, payload, sig = _issue(api_module).split(".")
+    claims = json.loads(_unb64(payload))
+    claims["uid"] = 8
+    token = ".".join([prefix, _b64(json.dumps(claims, separators=(",", ":")).encode()), sig])
+
+    assert api_module.verify_signed_token(token) is None
+    assert client.get("/data/streaks", headers={"Authorization": f"Bearer {token}"}).status_code == 401
+
+
+def test_tampered_signature_is_rejected(client, api_module, signing_key):
+    body, _, sig = _issue(api_module).rpartition(".")
+    raw = bytearray(_unb64(sig))
+    raw[0] ^= 1
+    token = f"{body}.{_b64(bytes(raw))}"
+
+    assert api_module.verify_signed_token(token) is None
+    assert api_module.verify_signed_token(f"{body}.not*base64") is None
+    assert client.get("/data/streaks", headers={"Authorization": f"Bearer {token}"}).status_code == 401
+
+
+def test_expired_token_is_rejected(client, api_module, signing_key):
+    token = _issue(api_module, seconds=-1)
+
+    assert api_module.verify_signed_token(token) is None
+    assert client.get("/data/streaks", headers={"Authorization": f"Bearer {token}"}).status_code == 401
+
+
+def test_wrong_version_prefix_is_rejected(client, api_module, signing_key):
+    # Correctly signed under the same key, but not a v1 token.
+    _, payload, _ = _issue(api_module).split(".")
+    body = f"v2.{payload}"
+    token = f"{body}.{_b64(api_module._sign(body))}"
+
+    assert api_module.verify_signed_token(token) is None
+    assert client.get("/data/streaks", headers={"Authorization": f"Bearer {token}"}).status_code == 401
+
+
+def test_signed_tokens_need_a_key(api_module, signing_key, monkeypatch):
+    token = _issue(api_module)
+    monkeypatch.setattr(api_module, "AUTH_SIGNING_KEY", b"")
+    assert api_module.verify_signed_token(token) is None
@@ -0,0 +1,21 @@
+from sklearn.ensemble import RandomForestClassifier, StackingClassifier, VotingClassifier
+from sklearn.linear_model import LogisticRegression
+
+from train_model import _pipeline, set_n_jobs
+
+def _members():
+    return [("logreg", LogisticRegression()), ("rf", RandomForestClassifier(n_jobs=-1))]
+
+def _n_jobs(pipe):
+    return {k: v for k, v in pipe.get_params(deep=True).items() if k.startswith("clf__") and k.endswith("n_jobs")}
+
+def test_single_model_gets_all_threads():
+    pipe = set_n_jobs(_pipeline(RandomForestClassifier()), 4)
+    assert _n_jobs(pipe) == {"clf__n_jobs": 4}
+
+def test_ensemble_parallelizes_over_members_only():
+    for ensemble in (VotingClassifier(_members(), voting="soft"),
+                     StackingClassifier(_members(), final_estimator=LogisticRegression())):
+        jobs = _n_jobs(set_n_jobs(_pipeline(ensemble), 4))
+        assert jobs.pop("clf__n_jobs") == 4
+        assert jobs and set(jobs.values()) == {1}